@@ -0,0 +1,141 @@
+"""
+Benchmark cases for Racing Arena: messaging, expressions and round processing
+"""
+import random
+from typing import Dict, List, Tuple
+
+from src.game import Player, PlayerTable, GameState, ExpressionGenerator, ExpressionPool, RoundProcessor
+from src.game.state import Response
+from src.utils import process_client_data, create_message, create_data_message, StreamDecoder
+from benchmarks.harness import benchmark
+
+SEED = 1234  # Every case draws from seeded generators so runs are comparable
+PLAYER_COUNTS = (10, 1_000, 100_000)
+FRAGMENT_SIZE = 7  # bytes per recv() in the fragmented-input cases
+STREAM_MESSAGES = 50
+
+
+def _answer_stream() -> bytes:
+    rng = random.Random(SEED)
+    return b"".join(create_data_message({"answer": rng.randint(-10 ** 8, 10 ** 8)})
+                    for _ in range(STREAM_MESSAGES))
+
+
+def _fragments(data: bytes) -> List[bytes]:
+    return [data[i:i + FRAGMENT_SIZE] for i in range(0, len(data), FRAGMENT_SIZE)]
+
+
+@benchmark("messaging.create_message")
+def bench_create_message():
+    return (lambda: create_message("Your position: 3")), None
+
+
+@benchmark("messaging.create_data_message")
+def bench_create_data_message():
+    data = {"nickname": "player_42", "answer": 1234}
+    return (lambda: create_data_message(data)), None
+
+
+# How the stream arrives: FRAGMENT_SIZE bytes per read, or all messages in one read
+STREAM_READS = {"fragmented": _fragments, "batched": lambda data: [data]}
+
+
+def _process_client_data_case(reads: str):
+    chunks = [chunk.decode() for chunk in STREAM_READS[reads](_answer_stream())]
+
+    def step():
+        buffer = ""
+        for chunk in chunks:
+            buffer, _ = process_client_data(buffer, chunk)
+    return step, None
+
+
+def _stream_decoder_case(reads: str):
+    chunks = STREAM_READS[reads](_answer_stream())
+
+    def step():
+        decoder = StreamDecoder()
+        for chunk in chunks:
+            for _ in decoder.feed(chunk):
+                pass
+    return step, None
+
+
+for _reads in STREAM_READS:
+    benchmark(f"messaging.process_client_data.{_reads}[{STREAM_MESSAGES}]")(
+        lambda reads=_reads: _process_client_data_case(reads))
+    benchmark(f"messaging.stream_decoder.{_reads}[{STREAM_MESSAGES}]")(
+        lambda reads=_reads: _stream_decoder_case(reads))
+
+
+@benchmark("expressions.generate")
+def bench_generate():
+    rng = random.Random(SEED)
+    return (lambda: ExpressionGenerator.generate(rng)), None
+
+
+@benchmark("expressions.pool_next")
+def bench_pool_next():
+    pool = ExpressionPool(seed=SEED, background=False)
+    return pool.next, None
+
+
+def _seat_players(count: int) -> Tuple[Dict[int, Player], PlayerTable]:
+    """A room-style table of `count` players keyed by fake connections"""
+    table = PlayerTable()
+    players = {}
+    for index in range(count):
+        player = Player(f"player_{index}")
+        table.adopt(player)
+        players[index] = player
+    return players, table
+
+
+def _spread_scores(players: Dict[int, Player]):
+    rng = random.Random(SEED)
+    for player in players.values():
+        player.add_score(rng.randint(-5, 20))
+
+
+def _process_round_case(count: int):
+    players, table = _seat_players(count)
+    game_state = GameState(ExpressionPool(seed=SEED, background=False))
+    game_state.track_length = 10 ** 9  # Never finish, so every round reports in full
+    game_state.start_game()
+
+    # Who answers, how, and how late; the same mix every round
+    rng = random.Random(SEED)
+    plan = [(sock, rng.choices(("correct", "wrong", "missing"), (7, 2, 1))[0], rng.uniform(0.1, 5.0))
+            for sock in players]
+
+    def prepare():
+        table.reset()
+        game_state.new_round()
+        started, answer = game_state.round_start_time, game_state.current_answer
+        responses = game_state.responses
+        for sock, kind, delay in plan:
+            if kind == "correct":
+                responses[sock] = Response(answer, str(answer), started + delay)
+            elif kind == "wrong":
+                responses[sock] = Response(answer + 1, str(answer + 1), started + delay)
+
+    return (lambda: RoundProcessor.process_round(game_state, players, table)), prepare
+
+
+def _update_positions_case(count: int):
+    players, table = _seat_players(count)
+    _spread_scores(players)
+    return (lambda: RoundProcessor._update_positions(players, table)), None
+
+
+def _update_positions_sorted_case(count: int):
+    # Players outside a room table fall back to a full sort
+    players = {index: Player(f"player_{index}") for index in range(count)}
+    _spread_scores(players)
+    return (lambda: RoundProcessor._update_positions(players)), None
+
+
+for _count in PLAYER_COUNTS:
+    benchmark(f"round.process_round[{_count}]")(lambda count=_count: _process_round_case(count))
+    benchmark(f"round.update_positions[{_count}]")(lambda count=_count: _update_positions_case(count))
+    benchmark(f"round.update_positions.sorted[{_count}]")(lambda count=_count: _update_positions_sorted_case(count))
@@ -0,0 +1,158 @@
+"""
+Benchmark harness for Racing Arena: case registry, timing, baselines and comparison
+"""
+import gc
+import json
+import platform
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+MIN_SAMPLE_TIME = 0.02  # seconds; calls are batched until one sample takes this long
+MIN_SAMPLES = 5
+MAX_SAMPLES = 200
+TIME_BUDGET = 1.0  # seconds spent sampling one case, after the minimum samples
+DEFAULT_THRESHOLD = 0.10  # relative slowdown reported as a regression
+
+
+class Case:
+    """
+    One named benchmark.
+
+    `setup()` builds the fixture and returns `(step, prepare)`: `step` is the
+    timed operation and `prepare`, when not None, restores the fixture before
+    every step without being timed. Cases without `prepare` are batched like
+    timeit so that very fast steps are measured accurately.
+    """
+
+    def __init__(self, name: str, setup: Callable[[], Tuple[Callable, Optional[Callable]]]):
+        self.name = name
+        self.setup = setup
+
+
+class Result:
+    """Per-call timings of one case, in seconds"""
+
+    def __init__(self, name: str, best: float, median: float, samples: int, number: int):
+        self.name = name
+        self.best = best
+        self.median = median
+        self.samples = samples
+        self.number = number  # Calls per sample
+
+    def to_dict(self) -> Dict:
+        return {"best": self.best, "median": self.median, "samples": self.samples, "number": self.number}
+
+    @classmethod
+    def from_dict(cls, name: str, data: Dict) -> "Result":
+        return cls(name, data["best"], data["median"], data["samples"], data["number"])
+
+
+_CASES: List[Case] = []
+
+
+def benchmark(name: str):
+    """Register a case setup function under `name`"""
+    def register(setup):
+        _CASES.append(Case(name, setup))
+        return setup
+    return register
+
+
+def cases(pattern: Optional[str] = None) -> List[Case]:
+    return [case for case in _CASES if pattern is None or pattern in case.name]
+
+
+def _time_batch(step: Callable, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        step()
+    return time.perf_counter() - started
+
+
+def _calibrate(step: Callable) -> int:
+    """Smallest power-of-ten batch whose run takes MIN_SAMPLE_TIME"""
+    number = 1
+    while _time_batch(step, number) < MIN_SAMPLE_TIME:
+        number *= 10
+    return number
+
+
+def measure(case: Case, time_budget: float = TIME_BUDGET) -> Result:
+    step, prepare = case.setup()
+    gc_was_enabled = gc.isenabled()
+    gc.disable()  # As timeit does: collections would land in random samples
+    try:
+        number = 1 if prepare else _calibrate(step)
+        samples: List[float] = []
+        deadline = time.perf_counter() + time_budget
+        while len(samples) < MIN_SAMPLES or (len(samples) < MAX_SAMPLES and time.perf_counter() < deadline):
+            if prepare:
+                prepare()
+            samples.append(_time_batch(step, number) / number)
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+    samples.sort()
+    return Result(case.name, samples[0], samples[len(samples) // 2], len(samples), number)
+
+
+def save_results(path: str, results: List[Result]):
+    data = {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": {result.name: result.to_dict() for result in results},
+    }
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def load_results(path: str) -> Dict[str, Result]:
+    with open(path) as f:
+        data = json.load(f)
+    return {name: Result.from_dict(name, entry) for name, entry in data["results"].items()}
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def compare(baseline: Dict[str, Result], current: Dict[str, Result],
+            threshold: float = DEFAULT_THRESHOLD) -> Tuple[List[str], List[str]]:
+    """
+    Compare best times case by case.
+    Returns the report lines and the names of cases slower than
+    baseline * (1 + threshold).
+    """
+    lines = [f"{'case':<44} {'baseline':>11} {'current':>11} {'change':>8}"]
+    regressions = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current:
+            lines.append(f"{name:<44} {format_time(baseline[name].best):>11} {'-':>11}  missing")
+            continue
+        if name not in baseline:
+            lines.append(f"{name:<44} {'-':>11} {format_time(current[name].best):>11}  new")
+            continue
+        change = current[name].best / baseline[name].best - 1
+        verdict = ""
+        if change > threshold:
+            verdict = "  REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            verdict = "  faster"
+        lines.append(f"{name:<44} {format_time(baseline[name].best):>11} "
+                     f"{format_time(current[name].best):>11} {change:>+7.1%}{verdict}")
+    return lines, regressions
+
+
+def print_result(result: Result, out=sys.stdout):
+    print(f"{result.name:<44} best {format_time(result.best):>11}  median {format_time(result.median):>11}"
+          f"  ({result.samples} x {result.number})", file=out)
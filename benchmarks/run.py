@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Racing Arena micro-benchmarks
+
+    python benchmarks/run.py run [--filter NAME] [--save FILE]
+    python benchmarks/run.py compare BASELINE [CURRENT] [--threshold 0.10]
+
+`compare` without CURRENT runs the suite first. It exits with status 1 when
+any case is slower than the baseline by more than the threshold.
+"""
+import argparse
+import os
+import sys
+
+# Add the project root to Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import cases as _cases, startup as _startup  # noqa: F401  (registers the cases)
+from benchmarks.harness import (
+    DEFAULT_THRESHOLD, TIME_BUDGET, cases, measure, print_result, save_results, load_results, compare
+)
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+
+def run_suite(pattern=None, time_budget=TIME_BUDGET):
+    results = []
+    for case in cases(pattern):
+        result = measure(case, time_budget)
+        print_result(result)
+        results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Racing Arena micro-benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the suite")
+    run_parser.add_argument("--filter", help="Only cases whose name contains this text")
+    run_parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, help="Write results to a JSON file")
+    run_parser.add_argument("--budget", type=float, default=TIME_BUDGET, help="Seconds of sampling per case")
+
+    compare_parser = commands.add_parser("compare", help="Compare results against a baseline")
+    compare_parser.add_argument("baseline", nargs="?", default=DEFAULT_BASELINE)
+    compare_parser.add_argument("current", nargs="?", help="Saved results; runs the suite when omitted")
+    compare_parser.add_argument("--filter", help="Only cases whose name contains this text")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                                help="Relative slowdown reported as a regression")
+    compare_parser.add_argument("--budget", type=float, default=TIME_BUDGET, help="Seconds of sampling per case")
+
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = run_suite(args.filter, args.budget)
+        if args.save:
+            save_results(args.save, results)
+            print(f"Saved {len(results)} results to {args.save}")
+        return 0
+
+    baseline = load_results(args.baseline)
+    if args.current:
+        current = load_results(args.current)
+    else:
+        current = {result.name: result for result in run_suite(args.filter, args.budget)}
+        print()
+    if args.filter:
+        baseline = {name: result for name, result in baseline.items() if args.filter in name}
+        current = {name: result for name, result in current.items() if args.filter in name}
+
+    lines, regressions = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    print(f"\nNo regressions beyond {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Startup benchmark cases for Racing Arena: fresh interpreters importing each
+mode, and a server process from launch until it accepts connections
+"""
+import atexit
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+from benchmarks.harness import benchmark
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(PROJECT_ROOT, "main.py")
+READY_TIMEOUT = 10.0  # seconds a launched server has to accept a connection
+
+# What each --mode imports on top of main.py itself
+MODE_IMPORTS = {
+    "client": "from src.client.racing_client import RacingClient",
+    "server": "from src.server.racing_server import RacingServer",
+    "server.asyncio": "from src.server.async_server import AsyncRacingServer",
+    "loadtest": "from src.client.loadtest import LoadTest",
+}
+
+
+def _python(code: str):
+    subprocess.run([sys.executable, "-c", code], cwd=PROJECT_ROOT, check=True)
+
+
+@benchmark("startup.interpreter")
+def bench_interpreter():
+    """The floor every other startup case pays"""
+    return (lambda: _python("pass")), None
+
+
+@benchmark("startup.main")
+def bench_main():
+    return (lambda: _python("import main")), None
+
+
+def _mode_case(mode: str):
+    code = f"import main; {MODE_IMPORTS[mode]}"
+    return (lambda: _python(code)), None
+
+
+for _mode in MODE_IMPORTS:
+    benchmark(f"startup.import[{_mode}]")(lambda mode=_mode: _mode_case(mode))
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _stop(process: subprocess.Popen):
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)  # Graceful, so the server removes its runtime file
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+@benchmark("startup.server_ready")
+def bench_server_ready():
+    """`main.py --mode server` from exec until its listener accepts; shutdown is not timed"""
+    port = _free_port()
+    running = []
+
+    def prepare():
+        while running:
+            _stop(running.pop())
+
+    def step():
+        process = subprocess.Popen(
+            [sys.executable, MAIN, "--mode", "server", "--host", "127.0.0.1", "--port", str(port), "--quiet"],
+            cwd=PROJECT_ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        running.append(process)
+        deadline = time.monotonic() + READY_TIMEOUT
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=READY_TIMEOUT).close()
+                return
+            except ConnectionRefusedError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError(f"Server on port {port} did not start")
+                time.sleep(0.001)
+
+    atexit.register(prepare)
+    return step, prepare
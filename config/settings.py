@@ -6,26 +6,72 @@ Game configuration settings for Racing Arena
 DEFAULT_HOST = 'localhost'
 DEFAULT_PORT = 12345
 MAX_PORT_ATTEMPTS = 10
-MAX_CLIENTS = 10
+CONNECT_TIMEOUT = 2.0  # seconds the client waits for any candidate port to accept
+RUNTIME_DIR = None  # Where servers publish their bound port; $XDG_RUNTIME_DIR or the temp dir when None
+MAX_CLIENTS = 10  # Players per room
 MIN_CLIENTS = 2
+MAX_ROOMS = 500  # Concurrent races hosted by one server process
+LEADERBOARD_MIN_PLAYERS = 1000  # Rooms this big rank incrementally; smaller ones sort, which is faster there
+MAX_CONNECTIONS = MAX_ROOMS * MAX_CLIENTS
 
 # Game settings
 MIN_TRACK_LENGTH = 4
 MAX_TRACK_LENGTH = 25
 TIME_LIMIT = 100.0  # seconds per round
+EARLY_RESOLUTION_GRACE = 0.0  # seconds to wait once every active player has answered
 MAX_WRONG_STREAK = 3  # disqualification threshold
+MAX_ANSWER_LENGTH = 32  # characters; longer answers are rejected on arrival
+RACE_COUNTDOWN = 3.0  # seconds between enough players joining and the race start
+INTERMISSION_TIME = 2.0  # seconds of results between races
 
 # Math expression settings
 MIN_NUMBER = -10000
 MAX_NUMBER = 10000
 OPERATORS = ['+', '-', '*', '/', '%']
+EXPRESSION_POOL_SIZE = 1024  # Expressions generated and encoded ahead of time
+EXPRESSION_POOL_LOW_WATER = 256  # Refill in the background below this many
+EXPRESSION_SEED = None  # Set for a reproducible expression sequence
 
 # Network settings
 BUFFER_SIZE = 1024
-SELECT_TIMEOUT = 0.05  # 50ms timeout for optimal responsiveness without CPU waste
+REDRAW_DELAY = 0.05  # seconds the client lets a burst of messages settle before redrawing its prompt
 SOCKET_TIMEOUT = 30.0  # Individual socket timeout for long operations
 MAX_MESSAGE_SIZE = 4096  # Maximum message size to prevent memory issues
+OUTBOUND_HIGH_WATER_MARK = 256 * 1024  # Queued bytes before a slow client is disconnected
+PROTOCOLS = ['binary', 'json']  # Wire protocols a client can request
+DEFAULT_PROTOCOL = 'binary'  # Negotiated at connect; falls back to JSON on old servers
+PROTOCOL_TIMEOUT = 2.0  # seconds a client waits for the protocol acknowledgement
+REGISTRATION_TIMEOUT = 120.0  # seconds a connection may stay without a nickname
 CONNECTION_BACKLOG = 10  # Listen queue size for pending connections
+SERVER_ENGINES = ['select', 'asyncio']  # I/O engines selectable with --engine
+DEFAULT_ENGINE = 'select'
+STATS_HOST = '127.0.0.1'  # Metrics endpoint only listens locally
+STATS_PORT = None  # Port of the HTTP metrics endpoint (--stats-port); disabled when None
+
+# Logging settings
+LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
+LOG_LEVEL = 'INFO'  # DEBUG adds every broadcast line and round result
+LOG_QUEUE_SIZE = 10000  # Records buffered for the writer thread; overflow is dropped, never waited on
+LOG_DUPLICATE_WINDOW = 10.0  # seconds identical log lines are suppressed after the first
+
+# Profiling settings (--profile)
+PROFILE_MODES = ['sample', 'cprofile']  # stack sampler, or deterministic cProfile
+PROFILE_INTERVAL = 0.005  # seconds between stack samples
+PROFILE_OUTPUT = 'racing-profile'  # file prefix; .collapsed for samples, .pstats and .txt for cProfile
+PROFILE_TOP = 25  # functions per phase in the cProfile text report
+
+# Multi-process settings (--workers)
+WORKER_STATS_INTERVAL = 5.0  # seconds between worker stats reports
+WORKER_RESTART_DELAY = 1.0  # initial delay before restarting a crashed worker
+WORKER_MAX_RESTART_DELAY = 30.0  # backoff cap for workers that keep crashing
+
+# Load test settings (--mode loadtest)
+LOADTEST_DURATION = 30.0  # seconds the swarm stays connected
+LOADTEST_ACCURACY = 0.8  # share of answers a bot gets right
+LOADTEST_THINK_TIME = 1.0  # mean seconds a bot takes to answer
+LOADTEST_THINK_DISTRIBUTIONS = ['fixed', 'uniform', 'exponential']
+LOADTEST_THINK_DISTRIBUTION = 'exponential'
+LOADTEST_CONNECT_RATE = 200.0  # new connections per second
 
 # Scoring settings
 BASE_POINTS = 1
@@ -12,9 +12,15 @@ import time
 # Add the project root to Python path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from src.server.racing_server import RacingServer
-from src.client.racing_client import RacingClient
-from config.settings import DEFAULT_HOST, DEFAULT_PORT
+# Each mode imports what it runs, so a client or a bot never loads the
+# server engines, asyncio or multiprocessing it doesn't use
+from src.utils.log import setup_logging
+from config.settings import (
+    DEFAULT_HOST, DEFAULT_PORT, DEFAULT_ENGINE, SERVER_ENGINES, DEFAULT_PROTOCOL, PROTOCOLS,
+    LOADTEST_DURATION, LOADTEST_ACCURACY, LOADTEST_THINK_TIME, LOADTEST_THINK_DISTRIBUTION,
+    LOADTEST_THINK_DISTRIBUTIONS, LOADTEST_CONNECT_RATE, STATS_PORT, LOG_LEVEL, LOG_LEVELS,
+    PROFILE_MODES, PROFILE_OUTPUT
+)
 
 
 def show_banner():
@@ -59,23 +65,42 @@ def show_project_info():
     print()
 
 
-def start_server(host=DEFAULT_HOST, port=DEFAULT_PORT):
-    """Start the Racing Arena server"""
+def start_server(host=DEFAULT_HOST, port=DEFAULT_PORT, engine=DEFAULT_ENGINE, workers=0, stats_port=STATS_PORT,
+                 profile=None):
+    """Start the Racing Arena server, optionally under a ProfileSession"""
     try:
-        print(f"🖥️  Starting Racing Arena Server on {host}:{port}...")
-        server = RacingServer(host, port)
-        server.run()
+        print(f"🖥️  Starting Racing Arena Server on {host}:{port} ({engine} engine)...")
+        if workers > 0:
+            if profile:
+                print("⚠️  --profile is ignored with --workers; profile a single process instead")
+            # One server per worker process, all sharing the port via SO_REUSEPORT
+            from src.server.supervisor import WorkerSupervisor
+            WorkerSupervisor(host, port, workers, engine, stats_port).run()
+            return
+        if engine == "asyncio":
+            from src.server.async_server import AsyncRacingServer as server_class
+        else:
+            from src.server.racing_server import RacingServer as server_class
+        server = server_class(host, port, stats_port=stats_port)
+        if profile:
+            profile.start(server.scheduler)
+        try:
+            server.run()
+        finally:
+            if profile:
+                profile.finish()
     except KeyboardInterrupt:
         print("\n🛑 Server shutdown requested")
     except Exception as e:
         print(f"❌ Server error: {e}")
 
 
-def start_client(host=DEFAULT_HOST, port=DEFAULT_PORT):
+def start_client(host=DEFAULT_HOST, port=DEFAULT_PORT, protocol=DEFAULT_PROTOCOL):
     """Start the Racing Arena client"""
     try:
         print(f"🎮 Connecting to Racing Arena Server at {host}:{port}...")
-        client = RacingClient(host, port)
+        from src.client.racing_client import RacingClient
+        client = RacingClient(host, port, protocol)
         client.run()
     except KeyboardInterrupt:
         print("\n🛑 Client disconnected")
@@ -105,6 +130,7 @@ def start_server_and_client(host=DEFAULT_HOST, port=DEFAULT_PORT):
 def start_multiple_clients(host=DEFAULT_HOST, port=DEFAULT_PORT, num_clients=3):
     """Start multiple clients for testing"""
     print(f"🏭 Starting {num_clients} test clients...")
+    from src.client.racing_client import RacingClient
     
     def client_worker(client_id):
         try:
@@ -129,6 +155,19 @@ def start_multiple_clients(host=DEFAULT_HOST, port=DEFAULT_PORT, num_clients=3):
         print("\n🛑 Stopping all clients...")
 
 
+def start_loadtest(host=DEFAULT_HOST, port=DEFAULT_PORT, bots=100, duration=LOADTEST_DURATION,
+                   accuracy=LOADTEST_ACCURACY, think_time=LOADTEST_THINK_TIME,
+                   think_distribution=LOADTEST_THINK_DISTRIBUTION, connect_rate=LOADTEST_CONNECT_RATE,
+                   protocol=DEFAULT_PROTOCOL):
+    """Drive a swarm of headless bots against a running server and report latencies"""
+    try:
+        from src.client.loadtest import LoadTest
+        LoadTest(host, port, bots, duration, accuracy, think_time, think_distribution,
+                 connect_rate, protocol).run()
+    except Exception as e:
+        print(f"❌ Load test error: {e}")
+
+
 def run_tests():
     """Run the test suite"""
     print("🧪 Running tests...")
@@ -191,28 +230,66 @@ def interactive_mode():
 def main():
     """Main entry point"""
     parser = argparse.ArgumentParser(description="Racing Arena - Multiplayer Math Racing Game")
-    parser.add_argument("--mode", choices=["server", "client", "local", "interactive"], 
+    parser.add_argument("--mode", choices=["server", "client", "local", "loadtest", "interactive"], 
                        default="interactive", help="Running mode")
     parser.add_argument("--host", default=DEFAULT_HOST, help="Server host")
     parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Server port")
-    parser.add_argument("--bots", type=int, default=2, help="Number of bot clients for local mode")
+    parser.add_argument("--bots", type=int, default=2, help="Number of bot clients for local and loadtest modes")
+    parser.add_argument("--engine", choices=SERVER_ENGINES, default=DEFAULT_ENGINE,
+                       help="Server I/O engine (select loop or asyncio streams)")
+    parser.add_argument("--workers", type=int, default=0,
+                       help="Number of server worker processes sharing the port (0 = single process)")
+    parser.add_argument("--stats-port", type=int, default=STATS_PORT,
+                       help="Serve server metrics on 127.0.0.1:PORT (/metrics for Prometheus, /stats for text)")
+    parser.add_argument("--log-level", choices=LOG_LEVELS, default=LOG_LEVEL,
+                       help="Server log verbosity (DEBUG shows every broadcast and round result)")
+    parser.add_argument("--quiet", action="store_true",
+                       help="Production logging: warnings and errors only")
+    parser.add_argument("--profile", nargs="?", const="sample", choices=PROFILE_MODES,
+                       help="Profile the server: low-overhead stack sampling (default) or deterministic cProfile")
+    parser.add_argument("--profile-output", default=PROFILE_OUTPUT,
+                       help="File prefix for the profile (.collapsed for samples, .pstats and .txt for cProfile)")
+    parser.add_argument("--profile-delay", type=float, default=0.0,
+                       help="Seconds to run before profiling starts")
+    parser.add_argument("--profile-duration", type=float,
+                       help="Seconds to profile before writing the profile (default: until exit)")
+    parser.add_argument("--protocol", choices=PROTOCOLS, default=DEFAULT_PROTOCOL,
+                       help="Wire protocol the client requests (falls back to json on old servers)")
+    parser.add_argument("--duration", type=float, default=LOADTEST_DURATION,
+                       help="Seconds the loadtest swarm runs")
+    parser.add_argument("--accuracy", type=float, default=LOADTEST_ACCURACY,
+                       help="Share of loadtest answers that are correct (0-1)")
+    parser.add_argument("--think-time", type=float, default=LOADTEST_THINK_TIME,
+                       help="Mean seconds a loadtest bot takes to answer")
+    parser.add_argument("--think-dist", choices=LOADTEST_THINK_DISTRIBUTIONS, default=LOADTEST_THINK_DISTRIBUTION,
+                       help="Distribution of loadtest think times")
+    parser.add_argument("--rate", type=float, default=LOADTEST_CONNECT_RATE,
+                       help="Loadtest connections opened per second")
     
     args = parser.parse_args()
+    setup_logging(args.log_level, quiet=args.quiet)
     
     if args.mode == "server":
-        start_server(args.host, args.port)
+        profile = None
+        if args.profile:
+            from src.server.profiler import ProfileSession
+            profile = ProfileSession(args.profile, args.profile_output, args.profile_duration, args.profile_delay)
+        start_server(args.host, args.port, args.engine, args.workers, args.stats_port, profile)
     elif args.mode == "client":
-        start_client(args.host, args.port)
+        start_client(args.host, args.port, args.protocol)
     elif args.mode == "local":
         # Start server in background, then start bot clients
         server_thread = threading.Thread(
             target=start_server, 
-            args=(args.host, args.port),
+            args=(args.host, args.port, args.engine),
             daemon=True
         )
         server_thread.start()
         time.sleep(2)
         start_multiple_clients(args.host, args.port, args.bots)
+    elif args.mode == "loadtest":
+        start_loadtest(args.host, args.port, args.bots, args.duration, args.accuracy,
+                       args.think_time, args.think_dist, args.rate, args.protocol)
     else:  # interactive mode
         interactive_mode()
 
@@ -3,25 +3,39 @@ Racing Arena - Terminal-Based Multiplayer Math Game
 
 A real-time multiplayer terminal game where players compete by solving math expressions.
 """
-
-from .server import RacingServer
-from .client import RacingClient
-from .game import Player, GameState, ExpressionGenerator, RoundProcessor
-from .utils import is_port_available, find_available_port, process_client_data, create_message, create_data_message
+import importlib
 
 __version__ = "1.0.0"
 __author__ = "Racing Arena Team"
 
-__all__ = [
-    'RacingServer',
-    'RacingClient',
-    'Player',
-    'GameState',
-    'ExpressionGenerator', 
-    'RoundProcessor',
-    'is_port_available',
-    'find_available_port',
-    'process_client_data',
-    'create_message',
-    'create_data_message'
-]
+# Names below are imported on first access, so `import src.client` does not
+# pay for the server, asyncio or the game engine
+_EXPORTS = {
+    'RacingServer': '.server',
+    'AsyncRacingServer': '.server',
+    'RacingClient': '.client',
+    'Player': '.game',
+    'GameState': '.game',
+    'ExpressionGenerator': '.game',
+    'RoundProcessor': '.game',
+    'is_port_available': '.utils',
+    'find_available_port': '.utils',
+    'process_client_data': '.utils',
+    'create_message': '.utils',
+    'create_data_message': '.utils',
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
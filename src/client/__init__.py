@@ -1,7 +1,27 @@
 """
 Client package for Racing Arena
 """
+import importlib
 
-from .racing_client import RacingClient
+# Imported on first access: the terminal client needs no asyncio
+_EXPORTS = {
+    'RacingClient': '.racing_client',
+    'AsyncRacingClient': '.async_client',
+    'GameEvent': '.async_client',
+    'LoadTest': '.loadtest',
+}
 
-__all__ = ['RacingClient']
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
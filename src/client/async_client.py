@@ -0,0 +1,176 @@
+"""
+asyncio client library for Racing Arena: bots, load tests and integrations
+"""
+import asyncio
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+from config.settings import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_PROTOCOL, BUFFER_SIZE, PROTOCOL_TIMEOUT
+from src.utils import (
+    create_data_message, parse_message, MessageType, StreamDecoder, JSON_CODEC, BINARY_CODEC, PROTOCOL_BINARY
+)
+
+
+class GameEvent:
+    """One server message: its type, typed fields and the text a player would see"""
+    __slots__ = ("type", "fields", "text")
+
+    def __init__(self, msg_type: MessageType, fields: Dict[str, Any], text: str = ""):
+        self.type = msg_type
+        self.fields = fields
+        self.text = text
+
+    @classmethod
+    def from_message(cls, msg: Dict[str, Any]) -> "GameEvent":
+        msg_type, fields = parse_message(msg)
+        return cls(msg_type, fields, msg.get("message", ""))
+
+    def __getitem__(self, key: str) -> Any:
+        return self.fields[key]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.fields.get(key, default)
+
+    def __repr__(self) -> str:
+        return f"GameEvent({self.type.name}, {self.fields!r})"
+
+
+class AsyncRacingClient:
+    """
+    One player session over asyncio streams, sharing the wire protocol code
+    of the server and the terminal client. Many sessions can run in one
+    process; nothing here blocks or reads from a terminal.
+
+        async with AsyncRacingClient(host, port) as client:
+            await client.register("bot_1")
+            async for event in client:
+                if event.type == MessageType.EXPRESSION:
+                    client.submit_answer(evaluate(event["left"], event["operator"], event["right"]))
+
+    Iteration yields a GameEvent per server message and ends when the
+    server closes the connection.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 protocol: str = DEFAULT_PROTOCOL, timeout: float = PROTOCOL_TIMEOUT):
+        self.host = host
+        self.port = port
+        self.protocol = protocol
+        self.timeout = timeout  # For the connect and the protocol acknowledgement each
+        self.codec = JSON_CODEC
+        self.decoder = StreamDecoder()  # Newline-delimited JSON until binary is negotiated
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self.nickname: Optional[str] = None
+        self.registered = False
+        self._events: Deque[GameEvent] = deque()
+        self._negotiating = False
+        self._eof = False
+
+    async def connect(self):
+        """Open the connection and negotiate binary framing when asked for"""
+        self.reader, self.writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        if self.protocol != PROTOCOL_BINARY:
+            return
+        self._negotiating = True
+        self.writer.write(create_data_message({"protocol": self.protocol}))
+        try:
+            await asyncio.wait_for(self._negotiate(), self.timeout)
+        except asyncio.TimeoutError:
+            self._negotiating = False  # No answer: stay on JSON
+
+    async def _negotiate(self):
+        while self._negotiating:
+            if not await self._receive():
+                raise ConnectionError("Server closed the connection during protocol negotiation")
+
+    async def register(self, nickname: str) -> bool:
+        """
+        Send a nickname and wait for the verdict: True once registered,
+        False when the server rejects it. Other messages that arrive
+        meanwhile are kept for iteration. Raises ConnectionError, with the
+        server's last words, when it hangs up instead (e.g. all rooms full).
+        """
+        self.nickname = nickname
+        self._send(MessageType.NICKNAME, nickname=nickname)
+        while True:
+            for event in self._events:
+                if event.type == MessageType.REGISTERED or event.type == MessageType.NICKNAME_REJECTED:
+                    self._events.remove(event)
+                    self.registered = event.type == MessageType.REGISTERED
+                    return self.registered
+            if not await self._receive():
+                reason = next((event.text for event in reversed(self._events) if event.type == MessageType.TEXT), "")
+                raise ConnectionError("Server closed the connection during registration"
+                                      + (f": {reason}" if reason else ""))
+
+    def submit_answer(self, answer):
+        """Queue an answer for the current round; await drain() to respect backpressure"""
+        self._send(MessageType.ANSWER, answer=answer)
+
+    async def drain(self):
+        await self.writer.drain()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> GameEvent:
+        while not self._events:
+            if self._eof or not await self._receive():
+                raise StopAsyncIteration
+        return self._events.popleft()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+    async def wait_closed(self):
+        if self.writer is not None:
+            try:
+                await self.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+    async def __aenter__(self) -> "AsyncRacingClient":
+        if self.writer is None:
+            await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+        await self.wait_closed()
+
+    @property
+    def is_closing(self) -> bool:
+        return self.writer is None or self.writer.is_closing()
+
+    def _send(self, msg_type: MessageType, **fields):
+        self.writer.write(self.codec.encode(msg_type, fields))
+
+    async def _receive(self) -> bool:
+        """Read once and queue the events decoded; False once the connection has ended"""
+        try:
+            data = await self.reader.read(BUFFER_SIZE)
+        except ConnectionError:
+            data = b""
+        if not data:
+            self._eof = True
+            return False
+
+        # One message at a time, so a protocol switch applies to the bytes right after it
+        for msg in self.decoder.feed(data):
+            if "protocol" in msg:
+                # Acknowledgement of the protocol hello; binary from the next byte on
+                if msg["protocol"] == PROTOCOL_BINARY:
+                    self.codec = BINARY_CODEC
+                    self.decoder.switch_protocol(PROTOCOL_BINARY)
+                self._negotiating = False
+                continue
+            event = GameEvent.from_message(msg)
+            if self._negotiating and event.type == MessageType.NICKNAME_REJECTED:
+                # Old servers take the hello for an empty nickname
+                self._negotiating = False
+                continue
+            self._events.append(event)
+        return True
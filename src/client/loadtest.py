@@ -0,0 +1,219 @@
+"""
+Headless load generator for Racing Arena: thousands of bot players from one asyncio process
+"""
+import asyncio
+import os
+import random
+from typing import Dict, List, Optional
+from config.settings import (
+    DEFAULT_HOST, DEFAULT_PORT, DEFAULT_PROTOCOL,
+    LOADTEST_DURATION, LOADTEST_ACCURACY, LOADTEST_THINK_TIME, LOADTEST_THINK_DISTRIBUTION,
+    LOADTEST_CONNECT_RATE
+)
+from src.utils import MessageType, raise_file_limit
+from src.game.expressions import evaluate
+from .async_client import AsyncRacingClient, GameEvent
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of a sample list"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class LoadStats:
+    """Counters and latency samples collected by every bot of a run"""
+
+    def __init__(self):
+        self.connected = 0
+        self.connect_failures = 0
+        self.registered = 0
+        self.disconnects = 0
+        self.rounds = 0
+        self.answers = 0
+        self.dropped = 0  # Rounds skipped or answers that never got feedback
+        self.connect_latency: List[float] = []
+        self.registration_latency: List[float] = []
+        self.answer_latency: List[float] = []  # Answer sent -> round feedback
+        self.elapsed = 0.0
+        self.connect_elapsed = 0.0  # Run start -> last connect resolved, ok or failed
+
+    def report(self) -> str:
+        def latency_line(label: str, samples: List[float]) -> str:
+            if not samples:
+                return f"  {label:<14} no samples"
+            return (f"  {label:<14} p50 {percentile(samples, 50) * 1000:8.1f} ms"
+                    f"  p90 {percentile(samples, 90) * 1000:8.1f} ms"
+                    f"  p99 {percentile(samples, 99) * 1000:8.1f} ms"
+                    f"  max {max(samples) * 1000:8.1f} ms")
+
+        connect_rate = self.connected / self.connect_elapsed if self.connect_elapsed else 0.0
+        return "\n".join([
+            f"Load test: {self.elapsed:.1f}s",
+            f"  connections    {self.connected} ok, {self.connect_failures} failed "
+            f"({connect_rate:.0f}/s), {self.disconnects} dropped by server",
+            f"  registered     {self.registered}",
+            f"  rounds seen    {self.rounds}, answers sent {self.answers}, dropped messages {self.dropped}",
+            latency_line("connect", self.connect_latency),
+            latency_line("registration", self.registration_latency),
+            latency_line("answer->result", self.answer_latency),
+        ])
+
+
+class SwarmBot:
+    """One headless player: registers, then answers every expression after a think time"""
+
+    def __init__(self, swarm: "LoadTest", nickname: str):
+        self.swarm = swarm
+        self.stats = swarm.stats
+        self.nickname = nickname
+        self.client = AsyncRacingClient(swarm.host, swarm.port, swarm.protocol)
+        self.round = 0
+        self.disqualified = False  # Sits out the rest of the race
+        self.answered_at: Optional[float] = None  # Send time of the unacknowledged answer
+        self._answer_timer: Optional[asyncio.TimerHandle] = None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            await self.client.connect()
+        except (OSError, asyncio.TimeoutError):
+            self.stats.connect_failures += 1
+            self.stats.connect_elapsed = loop.time() - self.swarm.started
+            self.client.close()
+            return
+        self.stats.connected += 1
+        self.stats.connect_elapsed = loop.time() - self.swarm.started
+        self.stats.connect_latency.append(loop.time() - started)
+
+        try:
+            while True:
+                sent = loop.time()
+                if await self.client.register(self.nickname):
+                    break
+                self.nickname += "_"
+            self.stats.registered += 1
+            self.stats.registration_latency.append(loop.time() - sent)
+
+            async for event in self.client:
+                self._handle(event)
+            self.stats.disconnects += 1
+        except (ConnectionError, ValueError):
+            self.stats.disconnects += 1
+        finally:
+            if self._answer_timer:
+                self._answer_timer.cancel()
+            self.client.close()
+
+    def _handle(self, event: GameEvent):
+        msg_type = event.type
+        if msg_type == MessageType.RACE_STARTED:
+            self.round = 0
+            self.disqualified = False
+        elif msg_type == MessageType.DISQUALIFIED and event["nickname"] == self.nickname:
+            self.disqualified = True
+        elif msg_type == MessageType.ROUND:
+            number = event["round"]
+            if self.round and number > self.round + 1:
+                self.stats.dropped += number - self.round - 1
+            if self.answered_at is not None:
+                # A new round began without feedback on our answer
+                self.stats.dropped += 1
+                self.answered_at = None
+            self.round = number
+            self.stats.rounds += 1
+        elif msg_type == MessageType.EXPRESSION and not self.disqualified:
+            self._schedule_answer(event.fields)
+        elif msg_type == MessageType.FEEDBACK and self.answered_at is not None:
+            self.stats.answer_latency.append(asyncio.get_running_loop().time() - self.answered_at)
+            self.answered_at = None
+
+    def _schedule_answer(self, expression: Dict):
+        answer = evaluate(expression["left"], expression["operator"], expression["right"])
+        if self.swarm.rng.random() >= self.swarm.accuracy:
+            answer += self.swarm.rng.choice((-1, 1))
+        if self._answer_timer:
+            self._answer_timer.cancel()
+        self._answer_timer = asyncio.get_running_loop().call_later(
+            self.swarm.think_time(), self._answer, self.round, answer
+        )
+
+    def _answer(self, round_no: int, answer: int):
+        self._answer_timer = None
+        if round_no != self.round or self.client.is_closing:
+            return
+        self.answered_at = asyncio.get_running_loop().time()
+        self.stats.answers += 1
+        self.client.submit_answer(answer)
+
+
+class LoadTest:
+    """
+    Drives `bots` headless players against a running server for `duration`
+    seconds, opening connections at `connect_rate` per second.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, bots: int = 100,
+                 duration: float = LOADTEST_DURATION, accuracy: float = LOADTEST_ACCURACY,
+                 think_time: float = LOADTEST_THINK_TIME,
+                 think_distribution: str = LOADTEST_THINK_DISTRIBUTION,
+                 connect_rate: float = LOADTEST_CONNECT_RATE,
+                 protocol: str = DEFAULT_PROTOCOL, seed: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.bots = bots
+        self.duration = duration
+        self.accuracy = accuracy
+        self.mean_think_time = think_time
+        self.think_distribution = think_distribution
+        self.connect_rate = connect_rate
+        self.protocol = protocol
+        self.rng = random.Random(seed)
+        self.stats = LoadStats()
+        self.started = 0.0  # Loop time the run began
+
+    def think_time(self) -> float:
+        """Seconds a bot waits before answering, drawn from the configured distribution"""
+        mean = self.mean_think_time
+        if self.think_distribution == "exponential":
+            return self.rng.expovariate(1 / mean) if mean > 0 else 0.0
+        if self.think_distribution == "uniform":
+            return self.rng.uniform(0, 2 * mean)
+        return mean
+
+    def run(self) -> LoadStats:
+        raise_file_limit(self.bots + 64)
+        print(f"[LoadTest] {self.bots} bots -> {self.host}:{self.port} for {self.duration:.0f}s "
+              f"(accuracy {self.accuracy:.0%}, {self.think_distribution} think time ~{self.mean_think_time}s, "
+              f"{self.protocol})")
+        try:
+            asyncio.run(self._run())
+        except KeyboardInterrupt:
+            print("\n[LoadTest] Interrupted")
+        print(self.stats.report())
+        return self.stats
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        started = self.started = loop.time()
+        deadline = started + self.duration
+        tasks = []
+        prefix = f"bot{os.getpid()}"
+        try:
+            for index in range(self.bots):
+                if loop.time() >= deadline:
+                    break
+                bot = SwarmBot(self, f"{prefix}_{index}")
+                tasks.append(asyncio.create_task(bot.run()))
+                # Pace connection attempts so the listen backlog isn't flooded
+                await asyncio.sleep(max(0.0, started + (index + 1) / self.connect_rate - loop.time()))
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            self.stats.elapsed = loop.time() - started
@@ -1,152 +1,340 @@
 """
 Racing Arena Client implementation
 """
+import os
+import selectors
 import socket
-import select
 import sys
-import json
-from config.settings import DEFAULT_HOST, DEFAULT_PORT, BUFFER_SIZE, SELECT_TIMEOUT
-from src.utils import process_client_data, create_data_message
+import time
+from typing import Callable, Dict, Iterator, Optional, Tuple
+from config.settings import (
+    DEFAULT_HOST, DEFAULT_PORT, BUFFER_SIZE, DEFAULT_PROTOCOL, PROTOCOL_TIMEOUT, REDRAW_DELAY,
+    MAX_PORT_ATTEMPTS, CONNECT_TIMEOUT
+)
+from src.utils import (
+    create_data_message, message_type, MessageType, StreamDecoder,
+    JSON_CODEC, BINARY_CODEC, PROTOCOL_BINARY, discover_port, connect_first
+)
+
+PROMPT_NICKNAME = "Enter your nickname: "
+PROMPT_RETRY_NICKNAME = "Enter a different nickname: "
+PROMPT_ANSWER = "> "
+
+
+class LineReader:
+    """Splits raw bytes from a non-blocking read into complete lines"""
+
+    def __init__(self):
+        self.buffer = bytearray()
+
+    def feed(self, data: bytes) -> Iterator[str]:
+        self.buffer += data
+        while True:
+            end = self.buffer.find(b"\n")
+            if end < 0:
+                return
+            line = self.buffer[:end].decode("utf-8", "replace")
+            del self.buffer[:end + 1]
+            yield line.rstrip("\r")
 
 
 class RacingClient:
-    """Client class for Racing Arena"""
-    
-    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
-        # Try to connect to the specified port first
-        connection_successful = False
-        original_port = port
-        
-        # If the default port doesn't work, try to find the server
-        for attempt_port in range(port, port + 10):
+    """
+    Client class for Racing Arena.
+
+    One selector multiplexes the server socket and stdin, and a couple of
+    deadlines (protocol negotiation, prompt redraw) bound each wait, so the
+    client never blocks on either side: server messages are shown while the
+    player types, and answers go out the moment Enter is pressed.
+
+    `run()` drives the loop until the game ends. To embed the client, call
+    `start()` and then `poll()` from your own loop; pass `stdin=None` and
+    feed input through `handle_line()` instead of a terminal.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, protocol: str = DEFAULT_PROTOCOL,
+                 stdin=sys.stdin, stdout=sys.stdout):
+        self.protocol = protocol
+        self.codec = JSON_CODEC
+        self.decoder = StreamDecoder()  # Newline-delimited JSON until binary is negotiated
+        self.stdin = stdin
+        self.stdout = stdout
+        self.nickname: Optional[str] = None
+        self.registered = False
+        self.waiting_for_answer = False
+        self.running = False
+        # One lookup per message; types without a handler are printed as they are
+        self.handlers = {
+            MessageType.NICKNAME_REJECTED: self._on_nickname_rejected,
+            MessageType.REGISTERED: self._on_registered,
+            MessageType.EXPRESSION: self._on_expression,
+        }
+        self.selector = selectors.DefaultSelector()
+        self.lines = LineReader()
+        self._outbox = bytearray()  # Encoded messages the socket has not taken yet
+        self._negotiating = False
+        self._prompt: Optional[str] = None  # Prompt for the input expected next
+        self._prompt_shown = False
+        self._timers: Dict[str, Tuple[float, Callable]] = {}
+
+        self.sock = self._connect(host, port)
+
+    @staticmethod
+    def _connect(host: str, port: int) -> socket.socket:
+        """
+        Connect to the port a local server published for `port`, else to
+        whichever of port..port+MAX_PORT_ATTEMPTS-1 accepts first, all tried at once
+        """
+        sock = None
+        published = discover_port(host, port)
+        if published is not None:
+            try:
+                sock = connect_first(host, [published], CONNECT_TIMEOUT)
+            except OSError:
+                pass  # Stale file; fall back to probing
+        if sock is None:
+            candidates = list(range(port, port + MAX_PORT_ATTEMPTS))
             try:
-                self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                self.sock.connect((host, attempt_port))
-                self.sock.setblocking(False)
-                self.nickname = None
-                self.waiting_for_answer = False
-                self.buffer = ""  # Buffer for incomplete messages
-                if attempt_port != original_port:
-                    print(f"Connected to server on port {attempt_port}")
-                connection_successful = True
-                break
-                
-            except ConnectionRefusedError:
-                self.sock.close()
-                continue
-            except Exception as e:
-                self.sock.close()
-                if attempt_port == original_port:
-                    print(f"Error connecting to {host}:{attempt_port}: {e}")
-                continue
-        
-        if not connection_successful:
-            print(f"Error: Could not connect to server at {host}:{original_port}")
-            print("Make sure the server is running with: python main.py server")
-            raise ConnectionRefusedError(f"Could not connect to server on any port from {original_port} to {original_port + 9}")
+                sock = connect_first(host, candidates, CONNECT_TIMEOUT)
+            except OSError as e:
+                print(f"Error: Could not connect to server at {host}:{port} ({e})")
+                print("Make sure the server is running with: python main.py server")
+                raise ConnectionRefusedError(
+                    f"Could not connect to server on any port from {port} to {candidates[-1]}") from e
+        connected_port = sock.getpeername()[1]
+        if connected_port != port:
+            print(f"Connected to server on port {connected_port}")
+        return sock
 
     def run(self):
         """Main client loop"""
-        print("Welcome to Racing Arena!")
-        self.nickname = input("Enter your nickname: ")
-        if not self.nickname:
-            print("Nickname cannot be empty. Exiting.")
+        self.start()
+        while self.running:
+            self.poll(self._timeout())
+
+    def start(self):
+        """Register the socket and stdin, ask for binary framing and prompt for a nickname"""
+        self.running = True
+        self._show("Welcome to Racing Arena!")
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        if self.stdin is not None:
+            self.selector.register(self.stdin, selectors.EVENT_READ)
+        self._negotiate_protocol()
+        self._set_prompt(PROMPT_NICKNAME)
+
+    def poll(self, timeout: Optional[float] = 0):
+        """Handle whatever is ready within `timeout` seconds, then any due deadlines"""
+        for key, events in self.selector.select(timeout):
+            if key.fileobj is self.sock:
+                if events & selectors.EVENT_WRITE:
+                    self._flush()
+                if events & selectors.EVENT_READ and self.running:
+                    self._read_socket()
+            else:
+                self._read_stdin()
+            if not self.running:
+                return
+        self._run_timers()
+
+    def handle_line(self, line: str):
+        """A line the player entered: nickname before registration, answer afterwards"""
+        self._prompt_shown = False  # Enter moved the cursor past the prompt
+        line = line.strip()
+        if not self.registered:
+            if self.nickname is not None:
+                return  # Registration in flight
+            if not line:
+                self._show("Nickname cannot be empty. Exiting.")
+                self.running = False
+                return
+            self.nickname = line
+            self._set_prompt(None)
+            self._show(f"Connecting as {self.nickname}...")
+            if not self._negotiating:
+                self._send(MessageType.NICKNAME, nickname=self.nickname)
+        elif self.waiting_for_answer:
+            self.waiting_for_answer = False
+            self._set_prompt(None)
+            self._send(MessageType.ANSWER, answer=line)
+        elif line:
+            self._show("No question to answer right now.")
+
+    # Server side
+
+    def _negotiate_protocol(self):
+        """
+        Ask the server for binary framing. Old servers answer the hello like an
+        empty nickname, in which case the client stays on JSON. A nickname
+        typed meanwhile is held back until the answer or PROTOCOL_TIMEOUT.
+        """
+        if self.protocol != PROTOCOL_BINARY:
             return
-            
-        print(f"Connecting as {self.nickname}...")
-        self.sock.send(create_data_message({"nickname": self.nickname}))
+        self._negotiating = True
+        self._send_raw(create_data_message({"protocol": self.protocol}))
+        self._call_later("negotiation", PROTOCOL_TIMEOUT, self._end_negotiation)
 
-        registered = False  # Track if registration is complete
-        
-        while True:
-            # Check for server messages
-            readable, _, _ = select.select([self.sock], [], [], SELECT_TIMEOUT)
-            for sock in readable:
-                try:
-                    data = sock.recv(BUFFER_SIZE).decode("utf8")
-                    if not data:
-                        print("Disconnected from server")
-                        return
-                    
-                    # Process potentially multiple messages
-                    self.buffer, messages = process_client_data(self.buffer, data)
-                    for msg in messages:
-                        message = msg["message"]
-                        
-                        # Handle nickname retry scenarios
-                        if not registered and ("already taken" in message or "cannot be empty" in message or "invalid" in message):
-                            print(message)
-                            # Ask for a new nickname
-                            new_nickname = input("Enter a different nickname: ").strip()
-                            if not new_nickname:
-                                print("Nickname cannot be empty. Exiting.")
-                                return
-                            self.nickname = new_nickname
-                            self.sock.send(create_data_message({"nickname": self.nickname}))
-                            continue
-                        
-                        # Check if registration is successful
-                        if "Registration Completed Successfully" in message:
-                            registered = True
-                            print("> Registration Completed Successfully")
-                            print("Waiting for other players...")
-                            continue
-                        
-                        # Handle race start message
-                        if "Race Started!" in message:
-                            print(message)
-                            continue
-                        
-                        # Handle position updates
-                        if "Your position:" in message:
-                            print(message)
-                            continue
-                        
-                        # Handle round messages  
-                        if message.startswith("[Round"):
-                            print(message)
-                            continue
-                        
-                        # Handle solve expressions
-                        if "Solve:" in message:
-                            print(message)
-                            self.waiting_for_answer = True
-                            continue
-                        
-                        # Handle result messages (correct/incorrect)
-                        if ("Correct!" in message or "Incorrect!" in message or "Time's up!" in message):
-                            print(message)
-                            continue
-                        
-                        # Print other messages as-is
-                        print(message)
-                        
-                except json.JSONDecodeError as e:
-                    print(f"Error parsing server message: {e}")
-                    continue
-                except ConnectionResetError:
-                    print("Connection reset by server")
-                    return
-                except Exception as e:
-                    print(f"Error communicating with server: {e}")
+    def _on_negotiation_reply(self, msg: dict):
+        if msg.get("protocol") == PROTOCOL_BINARY:
+            # Everything after the acknowledgement is binary
+            self.codec = BINARY_CODEC
+            self.decoder.switch_protocol(PROTOCOL_BINARY)
+            self._end_negotiation()
+        elif "protocol" in msg or message_type(msg) == MessageType.NICKNAME_REJECTED:
+            self._end_negotiation()
+        else:
+            self._dispatch(msg)
+
+    def _end_negotiation(self):
+        self._negotiating = False
+        self._cancel("negotiation")
+        if self.nickname is not None and not self.registered:
+            self._send(MessageType.NICKNAME, nickname=self.nickname)
+
+    def _read_socket(self):
+        try:
+            data = self.sock.recv(BUFFER_SIZE)
+        except BlockingIOError:
+            return
+        except ConnectionResetError:
+            self._disconnect("Connection reset by server")
+            return
+        except OSError as e:
+            self._disconnect(f"Error communicating with server: {e}")
+            return
+        if not data:
+            self._disconnect("Disconnected from server")
+            return
+
+        try:
+            # One message at a time, so a protocol switch applies to the bytes right after it
+            for msg in self.decoder.feed(data):
+                if self._negotiating:
+                    self._on_negotiation_reply(msg)
+                else:
+                    self._dispatch(msg)
+                if not self.running:
                     return
-            
-            # Check for user input when waiting for answer
-            if self.waiting_for_answer:
-                if sys.stdin in select.select([sys.stdin], [], [], 0)[0]:
-                    answer = input("> ").strip()
-                    try:
-                        self.sock.send(create_data_message({"answer": answer}))
-                        self.waiting_for_answer = False
-                    except ConnectionResetError:
-                        print("Connection lost while sending answer")
-                        return
-                    except Exception as e:
-                        print(f"Error sending answer: {e}")
-                        return
+        except ValueError as e:
+            # Oversized or undecodable stream - the connection can't recover
+            self._disconnect(f"Error parsing server message: {e}")
+
+    def _dispatch(self, msg: dict):
+        """Hand a decoded server message to the handler of its type"""
+        handler = self.handlers.get(message_type(msg), self._on_message)
+        handler(msg)
+
+    def _on_message(self, msg: dict):
+        if "message" in msg:
+            self._show(msg["message"])
+
+    def _on_nickname_rejected(self, msg: dict):
+        if self.registered:
+            return
+        self._show(msg["message"])
+        self.nickname = None
+        self._set_prompt(PROMPT_RETRY_NICKNAME)
+
+    def _on_registered(self, msg: dict):
+        self.registered = True
+        self._show("> Registration Completed Successfully")
+        self._show("Waiting for other players...")
+
+    def _on_expression(self, msg: dict):
+        self._show(msg["message"])
+        self.waiting_for_answer = True
+        self._set_prompt(PROMPT_ANSWER)
+
+    def _send(self, msg_type: MessageType, **fields):
+        self._send_raw(self.codec.encode(msg_type, fields))
+
+    def _send_raw(self, data: bytes):
+        self._outbox += data
+        self._flush()
+
+    def _flush(self):
+        """Write as much queued output as the socket takes; wait for writability for the rest"""
+        try:
+            while self._outbox:
+                sent = self.sock.send(self._outbox)
+                del self._outbox[:sent]
+        except (BlockingIOError, InterruptedError):
+            pass
+        except OSError as e:
+            self._disconnect(f"Connection lost while sending: {e}")
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if self._outbox else 0)
+        if self.sock in self.selector.get_map():
+            self.selector.modify(self.sock, events)
+
+    def _disconnect(self, reason: str):
+        self._show(reason)
+        self.running = False
+
+    # Terminal side
+
+    def _read_stdin(self):
+        # One read of whatever is buffered; the selector said it won't block
+        data = os.read(self.stdin.fileno(), BUFFER_SIZE)
+        if not data:
+            # End of input: keep following the race, but stop if we never registered
+            self.selector.unregister(self.stdin)
+            if self.nickname is None:
+                self.running = False
+            return
+        for line in self.lines.feed(data):
+            self.handle_line(line)
+            if not self.running:
+                return
+
+    def _show(self, text: str):
+        """Print a line of output; the pending prompt is redrawn once output settles"""
+        if self._prompt_shown:
+            self.stdout.write("\n")
+            self._prompt_shown = False
+        self.stdout.write(text + "\n")
+        self.stdout.flush()
+        if self._prompt is not None:
+            self._call_later("redraw", REDRAW_DELAY, self._redraw)
+
+    def _set_prompt(self, prompt: Optional[str]):
+        # Drawn after REDRAW_DELAY, so messages arriving together land above it
+        self._prompt = prompt
+        if prompt is None:
+            self._cancel("redraw")
+        else:
+            self._call_later("redraw", REDRAW_DELAY, self._redraw)
+
+    def _redraw(self):
+        if self._prompt is not None and not self._prompt_shown and self.running:
+            self.stdout.write(self._prompt)
+            self.stdout.flush()
+            self._prompt_shown = True
+
+    # Deadlines
+
+    def _call_later(self, name: str, delay: float, callback: Callable):
+        """(Re)arm the named deadline"""
+        self._timers[name] = (time.monotonic() + delay, callback)
+
+    def _cancel(self, name: str):
+        self._timers.pop(name, None)
+
+    def _timeout(self) -> Optional[float]:
+        """Seconds until the next deadline, or None to wait for I/O alone"""
+        if not self._timers:
+            return None
+        return max(0.0, min(when for when, _ in self._timers.values()) - time.monotonic())
+
+    def _run_timers(self):
+        now = time.monotonic()
+        for name, (when, callback) in list(self._timers.items()):
+            if when <= now and self._timers.get(name) == (when, callback):
+                del self._timers[name]
+                callback()
 
     def close(self):
         """Close the client connection"""
+        self.selector.close()
         try:
             self.sock.close()
         except:
@@ -2,14 +2,16 @@
 Game package for Racing Arena
 """
 
-from .player import Player
+from .player import Player, PlayerTable
 from .state import GameState
-from .expressions import ExpressionGenerator
+from .expressions import ExpressionGenerator, ExpressionPool
 from .round_processor import RoundProcessor
 
 __all__ = [
     'Player',
+    'PlayerTable',
     'GameState', 
     'ExpressionGenerator',
+    'ExpressionPool',
     'RoundProcessor'
 ]
@@ -1,21 +1,139 @@
+"""
+Math expressions for Racing Arena: generated arithmetically and pooled ahead of use
+"""
+import operator
 import random
-from typing import Tuple
-from config.settings import MIN_NUMBER, MAX_NUMBER, OPERATORS
+import threading
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+from config.settings import (
+    MIN_NUMBER, MAX_NUMBER, OPERATORS,
+    EXPRESSION_POOL_SIZE, EXPRESSION_POOL_LOW_WATER, EXPRESSION_SEED
+)
+from src.utils.messaging import MessageType, PreparedMessage
 
+# Integer semantics matching Python's own operators; division is always exact
+_OPERATIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.floordiv,
+    '%': operator.mod,
+}
 
-class ExpressionGenerator:    
+
+def evaluate(left: int, op: str, right: int) -> int:
+    """Answer of "left op right" with Python's integer semantics"""
+    return _OPERATIONS[op](left, right)
+
+
+class Expression:
+    """One pooled expression with its answer and pre-encoded "Solve:" message"""
+
+    __slots__ = ("text", "answer", "message")
+
+    def __init__(self, left: int, op: str, right: int, answer: int):
+        self.text = f"{left} {op} {right}"
+        self.answer = answer
+        self.message = PreparedMessage(
+            (MessageType.EXPRESSION, {"left": left, "operator": op, "right": right})
+        )
+
+
+class ExpressionGenerator:
     @staticmethod
-    def generate() -> Tuple[str, int]:
+    def generate(rng: Optional[random.Random] = None) -> Tuple[str, int]:
         """Generate a random math expression and its answer"""
-        num1 = random.randint(MIN_NUMBER, MAX_NUMBER)
-        num2 = random.randint(MIN_NUMBER, MAX_NUMBER)
-        operator = random.choice(OPERATORS)
-        
-        # Handle division to ensure integer result
-        if operator == '/':
-            num2 = random.randint(1, 10000) if num2 == 0 else num2
-            num1 = num2 * random.randint(MIN_NUMBER // 100, MAX_NUMBER // 100)
-        
-        expr = f"{num1} {operator} {num2}"
-        answer = eval(expr)  # Safe in this context as inputs are controlled
-        return expr, int(answer)
+        left, op, right, answer = ExpressionGenerator.operands(rng or random)
+        return f"{left} {op} {right}", answer
+
+    @staticmethod
+    def operands(rng) -> Tuple[int, str, int, int]:
+        """Draw operands and operator, and compute the answer without eval()"""
+        num1 = rng.randint(MIN_NUMBER, MAX_NUMBER)
+        num2 = rng.randint(MIN_NUMBER, MAX_NUMBER)
+        operator_symbol = rng.choice(OPERATORS)
+
+        # Division and modulo need a non-zero divisor; division an integer result
+        if operator_symbol in ('/', '%') and num2 == 0:
+            num2 = rng.randint(1, 10000)
+        if operator_symbol == '/':
+            num1 = num2 * rng.randint(MIN_NUMBER // 100, MAX_NUMBER // 100)
+
+        return num1, operator_symbol, num2, evaluate(num1, operator_symbol, num2)
+
+
+class ExpressionPool:
+    """
+    Ready-made expressions handed out one per round.
+
+    Expressions are generated and encoded in batches on a background thread
+    whenever the pool drops below its low-water mark, so starting a round is
+    a deque pop. With a seed the sequence is deterministic regardless of
+    refill timing, which keeps benchmarks reproducible.
+    """
+
+    def __init__(self, size: int = EXPRESSION_POOL_SIZE, low_water: int = EXPRESSION_POOL_LOW_WATER,
+                 seed: Optional[int] = EXPRESSION_SEED, background: bool = True):
+        self.size = size
+        self.low_water = low_water
+        self.background = background
+        self._rng = random.Random(seed)
+        self._pool: Deque[Expression] = deque()
+        self._lock = threading.Lock()  # Keeps batches in rng order
+        self._wanted = threading.Event()
+        self._refiller: Optional[threading.Thread] = None
+        self._refill(size)
+
+    def __len__(self) -> int:
+        return len(self._pool)
+
+    def next(self) -> Expression:
+        try:
+            expression = self._pool.popleft()
+        except IndexError:
+            # Refill fell behind; generate inline rather than stall the round
+            self._refill(self.low_water or 1)
+            expression = self._pool.popleft()
+        if len(self._pool) < self.low_water:
+            self._request_refill()
+        return expression
+
+    def generate_batch(self, count: int) -> List[Expression]:
+        operands = ExpressionGenerator.operands
+        rng = self._rng
+        return [Expression(*operands(rng)) for _ in range(count)]
+
+    def _refill(self, count: int):
+        with self._lock:
+            self._pool.extend(self.generate_batch(count))
+
+    def _request_refill(self):
+        if not self.background:
+            self._refill(self.size - len(self._pool))
+            return
+        if self._refiller is None:
+            self._refiller = threading.Thread(target=self._refill_loop, name="expression-pool", daemon=True)
+            self._refiller.start()
+        self._wanted.set()
+
+    def _refill_loop(self):
+        while True:
+            self._wanted.wait()
+            self._wanted.clear()
+            missing = self.size - len(self._pool)
+            if missing > 0:
+                self._refill(missing)
+
+
+_shared_pool: Optional[ExpressionPool] = None
+_shared_pool_lock = threading.Lock()
+
+
+def shared_pool() -> ExpressionPool:
+    """Process-wide pool used by every GameState that isn't given its own"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ExpressionPool()
+        return _shared_pool
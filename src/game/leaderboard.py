@@ -0,0 +1,121 @@
+"""
+Incremental leaderboard for Racing Arena: tie-aware ranks without re-sorting every round
+"""
+from typing import Callable, Dict, Hashable, List, Optional, Set
+
+
+class Leaderboard:
+    """
+    Score-bucketed order-statistics structure.
+
+    Players are grouped in buckets by score and a Fenwick tree over the
+    bucket counts answers "how many players score higher" in O(log n), so a
+    score change costs two tree updates instead of a full re-sort. Ranks are
+    competition style: tied players share a position and the next one skips
+    (1, 1, 3). The tree covers a window of scores that grows on demand.
+    """
+
+    def __init__(self):
+        self._members: Dict[int, Set[Hashable]] = {}
+        self._low = 0  # Score held in tree slot 1
+        self._size = 0
+        self._tree: List[int] = [0]
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, key: Hashable, score: int):
+        if not self._low <= score < self._low + self._size:
+            self._grow(score)
+        self._members.setdefault(score, set()).add(key)
+        self._update(score - self._low + 1, 1)
+        self._count += 1
+
+    def remove(self, key: Hashable, score: int):
+        bucket = self._members.get(score)
+        if not bucket or key not in bucket:
+            return
+        bucket.remove(key)
+        if not bucket:
+            del self._members[score]
+        self._update(score - self._low + 1, -1)
+        self._count -= 1
+
+    def move(self, key: Hashable, old_score: int, new_score: int):
+        if old_score != new_score:
+            self.remove(key, old_score)
+            self.add(key, new_score)
+
+    def clear(self):
+        self.__init__()
+
+    def count_above(self, score: int) -> int:
+        """Number of players with a strictly higher score"""
+        return self._count - self._prefix(score - self._low + 1)
+
+    def rank(self, score: int) -> int:
+        """Tie-aware position of a score: 1 + players strictly ahead of it"""
+        return 1 + self.count_above(score)
+
+    def best_score(self) -> Optional[int]:
+        """Highest score on the board, found by descending the tree"""
+        if not self._count:
+            return None
+        position, remaining = 0, self._count
+        step = 1 << self._size.bit_length()
+        while step:
+            probe = position + step
+            if probe <= self._size and self._tree[probe] < remaining:
+                position = probe
+                remaining -= self._tree[probe]
+            step >>= 1
+        return self._low + position
+
+    def top(self, k: int, order: Optional[Callable] = None) -> List[Hashable]:
+        """The k best keys; `order` breaks ties within a score"""
+        leaders: List[Hashable] = []
+        for score in sorted(self._members, reverse=True):
+            bucket = self._members[score]
+            leaders.extend(sorted(bucket, key=order) if order else bucket)
+            if len(leaders) >= k:
+                break
+        return leaders[:k]
+
+    def _prefix(self, slot: int) -> int:
+        """Players in tree slots 1..slot, i.e. scoring at most low + slot - 1"""
+        if slot <= 0:
+            return 0
+        slot = min(slot, self._size)
+        total = 0
+        while slot > 0:
+            total += self._tree[slot]
+            slot -= slot & -slot
+        return total
+
+    def _update(self, slot: int, delta: int):
+        while slot <= self._size:
+            self._tree[slot] += delta
+            slot += slot & -slot
+
+    def _grow(self, score: int):
+        """Widen the score window to include `score` and rebuild the tree"""
+        if self._size:
+            low = min(self._low, score)
+            high = max(self._low + self._size, score + 1)
+            span = high - low
+            # Leave headroom in the direction the scores are moving
+            low = low - span if score < self._low else low
+            size = 2 * span
+        else:
+            low, size = score - 32, 64
+
+        self._low, self._size = low, size
+        self._tree = [0] * (size + 1)
+        for bucket_score, bucket in self._members.items():
+            self._tree[bucket_score - low + 1] = len(bucket)
+        # Linear-time Fenwick construction from the raw counts
+        for slot in range(1, size + 1):
+            parent = slot + (slot & -slot)
+            if parent <= size:
+                self._tree[parent] += self._tree[slot]
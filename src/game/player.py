@@ -1,45 +1,243 @@
 """
 Player model for Racing Arena
 """
-from typing import Dict, Any
+from array import array
+from typing import Dict, Any, Iterator, List, Optional
+from config.settings import LEADERBOARD_MIN_PLAYERS
+from .leaderboard import Leaderboard
 
 
-class Player:    
-    
+class PlayerTable:
+    """
+    Struct-of-arrays store for the players of one room.
+
+    Each player is a row index into parallel arrays, so a room holds a few
+    machine words per player and whole-room operations such as reset() run
+    over flat arrays. Rows of departed players are recycled.
+
+    Once the table holds `leaderboard_min_players` players, every score
+    change also moves the row on a leaderboard, so ranks stay current
+    without a sort. Smaller tables rank by sorting, which costs less than
+    keeping the leaderboard up to date at room sizes.
+    """
+
+    def __init__(self, leaderboard_min_players: int = LEADERBOARD_MIN_PLAYERS):
+        self.nicknames: List[Optional[str]] = []
+        self.scores = array("i")
+        self.positions = array("i")
+        self.wrong_streaks = array("i")
+        self.disqualified = bytearray()
+        self.players: List[Optional["Player"]] = []  # Row -> Player view
+        self.leaderboard: Optional[Leaderboard] = None  # Rows ranked by score, in large tables only
+        self.leaderboard_min_players = leaderboard_min_players
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.players) - len(self._free)
+
+    def __iter__(self) -> Iterator["Player"]:
+        return (player for player in self.players if player is not None)
+
+    def new_row(self, nickname: Optional[str] = None) -> int:
+        if self._free:
+            index = self._free.pop()
+            self.nicknames[index] = nickname
+            self.scores[index] = 0
+            self.positions[index] = 1
+            self.wrong_streaks[index] = 0
+            self.disqualified[index] = 0
+            self._rank_new_row(index)
+            return index
+
+        self.nicknames.append(nickname)
+        self.scores.append(0)
+        self.positions.append(1)
+        self.wrong_streaks.append(0)
+        self.disqualified.append(0)
+        self.players.append(None)
+        index = len(self.players) - 1
+        self._rank_new_row(index)
+        return index
+
+    def _rank_new_row(self, index: int):
+        if self.leaderboard is not None:
+            self.leaderboard.add(index, 0)
+        elif len(self) >= self.leaderboard_min_players:
+            self._build_leaderboard()
+
+    def _build_leaderboard(self):
+        self.leaderboard = Leaderboard()
+        free = set(self._free)
+        for index, score in enumerate(self.scores):
+            if index not in free:
+                self.leaderboard.add(index, score)
+
+    def adopt(self, player: "Player"):
+        """Move a player's row into this table, keeping its current values"""
+        if player._table is self:
+            return
+        source, source_index = player._table, player._index
+        index = self.new_row(source.nicknames[source_index])
+        self.set_score(index, source.scores[source_index])
+        self.positions[index] = source.positions[source_index]
+        self.wrong_streaks[index] = source.wrong_streaks[source_index]
+        self.disqualified[index] = source.disqualified[source_index]
+        source.free_row(source_index)
+
+        player._table, player._index = self, index
+        self.players[index] = player
+
+    def release(self, player: "Player"):
+        """Detach a player from this table, keeping its values, e.g. when leaving a room"""
+        if player._table is self:
+            index = player._index
+            player._table = _DetachedRow(self.nicknames[index], self.scores[index], self.positions[index],
+                                         self.wrong_streaks[index], self.disqualified[index])
+            player._index = 0
+            self.free_row(index)
+
+    def free_row(self, index: int):
+        if self.leaderboard is not None:
+            self.leaderboard.remove(index, self.scores[index])
+        self.players[index] = None
+        self.nicknames[index] = None
+        self._free.append(index)
+
+    def reset(self):
+        """Reset race stats of every player in the table at once"""
+        count = len(self.players)
+        self.scores = array("i", [0]) * count
+        self.positions = array("i", [1]) * count
+        self.wrong_streaks = array("i", [0]) * count
+        self.disqualified = bytearray(count)
+        if self.leaderboard is not None:
+            self._build_leaderboard()
+
+    def set_score(self, index: int, score: int):
+        if self.leaderboard is not None:
+            self.leaderboard.move(index, self.scores[index], score)
+        self.scores[index] = score
+
+    def rank(self, player: "Player") -> int:
+        """Tie-aware race position of a player: 1 + players with a higher score"""
+        score = self.scores[player._index]
+        if self.leaderboard is not None:
+            return self.leaderboard.rank(score)
+        return 1 + sum(1 for other in self if other.score > score)
+
+    def top(self, k: int) -> List["Player"]:
+        """The k leading players, ties broken by nickname"""
+        if self.leaderboard is None:
+            return sorted(self, key=lambda p: (-p.score, p.nickname or ""))[:k]
+        rows = self.leaderboard.top(k, order=lambda index: self.nicknames[index] or "")
+        return [self.players[index] for index in rows if self.players[index] is not None]
+
+
+class _DetachedRow:
+    """
+    Stand-in table holding the single row of a player outside any room: one
+    short list per column and no leaderboard, until a PlayerTable adopts it.
+    """
+
+    __slots__ = ("nicknames", "scores", "positions", "wrong_streaks", "disqualified")
+
+    def __init__(self, nickname: Optional[str] = None, score: int = 0, position: int = 1,
+                 wrong_streak: int = 0, disqualified: int = 0):
+        self.nicknames = [nickname]
+        self.scores = [score]
+        self.positions = [position]
+        self.wrong_streaks = [wrong_streak]
+        self.disqualified = [disqualified]
+
+    def set_score(self, index: int, score: int):
+        self.scores[index] = score
+
+    def free_row(self, index: int):
+        pass
+
+
+class Player:
+    """
+    Lightweight view of one row of a PlayerTable.
+    A player created on its own holds a detached row until a room adopts it.
+    """
+
+    __slots__ = ("_table", "_index")
+
     def __init__(self, nickname: str = None):
-        self.nickname = nickname
-        self.score = 0
-        self.position = 1
-        self.wrong_streak = 0
-    
+        self._table = _DetachedRow(nickname)
+        self._index = 0
+
+    @property
+    def nickname(self) -> Optional[str]:
+        return self._table.nicknames[self._index]
+
+    @nickname.setter
+    def nickname(self, value: Optional[str]):
+        self._table.nicknames[self._index] = value
+
+    @property
+    def score(self) -> int:
+        return self._table.scores[self._index]
+
+    @score.setter
+    def score(self, value: int):
+        self._table.set_score(self._index, value)
+
+    @property
+    def position(self) -> int:
+        return self._table.positions[self._index]
+
+    @position.setter
+    def position(self, value: int):
+        self._table.positions[self._index] = value
+
+    @property
+    def wrong_streak(self) -> int:
+        return self._table.wrong_streaks[self._index]
+
+    @wrong_streak.setter
+    def wrong_streak(self, value: int):
+        self._table.wrong_streaks[self._index] = value
+
+    @property
+    def disqualified(self) -> bool:
+        """Out of the current race, still connected"""
+        return bool(self._table.disqualified[self._index])
+
+    @disqualified.setter
+    def disqualified(self, value: bool):
+        self._table.disqualified[self._index] = 1 if value else 0
+
     def reset(self):
         """Reset player stats for a new game"""
         self.score = 0
         self.position = 1
         self.wrong_streak = 0
-    
+        self.disqualified = False
+
     def add_score(self, points: int):
         """Add points to player score"""
         self.score += points
-        self.position = max(1, 1 + self.score)
-    
+
     def penalize(self):
         """Apply penalty for wrong answer or timeout"""
         self.score -= 1
         self.wrong_streak += 1
-    
+
     def reset_wrong_streak(self):
         """Reset wrong answer streak"""
         self.wrong_streak = 0
-    
+
     def to_dict(self) -> Dict[str, Any]:
         """Convert player to dictionary representation"""
         return {
             "nickname": self.nickname,
             "score": self.score,
             "position": self.position,
-            "wrong_streak": self.wrong_streak
+            "wrong_streak": self.wrong_streak,
+            "disqualified": self.disqualified
         }
-    
+
     def __str__(self) -> str:
         return f"Player({self.nickname}, score={self.score}, pos={self.position})"
@@ -1,212 +1,124 @@
-import time
-from typing import Dict, List, Tuple, Any
-from config.settings import MAX_WRONG_STREAK, BASE_POINTS, PENALTY_POINTS
-from .player import Player
+import logging
+from typing import Dict, List, Any, Optional
+from src.utils.messaging import MessageType, OUTCOME_TIMEOUT
+from src.utils.log import get_logger
+from .player import PlayerTable
+from .scoring import RoundScores, score_round
+
+log = get_logger("round")
+
+
+class RoundDigest:
+    """
+    Everything a round produced for the players, assembled once.
+    `shared` messages go to every player; `personal` messages are per connection
+    and are delivered ahead of the shared part in the same write.
+    Plain strings are text messages.
+    """
+
+    def __init__(self):
+        self.shared: List[Any] = []
+        self.personal: Dict[Any, List[Any]] = {}
+        self.continue_game = True
+
+    def add_personal(self, sock, message):
+        self.personal.setdefault(sock, []).append(message)
 
 
 class RoundProcessor:
     """Handles processing of game rounds and scoring"""
-    
+
     @staticmethod
-    def process_round(game_state, players: Dict, broadcast_callback) -> bool:
-        print(f"[RoundProcessor] Processing round for {len(players)} players")
-        penalties = 0
-        correct_answers = []
-        fastest = None
-        fastest_time = float('inf')
-        round_results = []
-        disconnected_players = []
+    def process_round(game_state, players: Dict, table: Optional[PlayerTable] = None) -> RoundDigest:
+        log.debug("Processing round for %d players", len(players))
+        digest = RoundDigest()
+        scores = score_round(game_state, players)
 
-        # Process all players who didn't respond (timeout)
-        for sock, player in players.items():
-            if sock not in game_state.responses:
-                player.penalize()
-                penalties += 1
-                round_results.append(f"{player.nickname}: timeout (5.0s)")
-                # Send individual feedback for timeout
-                RoundProcessor._send_individual_feedback(sock, player, game_state, False, -1)
-                if player.wrong_streak >= MAX_WRONG_STREAK:
-                    broadcast_callback(f"Player {player.nickname} disqualified!")
-                    disconnected_players.append(sock)
-
-        # Process responses
-        for sock, (response_time, answer) in game_state.responses.items():
-            if sock not in players:
-                continue
-                
-            player = players[sock]
-            try:
-                user_answer = int(answer)
-                is_correct = user_answer == game_state.current_answer
-            except ValueError:
-                is_correct = False
-
-            response_delay = response_time - game_state.round_start_time
-            if is_correct:
-                correct_answers.append((sock, response_delay))
-                if response_delay < fastest_time:
-                    fastest_time = response_delay
-                    fastest = sock
-                round_results.append(f"{player.nickname}: {answer} ({response_delay:.1f}s)")
-                # Send individual feedback for correct answer (points will be calculated later)
-                RoundProcessor._send_individual_feedback(sock, player, game_state, True, 1, response_delay)
-            else:
-                player.penalize()
-                penalties += 1
-                round_results.append(f"{player.nickname}: {answer} ({response_delay:.1f}s)")
-                # Send individual feedback for wrong answer
-                RoundProcessor._send_individual_feedback(sock, player, game_state, False, -1, response_delay)
-                if player.wrong_streak >= MAX_WRONG_STREAK:
-                    broadcast_callback(f"Player {player.nickname} disqualified!")
-                    disconnected_players.append(sock)
-
-        # Award points to correct answers
-        for sock, _ in correct_answers:
-            if sock not in players:
-                continue
-                
-            player = players[sock]
-            if sock == fastest:
-                points_earned = BASE_POINTS + penalties  # Base point + penalty points
-                player.add_score(points_earned)
-                round_results.append(f"  → {player.nickname} fastest: +{points_earned} points")
-                # Update the feedback with actual points earned for fastest player
-                try:
-                    from src.utils.messaging import create_message
-                    sock.send(create_message(f"Correct! +{points_earned} points"))
-                except:
-                    pass
-            else:
-                player.add_score(BASE_POINTS)
-            player.reset_wrong_streak()
+        for result in scores.disqualified:
+            digest.shared.append((MessageType.DISQUALIFIED, {"nickname": result.player.nickname}))
 
         # Update positions after all score changes
-        RoundProcessor._update_positions(players)
-        
-        # Send updated positions to all players
-        for sock, player in players.items():
-            try:
-                from src.utils.messaging import create_message
-                sock.send(create_message(f"Your position: {player.position}"))
-            except:
-                pass
+        RoundProcessor._update_positions(players, table)
+
+        # Personal part of the digest: feedback and updated position
+        for result in scores.results:
+            digest.add_personal(result.sock, (MessageType.FEEDBACK, {"outcome": result.outcome, "points": result.points}))
+            digest.add_personal(result.sock, (MessageType.POSITION, {"position": result.player.position}))
 
         # Check for winner
-        winner = game_state.has_winner(players)
+        winner = game_state.has_winner(players, table)
         if winner:
-            broadcast_callback(f"Race ended! Winner: {winner.nickname}")
-            return False
+            digest.shared.append((MessageType.RACE_ENDED, {"winner": winner.nickname}))
+            digest.continue_game = False
+            return digest
+
+        # Shared results
+        RoundProcessor._report_results(game_state, scores, players, digest)
 
-        # Broadcast results
-        RoundProcessor._broadcast_results(game_state, round_results, players, broadcast_callback)
-        
-        return True
+        if all(player.disqualified for player in players.values()):
+            digest.shared.append("All players disqualified. Race over!")
+            digest.continue_game = False
+
+        return digest
 
     @staticmethod
-    def _broadcast_results(game_state, round_results: List[str], players: Dict, broadcast_callback):
-        """Broadcast round results to all players"""
-        print("Received:")
-        for result in round_results:
-            print(result)
-        
-        # Calculate points changes for this round
+    def _report_results(game_state, scores: RoundScores, players: Dict, digest: RoundDigest):
+        """Add the round results shared by all players to the digest"""
+        round_results = []
+        for result in scores.results:
+            if result.outcome == OUTCOME_TIMEOUT:
+                round_results.append(f"{result.player.nickname}: timeout (5.0s)")
+            else:
+                round_results.append(f"{result.player.nickname}: {result.answer} ({result.delay:.1f}s)")
+        if scores.fastest is not None:
+            round_results.append(f"  → {scores.fastest.player.nickname} fastest: +{scores.fastest.points} points")
+
+        # Points changes come straight from the scoring pass; players
+        # disqualified in an earlier round are out of it
+        points = {result.sock: result.points for result in scores.results}
         points_changes = []
         positions_info = []
-        
         for sock, player in players.items():
-            # Determine points change for this round
-            points_change = 0
-            if sock in game_state.responses:
-                response_time, answer = game_state.responses[sock]
-                try:
-                    user_answer = int(answer)
-                    is_correct = user_answer == game_state.current_answer
-                    if is_correct:
-                        # Find if this was the fastest correct answer
-                        correct_responses = []
-                        for s, (rt, ans) in game_state.responses.items():
-                            if s in players:
-                                try:
-                                    if int(ans) == game_state.current_answer:
-                                        correct_responses.append((s, rt))
-                                except ValueError:
-                                    pass
-                        
-                        if correct_responses:
-                            fastest_sock = min(correct_responses, key=lambda x: x[1])[0]
-                            penalties = sum(1 for p in players.values() if p.wrong_streak > 0)
-                            if sock == fastest_sock:
-                                points_change = BASE_POINTS + penalties
-                            else:
-                                points_change = BASE_POINTS
-                    else:
-                        points_change = -1
-                except ValueError:
-                    points_change = -1
-            else:
-                # Timeout
-                points_change = -1
-            
-            # Format points change
-            if points_change > 0:
-                points_changes.append(f"{player.nickname} +{points_change}")
+            if sock not in points:
+                points_changes.append(f"{player.nickname} out")
+            elif points[sock] > 0:
+                points_changes.append(f"{player.nickname} +{points[sock]}")
             else:
-                points_changes.append(f"{player.nickname} {points_change}")
-            
+                points_changes.append(f"{player.nickname} {points[sock]}")
             positions_info.append(f"{player.nickname} → {player.position}")
-        
-        # Print server-side results
-        print("Points:")
-        print(" | ".join(points_changes))
-        print("Positions:")
-        for pos_info in positions_info:
-            print(pos_info)
-        
-        # Broadcast to clients
-        broadcast_callback(f"Correct answer: {game_state.current_answer}")
-        broadcast_callback("Received:")
-        for result in round_results:
-            broadcast_callback(result)
-
-        broadcast_callback("Points:")
-        broadcast_callback(" | ".join(points_changes))
-        
-        broadcast_callback("Positions:")
-        for pos_info in positions_info:
-            broadcast_callback(pos_info)
 
-    @staticmethod
-    def _send_individual_feedback(sock, player, game_state, is_correct: bool, points_change: int, response_time: float = None):
-        """Send individual feedback to a player"""
-        try:
-            from src.utils.messaging import create_message
-            
-            if is_correct:
-                if points_change > 1:
-                    message = f"Correct! +{points_change} points"
-                else:
-                    message = f"Correct! +{points_change} point"
-            else:
-                if points_change < 0:
-                    if points_change == -1:
-                        message = f"Incorrect! {points_change} point"
-                    else:
-                        message = f"Incorrect! {points_change} points"
-                else:
-                    message = "Time's up! -1 point"
-            
-            sock.send(create_message(message))
-            
-        except Exception as e:
-            # Silent failure for network issues
-            pass
+        # Server-side results, one record per round and only when asked for
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("Round %d results\nReceived:\n%s\nPoints:\n%s\nPositions:\n%s",
+                      game_state.round_number, "\n".join(round_results),
+                      " | ".join(points_changes), "\n".join(positions_info))
+
+        # Shared lines for clients
+        digest.shared.append((MessageType.CORRECT_ANSWER, {"answer": game_state.current_answer}))
+        digest.shared.append("Received:")
+        digest.shared.extend(round_results)
+
+        digest.shared.append("Points:")
+        digest.shared.append(" | ".join(points_changes))
+
+        digest.shared.append("Positions:")
+        digest.shared.extend(positions_info)
 
     @staticmethod
-    def _update_positions(players: Dict):
-        """Update player positions based on their scores"""
-        # Sort players by score (descending) and then by nickname (ascending) for tie-breaking
+    def _update_positions(players: Dict, table: Optional[PlayerTable] = None):
+        """
+        Update player positions based on their scores.
+        Tied players share a position and the next one skips (1, 1, 3).
+        """
+        if table is not None and table.leaderboard is not None:
+            # Large tables maintain ranks incrementally as scores change
+            for player in players.values():
+                player.position = table.rank(player)
+            return
+
+        # Room-sized tables and players outside a table: rank by sorting
         sorted_players = sorted(players.values(), key=lambda p: (-p.score, p.nickname))
-        
+
         # Assign positions
         current_position = 1
         for i, player in enumerate(sorted_players):
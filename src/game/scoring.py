@@ -0,0 +1,83 @@
+"""
+Round scoring for Racing Arena: every answer is judged exactly once
+"""
+from typing import Any, Dict, List, Optional
+from config.settings import MAX_WRONG_STREAK, BASE_POINTS, PENALTY_POINTS
+from src.utils.messaging import OUTCOME_CORRECT, OUTCOME_INCORRECT, OUTCOME_TIMEOUT
+from .player import Player
+
+
+class PlayerResult:
+    """How one player did in a round"""
+
+    __slots__ = ("sock", "player", "answer", "delay", "outcome", "points")
+
+    def __init__(self, sock, player: Player, answer: Any, delay: Optional[float], outcome: int):
+        self.sock = sock
+        self.player = player
+        self.answer = answer  # As submitted, for the report
+        self.delay = delay  # Seconds after the round started; None on timeout
+        self.outcome = outcome
+        self.points = 0
+
+
+class RoundScores:
+    """Outcome of a round, shared by the state update and the round report"""
+
+    def __init__(self):
+        self.results: List[PlayerResult] = []  # Active players in seat order
+        self.fastest: Optional[PlayerResult] = None
+        self.penalties = 0  # Wrong answers and timeouts, paid to the fastest player
+        self.disqualified: List[PlayerResult] = []
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+
+def score_round(game_state, players: Dict) -> RoundScores:
+    """
+    Judge every active player's answer, then apply the score changes.
+    Players disqualified in an earlier round are skipped entirely.
+    """
+    scores = RoundScores()
+    responses = game_state.responses
+    expected = game_state.current_answer
+    started = game_state.round_start_time
+    correct: List[PlayerResult] = []
+
+    for sock, player in players.items():
+        if player.disqualified:
+            continue
+
+        response = responses.get(sock)
+        if response is None:
+            result = PlayerResult(sock, player, None, None, OUTCOME_TIMEOUT)
+        else:
+            # Answers were parsed and validated when they arrived
+            delay = response.received_at - started
+            if response.value is not None and response.value == expected:
+                result = PlayerResult(sock, player, response.text, delay, OUTCOME_CORRECT)
+                correct.append(result)
+                if scores.fastest is None or delay < scores.fastest.delay:
+                    scores.fastest = result
+            else:
+                result = PlayerResult(sock, player, response.text, delay, OUTCOME_INCORRECT)
+        scores.results.append(result)
+
+    # The penalty pool is only known once everyone has been judged
+    scores.penalties = len(scores.results) - len(correct)
+
+    for result in scores.results:
+        player = result.player
+        if result.outcome == OUTCOME_CORRECT:
+            result.points = BASE_POINTS + scores.penalties if result is scores.fastest else BASE_POINTS
+            player.add_score(result.points)
+            player.reset_wrong_streak()
+        else:
+            result.points = PENALTY_POINTS
+            player.penalize()
+            if player.wrong_streak >= MAX_WRONG_STREAK:
+                player.disqualified = True
+                scores.disqualified.append(result)
+
+    return scores
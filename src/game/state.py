@@ -3,24 +3,57 @@ Game state management for Racing Arena
 """
 import random
 import time
-from typing import Dict, List, Tuple
-from config.settings import MIN_TRACK_LENGTH, MAX_TRACK_LENGTH, TIME_LIMIT, MAX_WRONG_STREAK, BASE_POINTS, PENALTY_POINTS
-from .player import Player
-from .expressions import ExpressionGenerator
+from typing import Dict, Optional
+from config.settings import MIN_TRACK_LENGTH, MAX_TRACK_LENGTH, TIME_LIMIT, MAX_ANSWER_LENGTH
+from src.utils.log import get_logger
+from src.utils.messaging import parse_answer
+from .player import Player, PlayerTable
+from .expressions import ExpressionPool, shared_pool
+
+log = get_logger("game")
+
+
+# Outcomes of GameState.add_response
+RESPONSE_ACCEPTED = "accepted"
+RESPONSE_DUPLICATE = "duplicate"  # The player already answered this round
+RESPONSE_TOO_LONG = "too_long"
+
+
+class Response:
+    """
+    A player's answer, validated once when it arrives.
+    `value` is the parsed integer, or None for an answer that isn't a number.
+    """
+
+    __slots__ = ("value", "text", "received_at")
+
+    def __init__(self, value: Optional[int], text: str, received_at: float):
+        self.value = value
+        self.text = text  # As submitted, for the round report
+        self.received_at = received_at  # time.monotonic()
+
+    @property
+    def valid(self) -> bool:
+        return self.value is not None
+
+    @classmethod
+    def parse(cls, answer, received_at: float) -> "Response":
+        return cls(parse_answer(answer), str(answer), received_at)
 
 
 class GameState:
     
-    def __init__(self):
+    def __init__(self, expression_pool: Optional[ExpressionPool] = None):
         self.track_length = random.randint(MIN_TRACK_LENGTH, MAX_TRACK_LENGTH)
         self.game_started = False
         self.current_expression = None
         self.current_answer = None
+        self.current_message = None  # Pre-encoded "Solve:" message of the round
         self.round_start_time = None
         self.time_limit = TIME_LIMIT
-        self.responses = {}  # socket: (time, answer)
+        self.responses: Dict[object, Response] = {}  # socket: first answer this round
         self.round_number = 0
-        self.expression_generator = ExpressionGenerator()
+        self.expression_pool = expression_pool if expression_pool is not None else shared_pool()
     
     def reset_game(self):
         """Reset game state for a new race"""
@@ -28,6 +61,7 @@ class GameState:
         self.game_started = False
         self.current_expression = None
         self.current_answer = None
+        self.current_message = None
         self.round_start_time = None
         self.responses.clear()
         self.round_number = 0
@@ -36,30 +70,49 @@ class GameState:
         """Start a new game"""
         self.game_started = True
         self.round_number = 0
-        print(f"[Server] Race starting with track length: {self.track_length}")
+        log.debug("Race starting with track length: %d", self.track_length)
     
     def new_round(self):
         """Start a new round"""
         self.responses.clear()
-        self.current_expression, self.current_answer = self.expression_generator.generate()
-        self.round_start_time = time.time()
+        expression = self.expression_pool.next()
+        self.current_expression = expression.text
+        self.current_answer = expression.answer
+        self.current_message = expression.message
+        self.round_start_time = time.monotonic()
         self.round_number += 1
-        print(f"[Round {self.round_number}]")
-        print(f"Sent expression: {self.current_expression}")
+        log.debug("Round %d: sent expression %s", self.round_number, self.current_expression)
     
     def is_round_timeout(self) -> bool:
         """Check if current round has timed out"""
         if not self.round_start_time:
             return False
-        return time.time() - self.round_start_time >= self.time_limit
+        return time.monotonic() - self.round_start_time >= self.time_limit
     
-    def add_response(self, client_socket, answer: str):
-        """Add a player response"""
-        self.responses[client_socket] = (time.time(), answer)
+    def add_response(self, client_socket, answer) -> str:
+        """
+        Validate and record a player's answer.
+        The first answer of a round counts; later ones and oversized ones are rejected.
+        """
+        if client_socket in self.responses:
+            return RESPONSE_DUPLICATE
+        if isinstance(answer, str) and len(answer) > MAX_ANSWER_LENGTH:
+            return RESPONSE_TOO_LONG
+        self.responses[client_socket] = Response.parse(answer, time.monotonic())
+        return RESPONSE_ACCEPTED
     
-    def has_winner(self, players: Dict) -> Player:
-        """Check if any player has won the race"""
-        for player in players.values():
-            if player.position >= self.track_length:
-                return player
+    def has_winner(self, players: Dict, table: Optional[PlayerTable] = None) -> Optional[Player]:
+        """
+        Check if any player has crossed the finish line.
+        A player's track position is 1 + score; the leader wins, ties going to
+        the first nickname. A PlayerTable large enough to keep a leaderboard
+        gives the leader straight from it instead of a scan.
+        """
+        if table is not None and table.leaderboard is not None:
+            leaders = table.top(1)
+            leader = leaders[0] if leaders else None
+        else:
+            leader = min(players.values(), key=lambda p: (-p.score, p.nickname or ""), default=None)
+        if leader is not None and 1 + leader.score >= self.track_length:
+            return leader
         return None
@@ -1,7 +1,26 @@
 """
 Server package for Racing Arena
 """
+import importlib
 
-from .racing_server import RacingServer
+# Imported on first access: the select server needs neither asyncio nor multiprocessing
+_EXPORTS = {
+    'RacingServer': '.racing_server',
+    'AsyncRacingServer': '.async_server',
+    'WorkerSupervisor': '.supervisor',
+}
 
-__all__ = ['RacingServer']
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
@@ -0,0 +1,156 @@
+"""
+asyncio-based server engine for Racing Arena
+"""
+import asyncio
+import time
+from typing import Callable, Optional
+from config.settings import BUFFER_SIZE, OUTBOUND_HIGH_WATER_MARK
+from src.utils.log import get_logger
+from .racing_server import RacingServer
+from .connection import MessageSender
+
+log = get_logger("server")
+
+
+class StreamConnection(MessageSender):
+    """Socket-like wrapper around an asyncio StreamWriter"""
+
+    def __init__(self, writer: asyncio.StreamWriter,
+                 on_overflow: Optional[Callable] = None,
+                 high_water_mark: int = OUTBOUND_HIGH_WATER_MARK,
+                 metrics=None):
+        self.writer = writer
+        self.high_water_mark = high_water_mark
+        self.overflowed = False
+        self._on_overflow = on_overflow
+        self.metrics = metrics
+
+    def send(self, data: bytes) -> int:
+        """Queue data on the transport; asyncio flushes it when writable"""
+        if self.overflowed:
+            return 0
+        self.writer.write(data)
+        pending = self.pending
+        if self.metrics is not None:
+            self.metrics.bytes_out.inc(len(data))
+            if pending:
+                # The transport could not hand everything to the kernel
+                self.metrics.send_would_block.inc()
+        if pending > self.high_water_mark:
+            self.overflowed = True
+            self.writer.transport.abort()
+            if self._on_overflow:
+                self._on_overflow(self)
+        return len(data)
+
+    @property
+    def pending(self) -> int:
+        """Number of bytes buffered in the transport"""
+        return self.writer.transport.get_write_buffer_size()
+
+    def flush(self) -> int:
+        # The transport drains itself; nothing to do synchronously
+        return self.pending
+
+    def close(self):
+        self.writer.close()
+
+    def fileno(self) -> int:
+        sock = self.writer.get_extra_info("socket")
+        return sock.fileno() if sock is not None else -1
+
+
+class AsyncRacingServer(RacingServer):
+    """
+    Racing Arena server driven by asyncio streams instead of select().
+    Game rules, registration and round processing are inherited unchanged;
+    only the I/O layer differs, so both engines can be compared under load.
+    """
+
+    def run(self):
+        log.info("Starting asyncio server...")
+        try:
+            asyncio.run(self._serve())
+        except KeyboardInterrupt:
+            log.info("Shutting down gracefully...")
+        except Exception as e:
+            log.exception("Unexpected error in main loop: %s", e)
+        self._shutdown()
+
+    async def _serve(self):
+        # Game deadlines live in the shared scheduler; one loop timer tracks the earliest
+        self._loop = asyncio.get_running_loop()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.scheduler.on_reschedule = self._arm_timer
+        self._arm_timer()  # Deadlines scheduled before the loop started
+        # Reuse the listening sockets bound in RacingServer.__init__
+        listener = await asyncio.start_server(self._serve_client, sock=self.server)
+        if self.stats_endpoint:
+            await asyncio.start_server(self._serve_stats, sock=self.stats_endpoint.listener)
+        async with listener:
+            try:
+                await listener.serve_forever()
+            finally:
+                self.scheduler.on_reschedule = None
+                if self._timer:
+                    self._timer.cancel()
+
+    def _arm_timer(self, deadline: Optional[float] = None):
+        """Wake the loop at the scheduler's earliest deadline, and only then"""
+        if deadline is None:
+            deadline = self.scheduler.next_deadline()
+        if self._timer:
+            self._timer.cancel()
+        # Both clocks are time.monotonic, so deadlines map onto loop time directly
+        self._timer = self._loop.call_at(deadline, self._run_timers) if deadline is not None else None
+
+    def _run_timers(self):
+        started = time.perf_counter()
+        self.metrics.loop_wakeups.inc()
+        self._timer = None
+        self._game_loop()
+        self._arm_timer()
+        self.metrics.loop_iteration.observe(time.perf_counter() - started)
+
+    def _schedule_removal(self, conn):
+        super()._schedule_removal(conn)
+        asyncio.get_running_loop().call_soon(self._reap_clients)
+
+    async def _serve_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        conn = StreamConnection(writer, on_overflow=self._schedule_removal, metrics=self.metrics)
+        if not self._admit_client(conn, writer.get_extra_info("peername")):
+            return
+
+        try:
+            while conn in self.clients:
+                data = await reader.read(BUFFER_SIZE)
+                if not data:
+                    break
+                started = time.perf_counter()
+                self.metrics.loop_wakeups.inc()
+                self._handle_incoming(conn, data)
+                self.metrics.loop_iteration.observe(time.perf_counter() - started)
+        except UnicodeDecodeError:
+            log.warning("Invalid UTF-8 data received from client")
+        except ConnectionResetError:
+            pass
+        except Exception as e:
+            log.error("Error handling client data: %s", e)
+        finally:
+            self.remove_client(conn)
+
+    async def _serve_stats(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Answer one metrics request from the endpoint's listener"""
+        try:
+            request = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError as e:
+            request = e.partial
+        except asyncio.LimitOverrunError:
+            request = b""
+        try:
+            writer.write(self.stats_endpoint.respond(request))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,109 @@
+"""
+Buffered client connection for the select() server engine
+"""
+import socket
+from typing import Callable, Optional, Union
+from config.settings import OUTBOUND_HIGH_WATER_MARK
+from src.utils.messaging import JSON_CODEC, Message, as_message
+
+
+class MessageSender:
+    """
+    Typed-message sending shared by connection wrappers.
+    Messages are encoded with the codec negotiated for this connection.
+    """
+    codec = JSON_CODEC
+    metrics = None  # ServerMetrics of the owning server, if any
+
+    def send_message(self, message: Union[str, Message]) -> int:
+        msg_type, fields = as_message(message)
+        if self.metrics is not None:
+            self.metrics.messages_out.inc()
+        return self.send(self.codec.encode(msg_type, fields))
+
+
+class ClientConnection(MessageSender):
+    """
+    Non-blocking client socket with a per-connection outbound queue.
+
+    send() never drops data: whatever the kernel does not accept right away is
+    kept in the queue and flushed once the socket becomes writable. A client
+    whose queue grows past the high-water mark is reported as overflowed so
+    the server can disconnect it instead of buffering forever.
+    """
+
+    def __init__(self, sock: socket.socket, addr=None,
+                 on_pending: Optional[Callable] = None,
+                 on_overflow: Optional[Callable] = None,
+                 high_water_mark: int = OUTBOUND_HIGH_WATER_MARK,
+                 metrics=None):
+        self.sock = sock
+        self.addr = addr
+        self.outbound = bytearray()
+        self.high_water_mark = high_water_mark
+        self.overflowed = False
+        self._on_pending = on_pending
+        self._on_overflow = on_overflow
+        self.metrics = metrics
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    def recv(self, size: int) -> bytes:
+        return self.sock.recv(size)
+
+    def send(self, data: bytes) -> int:
+        """Queue data for delivery, writing straight through when the queue is empty"""
+        if self.overflowed:
+            return 0
+        if self.metrics is not None:
+            self.metrics.bytes_out.inc(len(data))
+
+        view = memoryview(data)
+        if not self.outbound:
+            try:
+                sent = self.sock.send(view)
+            except BlockingIOError:
+                sent = 0
+            if sent == len(view):
+                return sent
+            if self.metrics is not None:
+                self.metrics.send_would_block.inc()
+            view = view[sent:]
+            if self._on_pending:
+                self._on_pending(self)
+
+        self.outbound += view
+        if len(self.outbound) > self.high_water_mark:
+            # Hopelessly slow consumer - stop buffering and let the server drop it
+            self.overflowed = True
+            self.outbound.clear()
+            if self._on_overflow:
+                self._on_overflow(self)
+        return len(data)
+
+    @property
+    def pending(self) -> int:
+        """Number of bytes waiting to be written"""
+        return len(self.outbound)
+
+    def flush(self) -> int:
+        """
+        Write as much of the queue as the socket accepts.
+        Returns the number of bytes still pending.
+        """
+        while self.outbound:
+            try:
+                sent = self.sock.send(self.outbound)
+            except BlockingIOError:
+                sent = 0
+            if not sent:
+                if self.metrics is not None:
+                    self.metrics.send_would_block.inc()
+                break
+            del self.outbound[:sent]
+        return len(self.outbound)
+
+    def close(self):
+        self.outbound.clear()
+        self.sock.close()
@@ -0,0 +1,256 @@
+"""
+Server metrics for Racing Arena: in-process registry and a localhost stats endpoint
+"""
+import bisect
+import socket
+from typing import Callable, Dict, List, Optional, Sequence, Union
+from urllib.parse import parse_qs, urlsplit
+from config.settings import STATS_HOST
+
+# Seconds; from a quick callback up to a round that stalls the loop
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+                   0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MAX_REQUEST_SIZE = 8192
+
+Number = Union[int, float]
+
+
+class Counter:
+    """Monotonically increasing value, or one read from `fn` at scrape time"""
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, fn: Optional[Callable[[], Number]] = None):
+        self.name = name
+        self.description = description
+        self._fn = fn
+        self._value = 0
+
+    def inc(self, amount: Number = 1):
+        self._value += amount
+
+    @property
+    def value(self) -> Number:
+        return self._fn() if self._fn else self._value
+
+
+class Gauge(Counter):
+    """Value that goes up and down"""
+    kind = "gauge"
+
+    def set(self, value: Number):
+        self._value = value
+
+
+class Histogram:
+    """Cumulative-bucket histogram, as Prometheus expects"""
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile; inf past the last bucket"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    """Named metrics of one server, rendered as plain text or Prometheus exposition format"""
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self.metrics: Dict[str, Union[Counter, Gauge, Histogram]] = {}
+
+    def _register(self, metric):
+        metric.name = self.prefix + metric.name
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, fn: Optional[Callable[[], Number]] = None) -> Counter:
+        return self._register(Counter(name, description, fn))
+
+    def gauge(self, name: str, description: str, fn: Optional[Callable[[], Number]] = None) -> Gauge:
+        return self._register(Gauge(name, description, fn))
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, description, buckets))
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.description}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            if isinstance(metric, Histogram):
+                cumulative = 0
+                for bound, count in zip(metric.buckets, metric.counts):
+                    cumulative += count
+                    lines.append(f'{metric.name}_bucket{{le="{bound:g}"}} {cumulative}')
+                lines.append(f'{metric.name}_bucket{{le="+Inf"}} {metric.count}')
+                lines.append(f"{metric.name}_sum {metric.sum:.9g}")
+                lines.append(f"{metric.name}_count {metric.count}")
+            else:
+                lines.append(f"{metric.name} {_format_value(metric.value)}")
+        return "\n".join(lines) + "\n"
+
+    def render_text(self) -> str:
+        width = max((len(name) for name in self.metrics), default=0)
+        lines = []
+        for name, metric in self.metrics.items():
+            if isinstance(metric, Histogram):
+                if metric.count:
+                    detail = (f"count {metric.count}  mean {_format_seconds(metric.sum / metric.count)}"
+                              f"  p50 <= {_format_seconds(metric.quantile(0.5))}"
+                              f"  p99 <= {_format_seconds(metric.quantile(0.99))}")
+                else:
+                    detail = "count 0"
+                lines.append(f"{name:<{width}}  {detail}")
+            else:
+                lines.append(f"{name:<{width}}  {_format_value(metric.value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: Number) -> str:
+    return str(value) if isinstance(value, int) else f"{value:.9g}"
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds == float("inf"):
+        return "inf"
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 0.001:
+        return f"{seconds * 1000:.2f}ms"
+    return f"{seconds * 1_000_000:.0f}us"
+
+
+class ServerMetrics:
+    """
+    The instruments a RacingServer and its rooms record into.
+    Gauges that describe server state are registered by the server with a
+    callback, so they cost nothing until the endpoint is scraped.
+    """
+
+    def __init__(self):
+        self.registry = MetricsRegistry(prefix="racing_")
+        registry = self.registry
+        self.loop_iteration = registry.histogram(
+            "loop_iteration_seconds", "Time spent handling one event-loop wakeup")
+        self.loop_wakeups = registry.counter(
+            "loop_wakeups_total", "Event-loop wakeups (select returns, or asyncio reads and timers)")
+        self.timer_lag = registry.histogram(
+            "timer_lag_seconds", "Delay between a scheduled deadline and the loop running it")
+        self.round_processing = registry.histogram(
+            "round_processing_seconds", "Time to score a round and deliver its results")
+        self.bytes_in = registry.counter("bytes_in_total", "Bytes received from clients")
+        self.messages_in = registry.counter("messages_in_total", "Messages decoded from clients")
+        self.bytes_out = registry.counter("bytes_out_total", "Bytes queued for clients")
+        self.messages_out = registry.counter("messages_out_total", "Messages sent to clients")
+        self.send_would_block = registry.counter(
+            "send_would_block_total", "Sends the kernel could not take in full, leaving data queued")
+
+
+class StatsEndpoint:
+    """
+    Minimal HTTP endpoint on localhost serving the registry.
+
+    GET /metrics answers in Prometheus exposition format, GET / or /stats in
+    plain text; `?format=prometheus` or `?format=text` overrides either. The
+    listener is non-blocking and served by the server's own event loop, so
+    metrics are read without any locking.
+    """
+
+    def __init__(self, registry: MetricsRegistry, port: int, host: str = STATS_HOST):
+        self.registry = registry
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.setblocking(False)
+        self.listener.bind((host, port))
+        self.listener.listen(8)
+        self.address = self.listener.getsockname()
+        self._requests: Dict[socket.socket, bytearray] = {}  # Connections still sending headers
+
+    def sockets(self) -> List[socket.socket]:
+        return [self.listener, *self._requests]
+
+    def on_readable(self, sock: socket.socket):
+        """select() engine: accept scrapers and answer complete requests"""
+        if sock is self.listener:
+            while True:
+                try:
+                    conn, _ = self.listener.accept()
+                except (BlockingIOError, InterruptedError):
+                    return
+                conn.setblocking(False)
+                self._requests[conn] = bytearray()
+            return
+
+        buffer = self._requests[sock]
+        try:
+            data = sock.recv(MAX_REQUEST_SIZE)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b""
+        buffer += data
+        if data and b"\r\n\r\n" not in buffer and len(buffer) < MAX_REQUEST_SIZE:
+            return
+
+        del self._requests[sock]
+        try:
+            # A response is a few KB, well within the socket's send buffer
+            sock.send(self.respond(bytes(buffer)))
+        except OSError:
+            pass
+        sock.close()
+
+    def respond(self, request: bytes) -> bytes:
+        """Full HTTP response for a raw request"""
+        try:
+            method, target = request.split(b"\r\n", 1)[0].decode("latin-1").split()[:2]
+        except ValueError:
+            return _http_response(400, "Bad Request", "text/plain", "Bad request\n")
+        if method != "GET":
+            return _http_response(405, "Method Not Allowed", "text/plain", "Only GET is supported\n")
+
+        url = urlsplit(target)
+        if url.path not in ("/", "/stats", "/metrics"):
+            return _http_response(404, "Not Found", "text/plain", "Try /metrics or /stats\n")
+        default = "prometheus" if url.path == "/metrics" else "text"
+        output = parse_qs(url.query).get("format", [default])[0]
+        if output == "prometheus":
+            return _http_response(200, "OK", "text/plain; version=0.0.4; charset=utf-8",
+                                  self.registry.render_prometheus())
+        return _http_response(200, "OK", "text/plain; charset=utf-8", self.registry.render_text())
+
+    def close(self):
+        for sock in self.sockets():
+            sock.close()
+        self._requests.clear()
+
+
+def _http_response(status: int, reason: str, content_type: str, body: str) -> bytes:
+    payload = body.encode()
+    head = (f"HTTP/1.1 {status} {reason}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n")
+    return head.encode("latin-1") + payload
@@ -0,0 +1,320 @@
+"""
+Profiling for Racing Arena servers: deterministic (cProfile) or a sampling stack profiler,
+both attributing time to the game phase the loop was in
+
+Servers import this module for the phase markers alone, so cProfile and
+pstats are imported only once a deterministic profile is taken.
+"""
+import abc
+import io
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, List, Optional
+from config.settings import PROFILE_INTERVAL, PROFILE_OUTPUT, PROFILE_TOP
+from src.utils.log import get_logger
+from .scheduler import Scheduler
+
+if TYPE_CHECKING:
+    import cProfile
+    import pstats
+
+log = get_logger("profiler")
+
+PHASE_SERVER = "server"  # Loop, I/O and everything outside the phases below
+PHASE_REGISTRATION = "registration"
+PHASE_ROUND_OPEN = "round_open"
+PHASE_ROUND_PROCESSING = "round_processing"
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+_active: Optional["PhaseProfiler"] = None  # Receives phase changes while profiling
+
+
+class PhaseScope:
+    """`with phase(PHASE_...):` marks the enclosed work; free when not profiling"""
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        if _active is not None:
+            _active.enter_phase(self.name)
+
+    def __exit__(self, *exc_info):
+        if _active is not None:
+            _active.leave_phase()
+
+
+_scopes: Dict[str, PhaseScope] = {}
+
+
+def phase(name: str) -> PhaseScope:
+    scope = _scopes.get(name)
+    if scope is None:
+        scope = _scopes[name] = PhaseScope(name)
+    return scope
+
+
+class PhaseProfiler(abc.ABC):
+    """Tracks the phase stack of the profiled thread; subclasses record the time"""
+
+    def __init__(self):
+        self._phases = [PHASE_SERVER]
+        self.phase = PHASE_SERVER
+        self.running = False
+
+    def enter_phase(self, name: str):
+        self._phases.append(name)
+        self._switch(name)
+
+    def leave_phase(self):
+        # Scopes entered before profiling started have nothing to pop
+        if len(self._phases) > 1:
+            self._phases.pop()
+            self._switch(self._phases[-1])
+
+    def _switch(self, name: str):
+        self.phase = name
+
+    def start(self):
+        self.running = True
+
+    def stop(self):
+        self.running = False
+
+    @abc.abstractmethod
+    def dump(self, prefix: str) -> List[str]:
+        """Write the profile so far next to `prefix`; returns the paths written"""
+
+    @abc.abstractmethod
+    def summary(self) -> str:
+        """Top entries of the profile so far, for the log"""
+
+
+class SamplingProfiler(PhaseProfiler):
+    """
+    Low-overhead profiler: a background thread captures the profiled
+    thread's stack every `interval` seconds. The loop thread pays only for
+    phase changes; the stacks are walked on the sampler thread.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL, thread_id: Optional[int] = None):
+        super().__init__()
+        self.interval = interval
+        self.thread_id = thread_id
+        self.stacks: Counter = Counter()  # "phase;outer;...;inner" -> samples
+        self._labels: Dict[tuple, str] = {}  # (code object, line) -> frame label
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        super().start()
+        if self.thread_id is None:
+            self.thread_id = threading.get_ident()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        super().stop()
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.sample(frame, self.phase)
+
+    def sample(self, frame, phase_name: str):
+        labels = []
+        while frame is not None:
+            # Frames carry their current line, so time in C calls such as
+            # select() shows up on the line that made the call
+            key = (frame.f_code, frame.f_lineno)
+            label = self._labels.get(key)
+            if label is None:
+                label = self._labels[key] = _frame_label(*key)
+            labels.append(label)
+            frame = frame.f_back
+        labels.append(phase_name)
+        labels.reverse()
+        self.stacks[";".join(labels)] += 1
+
+    def collapsed(self) -> str:
+        """Stacks in the collapsed format read by flamegraph.pl, speedscope and inferno"""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(dict(self.stacks).items()))
+
+    def dump(self, prefix: str) -> List[str]:
+        path = prefix + ".collapsed"
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        return [path]
+
+    def summary(self) -> str:
+        per_phase: Counter = Counter()
+        for stack, count in dict(self.stacks).items():
+            per_phase[stack.split(";", 1)[0]] += count
+        total = sum(per_phase.values())
+        if not total:
+            return "no samples"
+        shares = ", ".join(f"{name} {count / total:.0%}" for name, count in per_phase.most_common())
+        return f"{total} samples ({shares})"
+
+
+class DeterministicProfiler(PhaseProfiler):
+    """
+    cProfile with one profile per phase, switched as the loop moves between
+    phases. Exact call counts at a cost of several times the normal runtime.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.profiles: Dict[str, "cProfile.Profile"] = {}
+
+    def _profile(self, name: str) -> "cProfile.Profile":
+        profile = self.profiles.get(name)
+        if profile is None:
+            import cProfile
+            profile = self.profiles[name] = cProfile.Profile()
+        return profile
+
+    def _switch(self, name: str):
+        if self.running and name != self.phase:
+            self._profile(self.phase).disable()
+            self._profile(name).enable()
+        self.phase = name
+
+    def start(self):
+        super().start()
+        self._profile(self.phase).enable()
+
+    def stop(self):
+        self._profile(self.phase).disable()
+        super().stop()
+
+    def _stats(self) -> Dict[str, "pstats.Stats"]:
+        import pstats
+        # Building stats disables a profile, so the current one is switched back on
+        stats = {name: pstats.Stats(profile) for name, profile in self.profiles.items()
+                 if profile.getstats()}
+        if self.running:
+            self._profile(self.phase).enable()
+        return stats
+
+    def dump(self, prefix: str) -> List[str]:
+        import pstats
+        stats = self._stats()
+        if not stats:
+            return []
+        merged = pstats.Stats()
+        report = io.StringIO()
+        for name, phase_stats in sorted(stats.items()):
+            merged.add(phase_stats)
+            report.write(f"=== phase: {name} ===\n")
+            phase_stats.stream = report
+            phase_stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP)
+
+        stats_path, report_path = prefix + ".pstats", prefix + ".txt"
+        merged.dump_stats(stats_path)
+        with open(report_path, "w") as f:
+            f.write(report.getvalue())
+        return [stats_path, report_path]
+
+    def summary(self) -> str:
+        totals = {name: sum(entry.inlinetime for entry in profile.getstats())
+                  for name, profile in self.profiles.items()}
+        total = sum(totals.values())
+        if not total:
+            return "no calls recorded"
+        shares = ", ".join(f"{name} {seconds / total:.0%}"
+                           for name, seconds in sorted(totals.items(), key=lambda item: -item[1]))
+        return f"{total:.2f}s profiled ({shares})"
+
+
+def _frame_label(code, line: int) -> str:
+    filename = code.co_filename
+    if filename.startswith(PROJECT_ROOT + os.sep):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({filename}:{line})".replace(";", ",")
+
+
+PROFILERS = {"sample": SamplingProfiler, "cprofile": DeterministicProfiler}
+
+
+class ProfileSession:
+    """
+    Runs one profiler over a window of a server's life.
+
+    Profiling starts `delay` seconds after `start()` and, with a `duration`,
+    stops by itself; both deadlines run on the server's scheduler, so start
+    and stop happen on the loop thread as cProfile requires. SIGUSR1 writes
+    a snapshot at any time and `finish()` writes the final profile.
+    """
+
+    def __init__(self, mode: str, output: str = PROFILE_OUTPUT,
+                 duration: Optional[float] = None, delay: float = 0.0):
+        self.mode = mode
+        self.output = output
+        self.duration = duration
+        self.delay = delay
+        self.profiler = PROFILERS[mode]()
+        self._scheduler: Optional[Scheduler] = None
+        self._finished = False
+
+    def start(self, scheduler: Scheduler):
+        self._scheduler = scheduler
+        if threading.current_thread() is threading.main_thread():
+            if hasattr(signal, "SIGUSR1"):
+                signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump())
+            if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+                # Stop like Ctrl-C so the profile is written on a plain kill
+                signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+        if self.delay > 0:
+            scheduler.call_later(self.delay, self._begin)
+        else:
+            self._begin()
+
+    def _begin(self):
+        global _active
+        if self._finished:
+            return
+        self.profiler.start()
+        _active = self.profiler
+        window = f"for {self.duration:g}s" if self.duration else "until exit"
+        log.info("Profiling (%s) %s; SIGUSR1 writes a snapshot to %s.*", self.mode, window, self.output)
+        if self.duration:
+            self._scheduler.call_later(self.duration, self.finish)
+
+    def dump(self) -> List[str]:
+        started = time.perf_counter()
+        paths = self.profiler.dump(self.output)
+        log.info("Profile written to %s in %.0fms: %s", ", ".join(paths) or "(nothing)",
+                 (time.perf_counter() - started) * 1000, self.profiler.summary())
+        return paths
+
+    def finish(self) -> List[str]:
+        """Stop profiling and write the profile; later calls do nothing"""
+        global _active
+        if self._finished:
+            return []
+        self._finished = True
+        if not self.profiler.running:
+            return []
+        _active = None
+        self.profiler.stop()
+        return self.dump()
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
@@ -1,71 +1,109 @@
-import socket
-import select
+import selectors
 import time
-from typing import Dict
+from typing import Dict, Optional, Set
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
 from config.settings import (
-    DEFAULT_HOST, DEFAULT_PORT, MIN_CLIENTS, MAX_CLIENTS, BUFFER_SIZE, 
-    SELECT_TIMEOUT, CONNECTION_BACKLOG, MAX_MESSAGE_SIZE
+    DEFAULT_HOST, DEFAULT_PORT, MAX_PORT_ATTEMPTS, MAX_CLIENTS, MAX_CONNECTIONS, MAX_ROOMS, BUFFER_SIZE, 
+    CONNECTION_BACKLOG, REGISTRATION_TIMEOUT, STATS_PORT
 )
-from src.utils import is_port_available, find_available_port, process_client_data, create_message, create_data_message
-from src.game import Player, GameState, RoundProcessor
+from src.utils import (
+    bind_listener, raise_file_limit, publish_address, unpublish_address, create_data_message,
+    MessageType, StreamDecoder, CODECS, PROTOCOL_JSON, PROTOCOL_BINARY, encode_messages
+)
+from src.game import Player
+from src.utils.log import get_logger
+from .connection import ClientConnection
+from .room import RoomManager
+from .scheduler import Scheduler, TimerHandle
+from .profiler import phase, PHASE_REGISTRATION, PHASE_ROUND_OPEN
+from .metrics import ServerMetrics, StatsEndpoint
+
+log = get_logger("server")
 
 
 class RacingServer:
     
-    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT):
-        # Check if the specified port is available
-        if not is_port_available(host, port):
-            print(f"[Server] Port {port} is already in use")
-            # Try to find an available port
-            available_port = find_available_port(host, port, 10)
-            if available_port:
-                print(f"[Server] Using alternative port: {available_port}")
-                port = available_port
-            else:
-                raise OSError(f"No available ports found starting from {port}")
-        
-        self.host = host
-        self.port = port
-        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        # Enable SO_REUSEADDR to avoid "Address already in use" errors
-        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-        self.server.setblocking(False)
-        
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, reuse_port: bool = False,
+                 stats_port: Optional[int] = STATS_PORT):
+        self.requested_port = port
+        # Bind once, moving up to the next free port when the requested one is taken
+        # (worker processes share one port on purpose, so they never fall back)
         try:
-            self.server.bind((host, port))
-            self.server.listen(CONNECTION_BACKLOG)
-            print(f"[Server] Successfully bound to {host}:{port}")
-            print(f"[Server] Non-blocking mode enabled with {CONNECTION_BACKLOG} connection backlog")
+            self.server = bind_listener(host, port, 1 if reuse_port else MAX_PORT_ATTEMPTS, reuse_port)
         except OSError as e:
-            print(f"[Server] Failed to bind to {host}:{port}: {e}")
+            log.error("Failed to bind to %s:%d: %s", host, port, e)
             raise
+        self.host = host
+        self.port = self.server.getsockname()[1]
+        if port and self.port != port:
+            log.warning("Port %d is already in use", port)
+            log.warning("Using alternative port: %d", self.port)
+        log.info("Successfully bound to %s:%d", host, self.port)
+        log.info("Non-blocking mode enabled with %d connection backlog", CONNECTION_BACKLOG)
+        # Tell local clients asking for the requested port where we really are
+        # (workers all bind the requested port, so there is nothing to publish)
+        self.runtime_file = None if reuse_port else publish_address(self.requested_port, host, self.port)
+        raise_file_limit(MAX_CONNECTIONS + 64)  # Every client holds a descriptor
             
-        self.clients: Dict[socket.socket, Player] = {}
-        self.client_buffers: Dict[socket.socket, str] = {}
-        self.game_state = GameState()
+        self.clients: Dict[ClientConnection, Player] = {}
+        self.client_buffers: Dict[ClientConnection, StreamDecoder] = {}
+        self.pending_writes: Set[ClientConnection] = set()  # Connections with queued output
+        self.pending_removals: Set[ClientConnection] = set()  # Slow consumers to drop
+        self.selector: Optional[selectors.BaseSelector] = None  # select() engine only, created by run()
+        self._stats_sockets: Set = set()  # Stats endpoint sockets registered with the selector
+        self.nicknames: Set[str] = set()  # Registered nicknames across all rooms
+        self.registration_timers: Dict[ClientConnection, TimerHandle] = {}  # Idle unregistered clients
+        self.scheduler = Scheduler()  # Round deadlines and idle timeouts for every room
+        self.metrics = ServerMetrics()
+        self.rooms = RoomManager(self.remove_client, scheduler=self.scheduler, metrics=self.metrics)
+        self._register_gauges()
+        
+        # Optional localhost HTTP endpoint serving the metrics, run by the same event loop
+        self.stats_endpoint: Optional[StatsEndpoint] = None
+        if stats_port is not None:
+            self.stats_endpoint = StatsEndpoint(self.metrics.registry, stats_port)
+            stats_host, stats_port = self.stats_endpoint.address
+            log.info("Metrics at http://%s:%d/metrics (text at /stats)", stats_host, stats_port)
+
+    def _register_gauges(self):
+        """Server state read at scrape time, so keeping it current costs nothing"""
+        registry = self.metrics.registry
+        registry.gauge("connected_clients", "Open client connections", lambda: len(self.clients))
+        registry.gauge("registered_players", "Players seated in a room", lambda: len(self.rooms.room_of))
+        registry.gauge("rooms", "Rooms currently open", lambda: len(self.rooms.rooms))
+        registry.gauge("races", "Rooms with a race in progress",
+                       lambda: sum(1 for room in self.rooms.rooms.values() if room.game_state.game_started))
+        registry.counter("rounds_total", "Rounds processed", lambda: self.rooms.rounds_processed)
+        registry.gauge("scheduled_timers", "Pending round, phase and registration deadlines",
+                       lambda: len(self.scheduler))
+        registry.gauge("outbound_queue_bytes", "Bytes queued for all clients",
+                       lambda: sum(conn.pending for conn in self.clients))
+        registry.gauge("outbound_queue_max_bytes", "Deepest outbound queue of a single client",
+                       lambda: max((conn.pending for conn in self.clients), default=0))
+        registry.gauge("outbound_queued_connections", "Clients with output waiting to be written",
+                       lambda: sum(1 for conn in self.clients if conn.pending))
 
     def broadcast(self, message: str):
-        message_data = create_message(message)
-        print(f"[Server] Broadcasting message: {message}")
+        log.debug("Broadcasting message: %s", message)
+        encoded = {}  # Encode once per wire protocol in use
         failed_clients = []
+        self.metrics.messages_out.inc(len(self.clients))
         
         for client in self.clients.keys():
             try:
+                message_data = encoded.get(client.codec)
+                if message_data is None:
+                    message_data = encoded[client.codec] = encode_messages(client.codec, [message])
+                # Queued on the connection; anything the kernel can't take now
+                # is flushed once the socket becomes writable
                 client.send(message_data)
-            except BlockingIOError:
-                # Send would block - client buffer is full
-                # Add to retry list or drop message depending on criticality
-                print(f"[Server] Warning: Message send would block for client")
-                # For now, we'll skip this client for this message
-                pass
             except (ConnectionResetError, BrokenPipeError):
                 # Client disconnected
                 failed_clients.append(client)
             except Exception as e:
-                print(f"[Server] Error broadcasting to client: {e}")
+                log.error("Error broadcasting to client: %s", e)
                 failed_clients.append(client)
         
         # Remove failed clients after iteration to avoid modifying dict during iteration
@@ -73,43 +111,52 @@ class RacingServer:
             self.remove_client(client)
 
     def run(self):
-        print("[Server] Starting non-blocking server...")
-        print(f"[Server] Monitoring {MAX_CLIENTS} max clients with {SELECT_TIMEOUT}s timeout")
+        log.info("Starting non-blocking server...")
+        log.info("Hosting up to %d rooms of %d players", MAX_ROOMS, MAX_CLIENTS)
+        
+        # epoll/kqueue where available: unlike select.select() it is not limited
+        # to descriptors below FD_SETSIZE (1024), and costs nothing per idle client
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.server, selectors.EVENT_READ)
+        self._watch_stats_sockets()
         
+        metrics = self.metrics
         try:
             while True:
-                # Use select() with timeout to prevent blocking
-                # This ensures the game loop runs at least every SELECT_TIMEOUT seconds
-                readable, writable, exceptional = select.select(
-                    [self.server] + list(self.clients.keys()),  # Input sockets to monitor
-                    [],  # Output sockets (none needed for this implementation)
-                    list(self.clients.keys()),  # Error sockets to monitor
-                    SELECT_TIMEOUT  # Timeout prevents blocking
-                )
+                # Sleep until I/O arrives or the nearest game deadline is due;
+                # an idle server with no races running blocks indefinitely
+                events = self.selector.select(self.scheduler.timeout())
+                woke_at = time.perf_counter()
+                metrics.loop_wakeups.inc()
                 
-                # Handle new connections (non-blocking)
-                if self.server in readable:
-                    self._handle_new_connection()
+                for key, mask in events:
+                    sock = key.fileobj
+                    if sock is self.server:
+                        # Handle new connections (non-blocking)
+                        self._handle_new_connection()
+                    elif sock in self.clients:
+                        # Handle client data, then flush queued output if the socket can take more
+                        # (an earlier event may already have removed the client)
+                        if mask & selectors.EVENT_READ:
+                            self._handle_client_data(sock)
+                        if mask & selectors.EVENT_WRITE and sock in self.clients:
+                            self._flush_client(sock)
+                    elif sock in self._stats_sockets:
+                        self.stats_endpoint.on_readable(sock)
+                        self._watch_stats_sockets()
                 
-                # Handle client data (non-blocking)
-                for sock in readable:
-                    if sock != self.server:
-                        self._handle_client_data(sock)
-                
-                # Handle socket errors/exceptions
-                for sock in exceptional:
-                    print(f"[Server] Socket exception detected, removing client")
-                    self.remove_client(sock)
-                
-                # Always run game loop regardless of socket activity
-                # This ensures game timing is never blocked by network operations
+                # Run round timeouts and other deadlines that are due
                 self._game_loop()
                 
+                # Drop slow consumers flagged while sending
+                self._reap_clients()
+                metrics.loop_iteration.observe(time.perf_counter() - woke_at)
+                
         except KeyboardInterrupt:
-            print("\n[Server] Shutting down gracefully...")
+            log.info("Shutting down gracefully...")
             self._shutdown()
         except Exception as e:
-            print(f"[Server] Unexpected error in main loop: {e}")
+            log.exception("Unexpected error in main loop: %s", e)
             self._shutdown()
 
     def _handle_new_connection(self):
@@ -121,231 +168,280 @@ class RacingServer:
                     
                     # Immediately set to non-blocking to prevent future blocking
                     client.setblocking(False)
-                    
-                    # Check client limit
-                    if len(self.clients) >= MAX_CLIENTS:
-                        print(f"[Server] Connection rejected: Max clients ({MAX_CLIENTS}) reached")
-                        try:
-                            client.send(create_message("Server full. Please try again later."))
-                            client.close()
-                        except:
-                            pass
-                        continue
-                    
-                    # Add client to tracking
-                    self.clients[client] = Player()
-                    self.client_buffers[client] = ""
-                    
-                    print(f"[Server] Player connected from {addr} ({len(self.clients)}/{MAX_CLIENTS})")
-                    
-                    # Send welcome message (non-blocking send)
-                    try:
-                        client.send(create_message("Welcome to Racing Arena! Enter your nickname:"))
-                    except BlockingIOError:
-                        # If send would block, client will receive welcome on next iteration
-                        pass
+                    conn = ClientConnection(
+                        client, addr,
+                        on_pending=self._want_write,
+                        on_overflow=self._schedule_removal,
+                        metrics=self.metrics
+                    )
+                    if self._admit_client(conn, addr):
+                        self._update_events(conn, register=True)
                     
                 except BlockingIOError:
                     # No more pending connections
                     break
                     
         except Exception as e:
-            print(f"[Server] Error in connection handling: {e}")
+            log.error("Error in connection handling: %s", e)
 
-    def _handle_client_data(self, sock: socket.socket):
+    def _admit_client(self, client, addr) -> bool:
+        """
+        Register a freshly accepted connection, or reject it when the server is full.
+        Shared by every server engine.
+        """
+        # Check connection limit
+        if len(self.clients) >= MAX_CONNECTIONS:
+            log.warning("Connection rejected: Max connections (%d) reached", MAX_CONNECTIONS)
+            try:
+                client.send_message("Server full. Please try again later.")
+                client.close()
+            except:
+                pass
+            return False
+        
+        # Add client to tracking
+        self.clients[client] = Player()
+        self.client_buffers[client] = StreamDecoder()
+        self.registration_timers[client] = self.scheduler.call_later(
+            REGISTRATION_TIMEOUT, self._on_registration_timeout, client
+        )
+        
+        log.info("Player connected from %s (%d/%d)", addr, len(self.clients), MAX_CONNECTIONS)
+        
+        # Send welcome message (queued if the socket is not writable yet)
+        client.send_message("Welcome to Racing Arena! Enter your nickname:")
+        return True
+
+    def _flush_client(self, conn: ClientConnection):
+        """Write queued output once the selector reports the socket writable"""
+        try:
+            if not conn.flush():
+                self.pending_writes.discard(conn)
+                self._update_events(conn)
+        except OSError:
+            self.remove_client(conn)
+
+    def _want_write(self, conn: ClientConnection):
+        """A send left output queued: watch the socket for writability until it drains"""
+        self.pending_writes.add(conn)
+        self._update_events(conn)
+
+    def _update_events(self, conn: ClientConnection, register: bool = False):
+        if self.selector is None:
+            return
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if conn in self.pending_writes else 0)
+        if register:
+            self.selector.register(conn, events)
+        elif conn in self.selector.get_map():
+            self.selector.modify(conn, events)
+
+    def _watch_stats_sockets(self):
+        """Follow the stats endpoint's sockets, which come and go with every scrape"""
+        current = set(self.stats_endpoint.sockets()) if self.stats_endpoint else set()
+        for sock in self._stats_sockets - current:
+            # Already closed, so it is unregistered before its descriptor can be reused
+            self.selector.unregister(sock)
+        for sock in current - self._stats_sockets:
+            self.selector.register(sock, selectors.EVENT_READ)
+        self._stats_sockets = current
+
+    def _schedule_removal(self, conn):
+        """
+        Drop a client whose outbound queue overflowed.
+        Removal is deferred because sends happen while iterating over clients.
+        """
+        log.warning("Client exceeded outbound high-water mark, disconnecting")
+        self.pending_removals.add(conn)
+
+    def _reap_clients(self):
+        while self.pending_removals:
+            self.remove_client(self.pending_removals.pop())
+
+    def _handle_client_data(self, sock: ClientConnection):
         try:
             # Non-blocking read with proper error handling
-            data = sock.recv(BUFFER_SIZE).decode('utf-8')
+            data = sock.recv(BUFFER_SIZE)
             
             if not data:
                 # Client disconnected gracefully
                 self.remove_client(sock)
                 return
             
-            # Initialize buffer if needed
-            if sock not in self.client_buffers:
-                self.client_buffers[sock] = ""
-            
-            # Safety check for buffer size to prevent memory issues
-            if len(self.client_buffers[sock]) + len(data) > MAX_MESSAGE_SIZE:
-                print(f"[Server] Message buffer too large for client, disconnecting")
-                self.remove_client(sock)
-                return
-            
-            # Process potentially multiple messages with buffering
-            self.client_buffers[sock], messages = process_client_data(self.client_buffers[sock], data)
-            
-            # Process each complete message
-            for msg in messages:
-                self._process_client_message(sock, msg)
+            self._handle_incoming(sock, data)
                     
         except BlockingIOError:
             # No data available right now - this is normal for non-blocking sockets
             pass
         except UnicodeDecodeError:
-            print(f"[Server] Invalid UTF-8 data received from client")
+            log.warning("Invalid UTF-8 data received from client")
             self.remove_client(sock)
         except ConnectionResetError:
             # Client disconnected abruptly
             self.remove_client(sock)
         except Exception as e:
-            print(f"[Server] Error handling client data: {e}")
+            log.error("Error handling client data: %s", e)
             self.remove_client(sock)
 
-    def _handle_registration(self, sock: socket.socket, nickname: str):
+    def _handle_incoming(self, sock, data: bytes):
+        """
+        Buffer and dispatch raw bytes received from a client.
+        Shared by every server engine; raises UnicodeDecodeError or ValueError on bad input.
+        """
+        # The decoder enforces MAX_MESSAGE_SIZE and yields messages one at a time,
+        # so a protocol switch applies to the very next byte of the stream
+        self.metrics.bytes_in.inc(len(data))
+        for msg in self.client_buffers[sock].feed(data):
+            self.metrics.messages_in.inc()
+            self._process_client_message(sock, msg)
+            if sock not in self.clients:
+                break
+
+    def _negotiate_protocol(self, sock, protocol: str):
         """
-        Handle player registration with non-blocking sends.
+        Switch a client to the requested wire protocol.
+        The acknowledgement is the last JSON line; everything after it uses the new codec.
+        """
+        if protocol not in CODECS:
+            protocol = PROTOCOL_JSON
+        sock.send(create_data_message({"message": f"Protocol: {protocol}", "protocol": protocol}))
+        self.metrics.messages_out.inc()
+        
+        if protocol == PROTOCOL_BINARY:
+            sock.codec = CODECS[protocol]
+            self.client_buffers[sock].switch_protocol(protocol)
+
+    def _handle_registration(self, sock: ClientConnection, nickname: str):
+        """
+        Handle player registration with queued, non-blocking sends.
         """
         try:
             # Check if nickname is valid and not taken
             if not nickname:
-                try:
-                    sock.send(create_message("Nickname cannot be empty. Please enter a valid nickname:"))
-                except BlockingIOError:
-                    pass  # Will retry on next message
+                sock.send_message((MessageType.NICKNAME_REJECTED, {"text": "Nickname cannot be empty. Please enter a valid nickname:"}))
                 return
             
-            if any(player.nickname == nickname for player in self.clients.values()):
-                try:
-                    sock.send(create_message(f"Nickname '{nickname}' is already taken. Please choose another:"))
-                except BlockingIOError:
-                    pass  # Will retry on next message
+            if nickname in self.nicknames:
+                sock.send_message((MessageType.NICKNAME_REJECTED, {"text": f"Nickname '{nickname}' is already taken. Please choose another:"}))
+                return
+            
+            if not self.rooms.has_capacity():
+                # Not the nickname's fault, and retrying won't help: say why and hang up
+                log.warning("Registration refused: all %d rooms are full", self.rooms.max_rooms)
+                sock.send_message("All rooms are full. Please try again later.")
+                sock.flush()
+                self.remove_client(sock)
                 return
             
             # Nickname is valid and available
-            self.clients[sock].nickname = nickname
-            print(f"[Server] Player connected: {nickname}")
+            player = self.clients[sock]
+            player.nickname = nickname
+            self.nicknames.add(nickname)
+            log.info("Player connected: %s", nickname)
             
-            try:
-                sock.send(create_message("Registration Completed Successfully"))
-            except BlockingIOError:
-                pass  # Client will see this eventually
+            self.registration_timers.pop(sock).cancel()
+            sock.send_message((MessageType.REGISTERED, {}))
             
-            current_players = len([p for p in self.clients.values() if p.nickname])
-            if current_players < MIN_CLIENTS:
-                try:
-                    sock.send(create_message("Waiting for other players..."))
-                except BlockingIOError:
-                    pass
-            elif MIN_CLIENTS <= current_players <= MAX_CLIENTS and not self.game_state.game_started:
-                self._start_game()
+            # Seat the player at a table; the room starts its race when ready
+            self.rooms.assign(sock, player)
                 
         except Exception as e:
-            print(f"[Server] Error in registration: {e}")
-
-    def _start_game(self):
-        self.game_state.start_game()
-        player_count = len(self.clients)
-        print(f"[Server] Race starting with {player_count} players")
-        print(f"[Server] Track length: {self.game_state.track_length} units")
-        self.broadcast(f"Race Started! Track length: {self.game_state.track_length}")
-        
-        # Send initial position to each player
-        for client in self.clients.keys():
-            try:
-                client.send(create_message("Your position: 1"))
-            except:
-                pass
-        
-        # Reset all players
-        for player in self.clients.values():
-            player.reset()
-        
-        self._new_round()
-
-    def _new_round(self):
-        self.game_state.new_round()
-        self.broadcast(f"[Round {self.game_state.round_number}]")
-        self.broadcast(f"Solve: {self.game_state.current_expression} = ?")
+            log.error("Error in registration: %s", e)
 
     def _game_loop(self):
-        if not self.game_state.game_started or not self.game_state.round_start_time:
-            return
-
-        if self.game_state.is_round_timeout():
-            self._process_round()
+        deadline = self.scheduler.next_deadline()
+        if deadline is not None:
+            lag = self.scheduler.clock() - deadline
+            if lag >= 0:
+                self.metrics.timer_lag.observe(lag)
+        self.scheduler.run_due()
 
-    def _process_round(self):
-        continue_game = RoundProcessor.process_round(
-            self.game_state, 
-            self.clients, 
-            self.broadcast
-        )
-        
-        if continue_game:
-            self._new_round()
-        else:
-            self._reset_game()
+    def _on_registration_timeout(self, sock: ClientConnection):
+        """Drop a connection that never registered a nickname"""
+        self.registration_timers.pop(sock, None)
+        log.info("Client did not register within %.0fs, disconnecting", REGISTRATION_TIMEOUT)
+        try:
+            sock.send_message("Registration timed out. Goodbye!")
+        except OSError:
+            pass
+        self.remove_client(sock)
 
-    def _reset_game(self):
-        print(f"[Server] Game ended. Starting new race...")
-        self.game_state.reset_game()
-        
-        for player in self.clients.values():
-            player.reset()
-        
-        time.sleep(2)  # Brief pause between games
-        if len(self.clients) >= MIN_CLIENTS:
-            self._start_game()
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of server load, aggregated by the worker supervisor"""
+        rooms = list(self.rooms.rooms.values())
+        return {
+            "connections": len(self.clients),
+            "players": len(self.rooms.room_of),
+            "rooms": len(rooms),
+            "races": sum(1 for room in rooms if room.game_state.game_started),
+            "rounds": self.rooms.rounds_processed,
+        }
 
-    def remove_client(self, sock: socket.socket):
+    def remove_client(self, sock: ClientConnection):
         """
         Safely remove a client with proper cleanup.
         This method is non-blocking and won't affect other clients.
         """
         if sock in self.clients:
-            nickname = self.clients[sock].nickname or 'Unknown'
-            print(f"[Server] Player disconnected: {nickname}")
+            registered_nickname = self.clients[sock].nickname
+            nickname = registered_nickname or 'Unknown'
+            log.info("Player disconnected: %s", nickname)
             
             # Remove from clients dict
             del self.clients[sock]
             
-            # Clean up client buffer
+            # Clean up client buffer and output queue
             if sock in self.client_buffers:
                 del self.client_buffers[sock]
+            self.pending_writes.discard(sock)
+            timer = self.registration_timers.pop(sock, None)
+            if timer:
+                timer.cancel()
+            
+            self.nicknames.discard(registered_nickname)
+            
+            # Unregister while the descriptor is still ours; closing may let the next accept reuse it
+            if self.selector is not None and sock in self.selector.get_map():
+                self.selector.unregister(sock)
             
-            # Clean up any game state references
-            if hasattr(self.game_state, 'responses') and sock in self.game_state.responses:
-                del self.game_state.responses[sock]
-                
             # Close socket safely
             try:
                 sock.close()
             except:
                 pass
-                
-            # Check if game needs to be paused due to insufficient players
-            current_players = len([p for p in self.clients.values() if p.nickname])
-            if current_players < MIN_CLIENTS and self.game_state.game_started:
-                print(f"[Server] Insufficient players ({current_players}/{MIN_CLIENTS}), pausing game")
-                try:
-                    self.broadcast("Not enough players. Game paused.")
-                except:
-                    pass
-                self.game_state.game_started = False
+            
+            # Leave the room; it pauses its own race if too few players remain
+            self.rooms.remove(sock)
 
-    def _process_client_message(self, sock: socket.socket, msg: dict):
+    def _process_client_message(self, sock: ClientConnection, msg: dict):
         try:
             if sock not in self.clients:
                 return
                 
             player = self.clients[sock]
             
-            if not player.nickname:
+            if msg.get("protocol") is not None and not player.nickname:
+                # Wire protocol negotiation, before registration
+                with phase(PHASE_REGISTRATION):
+                    self._negotiate_protocol(sock, msg["protocol"])
+            elif not player.nickname:
                 # Handle registration
-                self._handle_registration(sock, msg.get("nickname", ""))
-            elif self.game_state.game_started and msg.get("answer") is not None:
-                # Handle game answer
-                self.game_state.add_response(sock, msg["answer"])
+                with phase(PHASE_REGISTRATION):
+                    self._handle_registration(sock, msg.get("nickname", ""))
+            elif msg.get("answer") is not None:
+                # Handle game answer for the player's room
+                room = self.rooms.room_of.get(sock)
+                if room:
+                    with phase(PHASE_ROUND_OPEN):
+                        room.submit_answer(sock, msg["answer"])
             else:
                 # Handle other message types if needed
                 pass
                 
         except Exception as e:
-            print(f"[Server] Error processing message: {e}")
+            log.error("Error processing message: %s", e)
 
     def _shutdown(self):
-        print("[Server] Shutting down...")
+        log.info("Shutting down...")
         
         # Notify all clients
         try:
@@ -353,9 +449,10 @@ class RacingServer:
         except:
             pass
         
-        # Close all client connections
+        # Close all client connections, flushing queued output first
         for client in list(self.clients.keys()):
             try:
+                client.flush()
                 client.close()
             except:
                 pass
@@ -365,5 +462,11 @@ class RacingServer:
             self.server.close()
         except:
             pass
+        if self.stats_endpoint:
+            self.stats_endpoint.close()
+        if self.selector is not None:
+            self.selector.close()
+        if self.runtime_file:
+            unpublish_address(self.requested_port)
         
-        print("[Server] Shutdown complete")
+        log.info("Shutdown complete")
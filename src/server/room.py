@@ -0,0 +1,329 @@
+"""
+Race rooms for Racing Arena: many independent races in one server process
+"""
+import logging
+import time
+from typing import Callable, Dict, List, Optional, Union
+from config.settings import (
+    MIN_CLIENTS, MAX_CLIENTS, MAX_ROOMS, RACE_COUNTDOWN, INTERMISSION_TIME,
+    EARLY_RESOLUTION_GRACE, MAX_ANSWER_LENGTH
+)
+from src.utils import MessageType, render_message, encode_messages
+from src.utils.messaging import Message, as_message
+from src.game import Player, PlayerTable, GameState, RoundProcessor
+from src.game.round_processor import RoundDigest
+from src.game.state import RESPONSE_DUPLICATE, RESPONSE_TOO_LONG
+from src.utils.log import get_logger
+from .scheduler import Scheduler, TimerHandle
+from .metrics import ServerMetrics
+from .profiler import phase, PHASE_ROUND_OPEN, PHASE_ROUND_PROCESSING
+
+log = get_logger("room")
+
+# Room lifecycle: lobby -> countdown -> racing -> intermission -> countdown ...
+PHASE_LOBBY = "lobby"  # Waiting for MIN_CLIENTS players
+PHASE_COUNTDOWN = "countdown"  # Race about to start, late joiners still welcome
+PHASE_RACING = "racing"
+PHASE_INTERMISSION = "intermission"  # Results shown, next race not started yet
+
+
+class Room:
+    """
+    One race table: its own GameState, player set and phase timer.
+    Rooms share nothing but the server's scheduler, so a server can run any
+    number of them side by side. Every phase change is a scheduled callback,
+    so no room ever blocks the event loop.
+    """
+
+    def __init__(self, room_id: int, remove_client: Callable, scheduler: Scheduler,
+                 on_open: Optional[Callable] = None, metrics: Optional[ServerMetrics] = None):
+        self.room_id = room_id
+        self.players: Dict[object, Player] = {}
+        self.table = PlayerTable()  # Compact storage behind the Player views in self.players
+        self.game_state = GameState()
+        self.rounds_processed = 0
+        self.scheduler = scheduler
+        self.metrics = metrics if metrics is not None else ServerMetrics()
+        self.phase = PHASE_LOBBY
+        self._timer: Optional[TimerHandle] = None  # Deadline of the current phase or round
+        # Server-level removal, so failed sends clean up every index
+        self._remove_client = remove_client
+        # Tells the manager the room takes players again after a race ends
+        self._on_open = on_open
+
+    @property
+    def is_full(self) -> bool:
+        return len(self.players) >= MAX_CLIENTS
+
+    @property
+    def is_open(self) -> bool:
+        """Whether new players can still join before the race starts"""
+        return not self.is_full and self.phase != PHASE_RACING
+
+    def add_player(self, conn, player: Player):
+        """Seat a registered player and count down to the race once enough have joined"""
+        self.table.adopt(player)
+        self.players[conn] = player
+        log.info("Room %d: %s joined (%d/%d)", self.room_id, player.nickname, len(self.players), MAX_CLIENTS)
+
+        if self.phase == PHASE_LOBBY and len(self.players) >= MIN_CLIENTS:
+            self._start_countdown()
+        elif self.phase == PHASE_COUNTDOWN:
+            remaining = max(0.0, self._timer.when - self.scheduler.clock())
+            conn.send_message(f"Race starts in {remaining:.0f} seconds...")
+        elif self.phase == PHASE_INTERMISSION:
+            conn.send_message("Waiting for the next race...")
+        else:
+            conn.send_message("Waiting for other players...")
+
+    def submit_answer(self, conn, answer):
+        """Record a player's answer; the round resolves early once every active player has answered"""
+        player = self.players.get(conn)
+        if player is None or self.phase != PHASE_RACING:
+            return
+        if player.disqualified:
+            conn.send_message("You are disqualified from this race.")
+            return
+
+        status = self.game_state.add_response(conn, answer)
+        if status == RESPONSE_DUPLICATE:
+            conn.send_message("You already answered this round.")
+        elif status == RESPONSE_TOO_LONG:
+            conn.send_message(f"Answer too long (max {MAX_ANSWER_LENGTH} characters).")
+        else:
+            self._resolve_if_all_answered()
+
+    def _resolve_if_all_answered(self):
+        active = sum(1 for player in self.players.values() if not player.disqualified)
+        if len(self.game_state.responses) < active:
+            return
+
+        # Bring the deadline forward, never push it back; processing runs from
+        # the scheduler so answers read in the same loop iteration still count
+        deadline = self.scheduler.clock() + EARLY_RESOLUTION_GRACE
+        if self._timer is None or self._timer.when > deadline:
+            self._enter_phase(PHASE_RACING, EARLY_RESOLUTION_GRACE, self._process_round)
+
+    def remove_player(self, conn):
+        """Drop a player and pause the race if too few remain"""
+        if conn not in self.players:
+            return
+        self.table.release(self.players.pop(conn))
+
+        # Clean up any game state references
+        if conn in self.game_state.responses:
+            del self.game_state.responses[conn]
+
+        if len(self.players) < MIN_CLIENTS and self.phase in (PHASE_COUNTDOWN, PHASE_RACING):
+            log.info("Room %d: insufficient players (%d/%d), pausing game", self.room_id, len(self.players), MIN_CLIENTS)
+            try:
+                self.broadcast("Not enough players. Game paused.")
+            except:
+                pass
+            self.game_state.game_started = False
+            self._enter_phase(PHASE_LOBBY)
+        elif self.phase == PHASE_RACING:
+            # The player who left may have been the last one still thinking
+            self._resolve_if_all_answered()
+
+    def close(self):
+        """Cancel pending timers of a room that is being torn down"""
+        self._cancel_timer()
+
+    def broadcast(self, *messages: Union[str, Message]):
+        """Send one or more messages to every player, encoded once as a single write"""
+        self._deliver(list(messages))
+
+    def deliver_digest(self, digest: RoundDigest):
+        """
+        Send a round outcome with one write per player: the player's personal
+        messages followed by the shared ones, which are encoded only once.
+        """
+        self._deliver(digest.shared, digest.personal)
+
+    def _deliver(self, messages: List[Union[str, Message]], personal: Optional[Dict[object, list]] = None):
+        if log.isEnabledFor(logging.DEBUG):
+            for message in messages:
+                log.debug("Room %d broadcast: %s", self.room_id, render_message(*as_message(message)))
+        encoded = {}  # Shared part, encoded once per wire protocol in use
+        failed_clients = []
+        sent_messages = len(messages) * len(self.players)
+
+        for client in self.players.keys():
+            try:
+                message_data = encoded.get(client.codec)
+                if message_data is None:
+                    message_data = encoded[client.codec] = encode_messages(client.codec, messages)
+                if personal and client in personal:
+                    client.send(encode_messages(client.codec, personal[client]) + message_data)
+                    sent_messages += len(personal[client])
+                else:
+                    client.send(message_data)
+            except (ConnectionResetError, BrokenPipeError):
+                failed_clients.append(client)
+            except Exception as e:
+                log.error("Room %d: error broadcasting to client: %s", self.room_id, e)
+                failed_clients.append(client)
+        self.metrics.messages_out.inc(sent_messages)
+
+        # Remove failed clients after iteration to avoid modifying dict during iteration
+        for client in failed_clients:
+            self._remove_client(client)
+
+    def _enter_phase(self, phase: str, duration: Optional[float] = None, callback: Optional[Callable] = None):
+        """Switch phase, replacing the previous phase timer"""
+        self._cancel_timer()
+        self.phase = phase
+        if duration is not None:
+            self._timer = self.scheduler.call_later(duration, self._on_timer, callback)
+
+    def _on_timer(self, callback: Callable):
+        self._timer = None
+        callback()
+
+    def _cancel_timer(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _start_countdown(self):
+        log.info("Room %d: race starting in %.0fs", self.room_id, RACE_COUNTDOWN)
+        self._enter_phase(PHASE_COUNTDOWN, RACE_COUNTDOWN, self._start_game)
+        self.broadcast(f"Race starts in {RACE_COUNTDOWN:.0f} seconds...")
+
+    def _start_game(self):
+        self.phase = PHASE_RACING
+        self.game_state.start_game()
+        log.info("Room %d: race starting with %d players, track length %d",
+                 self.room_id, len(self.players), self.game_state.track_length)
+        # Reset all players
+        self.table.reset()
+
+        # Race start, initial position and the first expression go out together
+        self._new_round(
+            (MessageType.RACE_STARTED, {"track_length": self.game_state.track_length}),
+            (MessageType.POSITION, {"position": 1})
+        )
+
+    def _new_round(self, *preamble: Message):
+        with phase(PHASE_ROUND_OPEN):
+            self.game_state.new_round()
+            self._enter_phase(PHASE_RACING, self.game_state.time_limit, self._process_round)
+            self.broadcast(
+                *preamble,
+                (MessageType.ROUND, {"round": self.game_state.round_number}),
+                self.game_state.current_message
+            )
+
+    def _process_round(self):
+        self._cancel_timer()
+        self.rounds_processed += 1
+        started = time.perf_counter()
+        with phase(PHASE_ROUND_PROCESSING):
+            digest = RoundProcessor.process_round(self.game_state, self.players, self.table)
+            self.deliver_digest(digest)
+        self.metrics.round_processing.observe(time.perf_counter() - started)
+        if self.phase != PHASE_RACING:
+            # Failed deliveries dropped players and paused the race
+            return
+
+        if digest.continue_game:
+            self._new_round()
+        else:
+            self._reset_game()
+
+    def _reset_game(self):
+        """Finish the race and pause briefly before the next one, without blocking"""
+        log.info("Room %d: game ended. Starting new race...", self.room_id)
+        self.game_state.reset_game()
+
+        self.table.reset()
+
+        self._enter_phase(PHASE_INTERMISSION, INTERMISSION_TIME, self._end_intermission)
+        if self.is_open and self._on_open:
+            self._on_open(self)
+
+    def _end_intermission(self):
+        if len(self.players) >= MIN_CLIENTS:
+            self._start_countdown()
+        else:
+            self._enter_phase(PHASE_LOBBY)
+            self.broadcast("Waiting for other players...")
+
+
+class RoomManager:
+    """Assigns registered players to rooms; every room's timers share one scheduler"""
+
+    def __init__(self, remove_client: Callable, max_rooms: int = MAX_ROOMS,
+                 scheduler: Optional[Scheduler] = None, metrics: Optional[ServerMetrics] = None):
+        self.max_rooms = max_rooms
+        self.rooms: Dict[int, Room] = {}
+        self.room_of: Dict[object, Room] = {}
+        self.scheduler = scheduler if scheduler is not None else Scheduler()
+        self.metrics = metrics if metrics is not None else ServerMetrics()
+        self._remove_client = remove_client
+        self._next_room_id = 1
+        self._closed_rounds = 0  # Rounds played in rooms that no longer exist
+        # Rooms still accepting players, keyed by id in creation order
+        self._open_rooms: Dict[int, Room] = {}
+
+    def assign(self, conn, player: Player) -> Optional[Room]:
+        """Seat a player in the first open room, creating one if needed"""
+        room = self._find_open_room()
+        if room is None:
+            return None
+
+        self.room_of[conn] = room
+        room.add_player(conn, player)
+        if not room.is_open:
+            self._open_rooms.pop(room.room_id, None)
+        return room
+
+    def has_capacity(self) -> bool:
+        """Whether another player can be seated right now"""
+        return self._find_open_room(create=False) is not None or len(self.rooms) < self.max_rooms
+
+    def remove(self, conn):
+        room = self.room_of.pop(conn, None)
+        if room is None:
+            return
+
+        room.remove_player(conn)
+        if not room.players:
+            # Empty tables are torn down rather than kept idle; a failed send while
+            # removing this player may have dropped the last other one and done it already
+            if self.rooms.pop(room.room_id, None) is None:
+                return
+            room.close()
+            self._open_rooms.pop(room.room_id, None)
+            self._closed_rounds += room.rounds_processed
+            log.info("Room %d closed", room.room_id)
+        elif room.is_open:
+            self._open_rooms.setdefault(room.room_id, room)
+
+    @property
+    def rounds_processed(self) -> int:
+        return self._closed_rounds + sum(room.rounds_processed for room in list(self.rooms.values()))
+
+    def _reopen(self, room: Room):
+        """Finished races take new players again"""
+        if room.room_id in self.rooms and room.players:
+            self._open_rooms.setdefault(room.room_id, room)
+
+    def _find_open_room(self, create: bool = True) -> Optional[Room]:
+        while self._open_rooms:
+            room = next(iter(self._open_rooms.values()))
+            if room.is_open:
+                return room
+            del self._open_rooms[room.room_id]
+
+        if not create or len(self.rooms) >= self.max_rooms:
+            return None
+
+        room = Room(self._next_room_id, self._remove_client, self.scheduler,
+                    on_open=self._reopen, metrics=self.metrics)
+        self._next_room_id += 1
+        self.rooms[room.room_id] = room
+        self._open_rooms[room.room_id] = room
+        log.info("Room %d opened (%d/%d)", room.room_id, len(self.rooms), self.max_rooms)
+        return room
@@ -0,0 +1,98 @@
+"""
+Deadline scheduler for Racing Arena: round timeouts, intermissions and idle timeouts
+"""
+import heapq
+import itertools
+import time
+from typing import Callable, List, Optional
+from src.utils.log import get_logger
+
+log = get_logger("scheduler")
+
+
+class TimerHandle:
+    """A scheduled callback; cancel() removes it from the scheduler"""
+
+    __slots__ = ("when", "callback", "args", "cancelled", "_scheduler")
+
+    def __init__(self, when: float, callback: Callable, args: tuple, scheduler: "Scheduler"):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+        self._scheduler = scheduler
+
+    def cancel(self):
+        if not self.cancelled:
+            self.cancelled = True
+            self._scheduler._cancelled += 1
+
+
+class Scheduler:
+    """
+    Min-heap of deadlines shared by every room on a server.
+
+    The event loop asks timeout() how long it may sleep, then calls run_due()
+    when it wakes, so an idle server does not wake up at all. Cancelled timers
+    are dropped lazily and the heap is rebuilt once they make up most of it.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._heap: List[tuple] = []
+        self._sequence = itertools.count()  # FIFO order for equal deadlines
+        self._cancelled = 0
+        # Called with the new earliest deadline, for loops that sleep on their own timer
+        self.on_reschedule: Optional[Callable[[float], None]] = None
+
+    def __len__(self) -> int:
+        return len(self._heap) - self._cancelled
+
+    def call_at(self, when: float, callback: Callable, *args) -> TimerHandle:
+        handle = TimerHandle(when, callback, args, self)
+        heapq.heappush(self._heap, (when, next(self._sequence), handle))
+        if self.on_reschedule and self._heap[0][2] is handle:
+            self.on_reschedule(when)
+        return handle
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        return self.call_at(self.clock() + delay, callback, *args)
+
+    def next_deadline(self) -> Optional[float]:
+        """Earliest pending deadline, or None when nothing is scheduled"""
+        self._drop_cancelled()
+        return self._heap[0][0] if self._heap else None
+
+    def timeout(self) -> Optional[float]:
+        """Seconds until the next deadline, suitable for select(); None means wait for I/O only"""
+        deadline = self.next_deadline()
+        if deadline is None:
+            return None
+        return max(0.0, deadline - self.clock())
+
+    def run_due(self) -> int:
+        """Run every callback whose deadline has passed; returns how many ran"""
+        now = self.clock()
+        ran = 0
+        while self._heap and self._heap[0][0] <= now:
+            _, _, handle = heapq.heappop(self._heap)
+            if handle.cancelled:
+                self._cancelled -= 1
+                continue
+            # Mark as done so a late cancel() doesn't skew the cancelled count
+            handle.cancelled = True
+            ran += 1
+            try:
+                handle.callback(*handle.args)
+            except Exception:
+                log.exception("Error in timer callback %r", handle.callback)
+        return ran
+
+    def _drop_cancelled(self):
+        if self._cancelled > len(self._heap) // 2:
+            self._heap = [entry for entry in self._heap if not entry[2].cancelled]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        while self._heap and self._heap[0][2].cancelled:
+            heapq.heappop(self._heap)
+            self._cancelled -= 1
@@ -0,0 +1,190 @@
+"""
+Multi-process supervisor for Racing Arena: N workers share one port via SO_REUSEPORT
+"""
+import multiprocessing
+import queue
+import signal
+import threading
+import time
+from typing import Dict, Optional, Set
+from config.settings import (
+    DEFAULT_HOST, DEFAULT_PORT, DEFAULT_ENGINE,
+    WORKER_STATS_INTERVAL, WORKER_RESTART_DELAY, WORKER_MAX_RESTART_DELAY
+)
+from src.utils.log import get_logger, setup_logging, configured_level
+
+log = get_logger("supervisor")
+
+
+def _raise_keyboard_interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def _worker_main(worker_id: int, host: str, port: int, engine: str, stats_queue,
+                 stats_port: Optional[int] = None, log_level: Optional[int] = None):
+    """Entry point of a worker process: one full RacingServer on the shared port"""
+    # The parent's log writer thread does not survive the fork; start our own
+    setup_logging(log_level)
+    # Turn SIGTERM from the supervisor into the server's normal graceful shutdown
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+
+    if engine == "asyncio":
+        from .async_server import AsyncRacingServer as server_class
+    else:
+        from .racing_server import RacingServer as server_class
+    server = server_class(host, port, reuse_port=True, stats_port=stats_port)
+
+    def report_stats():
+        # The first report goes out as soon as the port is bound: it tells the
+        # supervisor this worker started, so later exits are crashes to restart
+        while True:
+            try:
+                stats_queue.put_nowait((worker_id, server.stats()))
+            except Exception:
+                pass
+            time.sleep(WORKER_STATS_INTERVAL)
+
+    threading.Thread(target=report_stats, daemon=True).start()
+    server.run()
+
+
+class WorkerSupervisor:
+    """
+    Forks worker processes that each run a RacingServer on the same port.
+    Crashed workers are restarted with backoff and their stats are aggregated.
+    A worker that exits before its first stats report never got its server
+    up (typically the port is held without SO_REUSEPORT); restarting would
+    fail the same way, so the supervisor stops with a RuntimeError instead.
+    With a stats port, worker N serves its metrics on stats_port + N.
+    """
+
+    def __init__(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                 workers: int = 2, engine: str = DEFAULT_ENGINE, stats_port: Optional[int] = None):
+        self.host = host
+        self.port = port
+        self.num_workers = workers
+        self.engine = engine
+        self.stats_port = stats_port
+        self.stats_queue = multiprocessing.Queue()
+        self.workers: Dict[int, multiprocessing.Process] = {}
+        self.started_at: Dict[int, float] = {}
+        self.restart_delay: Dict[int, float] = {}
+        self.restart_at: Dict[int, float] = {}
+        self.worker_stats: Dict[int, Dict[str, int]] = {}
+        self.ready: Set[int] = set()  # Workers that reported since their last (re)start
+        self.restarts = 0
+        self._stopping = False
+
+    def run(self):
+        signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
+        log.info("Starting %d %s workers on %s:%d", self.num_workers, self.engine, self.host, self.port)
+        for worker_id in range(self.num_workers):
+            self._start_worker(worker_id)
+
+        next_report = time.monotonic() + WORKER_STATS_INTERVAL
+        try:
+            while True:
+                self._collect_stats(timeout=0.5)
+                self._check_workers()
+                if time.monotonic() >= next_report:
+                    log.info("%s", self.format_stats())
+                    next_report = time.monotonic() + WORKER_STATS_INTERVAL
+        except KeyboardInterrupt:
+            log.info("Shutting down workers...")
+        finally:
+            self.stop()
+
+    def stop(self):
+        self._stopping = True
+        for process in self.workers.values():
+            if process.is_alive():
+                process.terminate()
+        for process in self.workers.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.kill()
+        log.info("All workers stopped")
+
+    def aggregate_stats(self) -> Dict[str, int]:
+        """Sum the latest stats reported by every live worker"""
+        totals: Dict[str, int] = {}
+        for worker_id, stats in self.worker_stats.items():
+            if worker_id not in self.workers or not self.workers[worker_id].is_alive():
+                continue
+            for key, value in stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def format_stats(self) -> str:
+        alive = sum(1 for process in self.workers.values() if process.is_alive())
+        totals = self.aggregate_stats()
+        details = " | ".join(f"{value} {key}" for key, value in totals.items())
+        summary = f"{alive}/{self.num_workers} workers up, {self.restarts} restarts"
+        return f"{summary} | {details}" if details else summary
+
+    def _start_worker(self, worker_id: int):
+        process = multiprocessing.Process(
+            target=_worker_main,
+            args=(worker_id, self.host, self.port, self.engine, self.stats_queue,
+                  None if self.stats_port is None else self.stats_port + worker_id, configured_level()),
+            name=f"racing-arena-worker-{worker_id}",
+            daemon=True
+        )
+        self.ready.discard(worker_id)
+        process.start()
+        self.workers[worker_id] = process
+        self.started_at[worker_id] = time.monotonic()
+        log.info("Worker %d started (pid %d)", worker_id, process.pid)
+
+    def _collect_stats(self, timeout: float):
+        try:
+            worker_id, stats = self.stats_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        self._record_stats(worker_id, stats)
+        self._drain_stats()
+
+    def _drain_stats(self):
+        """Take whatever reports arrived without waiting"""
+        try:
+            while True:
+                self._record_stats(*self.stats_queue.get_nowait())
+        except queue.Empty:
+            pass
+
+    def _record_stats(self, worker_id: int, stats: Dict[str, int]):
+        self.worker_stats[worker_id] = stats
+        self.ready.add(worker_id)
+
+    def _check_workers(self):
+        if self._stopping:
+            return
+
+        now = time.monotonic()
+        for worker_id, process in list(self.workers.items()):
+            if process.is_alive():
+                continue
+
+            restart_at: Optional[float] = self.restart_at.get(worker_id)
+            if restart_at is None:
+                if worker_id not in self.ready:
+                    self._drain_stats()  # Its first report may have landed just before it exited
+                if worker_id not in self.ready:
+                    log.error("Worker %d exited with code %s before serving; not restarting",
+                              worker_id, process.exitcode)
+                    raise RuntimeError(f"Worker {worker_id} could not start a server on {self.host}:{self.port} "
+                                       f"(exit code {process.exitcode}); is the port held by another process?")
+                uptime = now - self.started_at[worker_id]
+                # Back off exponentially while a worker keeps crashing right away
+                delay = self.restart_delay.get(worker_id, WORKER_RESTART_DELAY)
+                if uptime > WORKER_MAX_RESTART_DELAY:
+                    delay = WORKER_RESTART_DELAY
+                self.restart_delay[worker_id] = min(delay * 2, WORKER_MAX_RESTART_DELAY)
+                self.restart_at[worker_id] = now + delay
+                self.worker_stats.pop(worker_id, None)
+                log.warning("Worker %d exited with code %s, restarting in %.1fs",
+                            worker_id, process.exitcode, delay)
+            elif now >= restart_at:
+                del self.restart_at[worker_id]
+                self.restarts += 1
+                self._start_worker(worker_id)
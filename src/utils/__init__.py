@@ -2,13 +2,46 @@
 Utilities package for Racing Arena
 """
 
-from .network import is_port_available, find_available_port
-from .messaging import process_client_data, create_message, create_data_message
+from .network import (
+    is_port_available, find_available_port, bind_listener, raise_file_limit, publish_address, unpublish_address, discover_port, connect_first
+)
+from .log import get_logger, setup_logging
+from .messaging import (
+    process_client_data, create_message, create_data_message,
+    MessageType, JsonCodec, BinaryCodec, LineDecoder, FrameDecoder, StreamDecoder, JSON_CODEC, BINARY_CODEC, CODECS,
+    PROTOCOL_JSON, PROTOCOL_BINARY, PreparedMessage, render_message, encode_messages, message_type,
+    parse_message, parse_answer
+)
 
 __all__ = [
     'is_port_available',
     'find_available_port', 
+    'bind_listener',
+    'raise_file_limit',
+    'publish_address',
+    'unpublish_address',
+    'discover_port',
+    'connect_first',
+    'get_logger',
+    'setup_logging',
     'process_client_data',
     'create_message',
-    'create_data_message'
+    'create_data_message',
+    'MessageType',
+    'JsonCodec',
+    'BinaryCodec',
+    'LineDecoder',
+    'FrameDecoder',
+    'StreamDecoder',
+    'JSON_CODEC',
+    'BINARY_CODEC',
+    'CODECS',
+    'PROTOCOL_JSON',
+    'PROTOCOL_BINARY',
+    'PreparedMessage',
+    'render_message',
+    'encode_messages',
+    'message_type',
+    'parse_message',
+    'parse_answer'
 ]
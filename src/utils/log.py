@@ -0,0 +1,141 @@
+"""
+Logging for Racing Arena: leveled, queue-backed and off the event-loop thread
+"""
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple, Union
+from config.settings import LOG_LEVEL, LOG_QUEUE_SIZE, LOG_DUPLICATE_WINDOW
+
+ROOT = "racing"
+
+_listener: Optional[QueueListener] = None
+_level = logging.getLevelName(LOG_LEVEL)
+
+
+def get_logger(component: str) -> logging.Logger:
+    """Logger of one component, shown as [component] in the output"""
+    return logging.getLogger(f"{ROOT}.{component}")
+
+
+class ComponentFormatter(logging.Formatter):
+    """`12:00:01.234 INFO    [server] message`"""
+
+    def __init__(self):
+        super().__init__("%(asctime)s.%(msecs)03d %(levelname)-7s [%(component)s] %(message)s", "%H:%M:%S")
+
+    def format(self, record: logging.LogRecord) -> str:
+        record.component = record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + ".") else record.name
+        return super().format(record)
+
+
+class DuplicateFilter(logging.Filter):
+    """
+    Lets the first of a run of identical records through and drops repeats
+    for `window` seconds; the next one let through reports how many were
+    dropped. Runs on the writer thread, so it costs the game loop nothing.
+    """
+
+    def __init__(self, window: float = LOG_DUPLICATE_WINDOW):
+        super().__init__()
+        self.window = window
+        self._seen: Dict[Tuple, Tuple[float, int]] = {}  # key -> (window start, suppressed)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.window <= 0:
+            return True
+        key = (record.name, record.levelno, record.getMessage())
+        now = record.created
+        entry = self._seen.get(key)
+        if entry is not None and now - entry[0] < self.window:
+            self._seen[key] = (entry[0], entry[1] + 1)
+            return False
+
+        if entry is not None and entry[1]:
+            record.msg = f"{record.getMessage()} ({entry[1]} similar messages suppressed)"
+            record.args = None
+        self._seen[key] = (now, 0)
+        if len(self._seen) > 4096:
+            self._forget(now)
+        return True
+
+    def _forget(self, now: float):
+        for key, (started, suppressed) in list(self._seen.items()):
+            if now - started >= self.window and not suppressed:
+                del self._seen[key]
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hands records to the writer thread without ever blocking the caller.
+    Records are formatted on the writer thread; when the queue is full they
+    are counted and dropped, and the count is logged once there is room.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            if self.dropped:
+                self.queue.put_nowait(logging.makeLogRecord({
+                    "name": f"{ROOT}.log", "levelno": logging.WARNING, "levelname": "WARNING",
+                    "msg": "%d log records dropped, writer fell behind", "args": (self.dropped,),
+                }))
+                self.dropped = 0
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: Union[int, str, None] = None, quiet: bool = False, stream=None):
+    """
+    Route every racing.* logger through a bounded queue to a background
+    writer. `quiet` is the production setting: warnings and errors only.
+    Safe to call again, e.g. in a forked worker process.
+    """
+    global _listener, _level
+    if level is None:
+        level = _level
+    if isinstance(level, str):
+        level = logging.getLevelName(level.upper())
+    if quiet:
+        level = max(level, logging.WARNING)
+    _level = level
+
+    stop_logging()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(ComponentFormatter())
+    output.addFilter(DuplicateFilter())
+
+    log_queue: queue.Queue = queue.Queue(LOG_QUEUE_SIZE)
+    root = logging.getLogger(ROOT)
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+    root.setLevel(level)
+    root.propagate = False
+
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+
+
+def configured_level() -> int:
+    return _level
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None and listener._thread is not None and listener._thread.is_alive():
+        listener.stop()
+
+
+atexit.register(stop_logging)
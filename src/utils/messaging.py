@@ -2,7 +2,18 @@
 Message processing utilities for Racing Arena
 """
 import json
-from typing import List, Dict, Any
+import re
+import struct
+from enum import IntEnum
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple, Union
+from config.settings import MAX_MESSAGE_SIZE
+from .log import get_logger
+
+log = get_logger("messaging")
+_scan_json = json.JSONDecoder().scan_once  # The C scanner json.loads ends up in
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "binary"
 
 
 def process_client_data(buffer: str, data: str) -> tuple[str, List[Dict[str, Any]]]:
@@ -27,7 +38,7 @@ def process_client_data(buffer: str, data: str) -> tuple[str, List[Dict[str, Any
                 message = json.loads(line)
                 messages.append(message)
             except json.JSONDecodeError as e:
-                print(f"Error parsing message: {line} - {e}")
+                log.warning("Error parsing message: %s - %s", line, e)
     
     return updated_buffer, messages
 
@@ -40,3 +51,514 @@ def create_message(content: str) -> bytes:
 def create_data_message(data: Dict[str, Any]) -> bytes:
     """Create a JSON message from data dictionary with newline delimiter"""
     return (json.dumps(data) + "\n").encode()
+
+
+class MessageType(IntEnum):
+    """Message type codes shared by both wire protocols"""
+    # Server to client
+    TEXT = 0
+    REGISTERED = 1
+    NICKNAME_REJECTED = 2
+    RACE_STARTED = 3
+    ROUND = 4
+    EXPRESSION = 5
+    POSITION = 6
+    FEEDBACK = 7
+    CORRECT_ANSWER = 8
+    DISQUALIFIED = 9
+    RACE_ENDED = 10
+    # Client to server
+    NICKNAME = 64
+    ANSWER = 65
+
+
+# Feedback outcomes carried by MessageType.FEEDBACK
+OUTCOME_INCORRECT = 0
+OUTCOME_CORRECT = 1
+OUTCOME_TIMEOUT = 2
+
+# A message is a type code plus its fields; plain strings are TEXT messages
+Message = Tuple[MessageType, Dict[str, Any]]
+
+
+def text_message(text: str) -> Message:
+    return MessageType.TEXT, {"text": text}
+
+
+def expression_message(expression: str) -> Message:
+    """Build an EXPRESSION message from an "a op b" expression string"""
+    left, operator, right = expression.split()
+    return MessageType.EXPRESSION, {"left": int(left), "operator": operator, "right": int(right)}
+
+
+def feedback_text(outcome: int, points: int) -> str:
+    if outcome == OUTCOME_CORRECT:
+        if points > 1:
+            return f"Correct! +{points} points"
+        return f"Correct! +{points} point"
+    if outcome == OUTCOME_TIMEOUT:
+        return f"Time's up! {points} point"
+    if points == -1:
+        return f"Incorrect! {points} point"
+    return f"Incorrect! {points} points"
+
+
+_RENDERERS = {
+    MessageType.TEXT: lambda f: f["text"],
+    MessageType.REGISTERED: lambda f: "Registration Completed Successfully",
+    MessageType.NICKNAME_REJECTED: lambda f: f["text"],
+    MessageType.RACE_STARTED: lambda f: f"Race Started! Track length: {f['track_length']}",
+    MessageType.ROUND: lambda f: f"[Round {f['round']}]",
+    MessageType.EXPRESSION: lambda f: f"Solve: {f['left']} {f['operator']} {f['right']} = ?",
+    MessageType.POSITION: lambda f: f"Your position: {f['position']}",
+    MessageType.FEEDBACK: lambda f: feedback_text(f["outcome"], f["points"]),
+    MessageType.CORRECT_ANSWER: lambda f: f"Correct answer: {f['answer']}",
+    MessageType.DISQUALIFIED: lambda f: f"Player {f['nickname']} disqualified!",
+    MessageType.RACE_ENDED: lambda f: f"Race ended! Winner: {f['winner']}",
+}
+
+
+# Types whose only field is the text itself, carried once as "message" in decoded messages
+_TEXT_TYPES = frozenset((MessageType.TEXT, MessageType.NICKNAME_REJECTED))
+
+
+def render_message(msg_type: MessageType, fields: Dict[str, Any]) -> str:
+    """Human-readable text of a server message"""
+    return _RENDERERS[msg_type](fields)
+
+
+def as_message(message: Union[str, Message, "PreparedMessage"]) -> Message:
+    if isinstance(message, str):
+        return text_message(message)
+    if isinstance(message, PreparedMessage):
+        return message.message
+    return message
+
+
+# Old servers send JSON lines with text only; the prefixes that identify their messages
+_TEXT_PREFIXES = (
+    ("Registration Completed", MessageType.REGISTERED),
+    ("Solve: ", MessageType.EXPRESSION),
+    ("[Round ", MessageType.ROUND),
+    ("Race Started!", MessageType.RACE_STARTED),
+    ("Your position: ", MessageType.POSITION),
+    ("Correct answer: ", MessageType.CORRECT_ANSWER),
+    ("Correct!", MessageType.FEEDBACK),
+    ("Incorrect!", MessageType.FEEDBACK),
+    ("Time's up!", MessageType.FEEDBACK),
+    ("Race ended!", MessageType.RACE_ENDED),
+)
+
+
+def message_type(msg: Dict[str, Any]) -> MessageType:
+    """
+    Type of a decoded server message. Messages from current servers carry
+    it; text from older servers is recognised by its wording. Anything else,
+    including codes from newer servers, is plain TEXT.
+    """
+    msg_type = msg.get("type")
+    if msg_type is not None:
+        try:
+            return MessageType(msg_type)
+        except ValueError:
+            return MessageType.TEXT
+    text = msg.get("message", "")
+    if "already taken" in text or "cannot be empty" in text:
+        return MessageType.NICKNAME_REJECTED
+    if text.startswith("Player ") and text.endswith(" disqualified!"):
+        return MessageType.DISQUALIFIED
+    for prefix, prefix_type in _TEXT_PREFIXES:
+        if text.startswith(prefix):
+            return prefix_type
+    return MessageType.TEXT
+
+
+def _parse_expression(text: str) -> Dict[str, Any]:
+    left, operator, right = text[len("Solve: "):].split(" = ")[0].split()
+    return {"left": int(left), "operator": operator, "right": int(right)}
+
+
+def _parse_feedback(text: str) -> Dict[str, Any]:
+    if text.startswith("Correct!"):
+        outcome = OUTCOME_CORRECT
+    elif text.startswith("Time's up!"):
+        outcome = OUTCOME_TIMEOUT
+    else:
+        outcome = OUTCOME_INCORRECT
+    return {"outcome": outcome, "points": int(text.split()[-2])}
+
+
+def _parse_last_int(key: str):
+    return lambda text: {key: int(text.rsplit(" ", 1)[1])}
+
+
+# Inverse of _RENDERERS, for servers that send text only
+_PARSERS = {
+    MessageType.TEXT: lambda text: {"text": text},
+    MessageType.REGISTERED: lambda text: {},
+    MessageType.NICKNAME_REJECTED: lambda text: {"text": text},
+    MessageType.RACE_STARTED: _parse_last_int("track_length"),
+    MessageType.ROUND: lambda text: {"round": int(text.strip("[]").split()[1])},
+    MessageType.EXPRESSION: _parse_expression,
+    MessageType.POSITION: _parse_last_int("position"),
+    MessageType.FEEDBACK: _parse_feedback,
+    MessageType.CORRECT_ANSWER: _parse_last_int("answer"),
+    MessageType.DISQUALIFIED: lambda text: {"nickname": text[len("Player "):-len(" disqualified!")]},
+    MessageType.RACE_ENDED: lambda text: {"winner": text.split("Winner: ", 1)[1]},
+}
+
+
+def parse_message(msg: Dict[str, Any]) -> Message:
+    """
+    Type and fields of a decoded server message, whichever protocol and
+    server version it came from: typed messages pass through, the text of
+    older servers is parsed into the same fields.
+    """
+    msg_type = message_type(msg)
+    if msg.get("type") == msg_type:
+        if msg_type in _TEXT_TYPES:
+            return msg_type, {"text": msg.get("message", "")}
+        fields = dict(msg)
+        del fields["type"]
+        fields.pop("message", None)
+        return msg_type, fields
+    text = msg.get("message", "")
+    try:
+        return msg_type, _PARSERS[msg_type](text)
+    except (ValueError, IndexError):
+        return text_message(text)
+
+
+class JsonCodec:
+    """
+    Newline-delimited JSON, understood by every client. Server messages
+    carry their type code and fields next to the rendered "message" text,
+    so older clients that only read the text keep working.
+    """
+    name = PROTOCOL_JSON
+
+    def encode(self, msg_type: MessageType, fields: Dict[str, Any]) -> bytes:
+        if msg_type in _TEXT_TYPES:
+            return create_data_message({"type": int(msg_type), "message": fields["text"]})
+        if msg_type in _RENDERERS:
+            return create_data_message({"type": int(msg_type), **fields, "message": render_message(msg_type, fields)})
+        return create_data_message(fields)
+
+
+# Frame header: payload length, message type
+_HEADER = struct.Struct("!HB")
+_U16 = struct.Struct("!H")
+_U32 = struct.Struct("!I")
+_I64 = struct.Struct("!q")
+_EXPRESSION = struct.Struct("!ici")
+_FEEDBACK = struct.Struct("!Bi")
+_ANSWER_VALID = 1
+_ANSWER_INVALID = 0
+
+
+_INTEGER = re.compile(r"\s*[+-]?[0-9]+\s*")
+
+
+def parse_answer(answer: Any) -> Optional[int]:
+    """Integer value of a submitted answer, or None unless it is an int or a string of digits
+
+    int() would truncate 3.9 to 3 and take True as 1, so neither is accepted.
+    """
+    if isinstance(answer, int) and not isinstance(answer, bool):
+        return answer
+    if isinstance(answer, str) and _INTEGER.fullmatch(answer):
+        return int(answer)
+    return None
+
+
+def _pack_text(key):
+    return lambda f: f[key].encode("utf-8")
+
+
+def _unpack_text(key):
+    return lambda p: {key: bytes(p).decode("utf-8")}
+
+
+def _pack_answer(fields: Dict[str, Any]) -> bytes:
+    # Anything the server would not read as a number travels as text, so both
+    # protocols judge the same typed answer the same way
+    answer = fields["answer"]
+    value = parse_answer(answer)
+    if value is not None and -2 ** 63 <= value < 2 ** 63:
+        return bytes([_ANSWER_VALID]) + _I64.pack(value)
+    return bytes([_ANSWER_INVALID]) + str(answer).encode("utf-8")
+
+
+def _unpack_answer(payload) -> Dict[str, Any]:
+    if not payload:
+        raise ValueError("Answer frame without a payload")
+    if payload[0] == _ANSWER_VALID:
+        return {"answer": _I64.unpack_from(payload, 1)[0]}
+    return {"answer": bytes(payload[1:]).decode("utf-8")}
+
+
+def _unpack_expression(payload) -> Dict[str, Any]:
+    left, operator, right = _EXPRESSION.unpack(payload)
+    return {"left": left, "operator": operator.decode("ascii"), "right": right}
+
+
+def _unpack_feedback(payload) -> Dict[str, Any]:
+    outcome, points = _FEEDBACK.unpack(payload)
+    return {"outcome": outcome, "points": points}
+
+
+_PACKERS = {
+    MessageType.TEXT: _pack_text("text"),
+    MessageType.REGISTERED: lambda f: b"",
+    MessageType.NICKNAME_REJECTED: _pack_text("text"),
+    MessageType.RACE_STARTED: lambda f: _U16.pack(f["track_length"]),
+    MessageType.ROUND: lambda f: _U32.pack(f["round"]),
+    MessageType.EXPRESSION: lambda f: _EXPRESSION.pack(f["left"], f["operator"].encode("ascii"), f["right"]),
+    MessageType.POSITION: lambda f: _U32.pack(f["position"]),
+    MessageType.FEEDBACK: lambda f: _FEEDBACK.pack(f["outcome"], f["points"]),
+    MessageType.CORRECT_ANSWER: lambda f: _I64.pack(f["answer"]),
+    MessageType.DISQUALIFIED: _pack_text("nickname"),
+    MessageType.RACE_ENDED: _pack_text("winner"),
+    MessageType.NICKNAME: _pack_text("nickname"),
+    MessageType.ANSWER: _pack_answer,
+}
+
+_UNPACKERS = {
+    MessageType.TEXT: _unpack_text("message"),
+    MessageType.REGISTERED: lambda p: {},
+    MessageType.NICKNAME_REJECTED: _unpack_text("message"),
+    MessageType.RACE_STARTED: lambda p: {"track_length": _U16.unpack(p)[0]},
+    MessageType.ROUND: lambda p: {"round": _U32.unpack(p)[0]},
+    MessageType.EXPRESSION: _unpack_expression,
+    MessageType.POSITION: lambda p: {"position": _U32.unpack(p)[0]},
+    MessageType.FEEDBACK: _unpack_feedback,
+    MessageType.CORRECT_ANSWER: lambda p: {"answer": _I64.unpack(p)[0]},
+    MessageType.DISQUALIFIED: _unpack_text("nickname"),
+    MessageType.RACE_ENDED: _unpack_text("winner"),
+    MessageType.NICKNAME: _unpack_text("nickname"),
+    MessageType.ANSWER: _unpack_answer,
+}
+
+
+class BinaryCodec:
+    """
+    Compact length-prefixed framing: 2-byte payload length, 1-byte message
+    type, then the packed fields of that type.
+    """
+    name = PROTOCOL_BINARY
+
+    def encode(self, msg_type: MessageType, fields: Dict[str, Any]) -> bytes:
+        payload = _PACKERS[msg_type](fields)
+        return _HEADER.pack(len(payload), msg_type) + payload
+
+
+def encode_messages(codec, messages: List[Union[str, Message, "PreparedMessage"]]) -> bytes:
+    """Encode a batch of messages into one buffer for a single write"""
+    return b"".join(
+        message.encode(codec) if isinstance(message, PreparedMessage) else codec.encode(*as_message(message))
+        for message in messages
+    )
+
+
+JSON_CODEC = JsonCodec()
+BINARY_CODEC = BinaryCodec()
+CODECS = {PROTOCOL_JSON: JSON_CODEC, PROTOCOL_BINARY: BINARY_CODEC}
+
+
+class PreparedMessage:
+    """
+    A message encoded ahead of time for every wire protocol, so sending it
+    costs no encoding work. Accepted wherever a message is.
+    """
+
+    __slots__ = ("message", "_frames")
+
+    def __init__(self, message: Message):
+        self.message = message
+        self._frames = {codec: codec.encode(*message) for codec in CODECS.values()}
+
+    def encode(self, codec) -> bytes:
+        frame = self._frames.get(codec)
+        if frame is None:
+            frame = self._frames[codec] = codec.encode(*self.message)
+        return frame
+
+
+def decode_frame(msg_type: int, payload) -> Dict[str, Any]:
+    """
+    Decode a binary frame into the same dict shape the JSON protocol uses:
+    its fields, plus "type" and, for server messages, the rendered "message".
+    A type code from a newer server keeps its number and reads as TEXT, as
+    it does over JSON; its payload is taken to be text.
+    """
+    if msg_type not in _UNPACKERS:
+        return {"type": msg_type, "message": bytes(payload).decode("utf-8", "replace")}
+    msg_type = MessageType(msg_type)
+    message = _UNPACKERS[msg_type](payload)
+    message["type"] = msg_type
+    if msg_type in _RENDERERS and msg_type not in _TEXT_TYPES:
+        message["message"] = render_message(msg_type, message)
+    return message
+
+
+def _loads_line(line: str) -> Any:
+    """
+    json.loads for a line already stripped of whitespace: calls the scanner
+    directly, skipping the regex passes json.loads makes over every message
+    """
+    try:
+        value, end = _scan_json(line, 0)
+    except StopIteration as e:
+        raise json.JSONDecodeError("Expecting value", line, e.value) from None
+    if end != len(line):
+        raise json.JSONDecodeError("Extra data", line, end)
+    return value
+
+
+class _BufferedDecoder:
+    """
+    Receive buffer shared by the incremental decoders.
+    Consumed bytes are only compacted away once no complete message is left,
+    so each received byte is copied a bounded number of times.
+    """
+
+    def __init__(self, max_size: int = MAX_MESSAGE_SIZE):
+        self.buffer = bytearray()
+        self.max_size = max_size
+        self._start = 0  # Offset of the first unconsumed byte
+
+    def append(self, data: bytes) -> bool:
+        """Add received bytes; False when they cannot have completed a message"""
+        self.buffer += data
+        return True
+
+    def remaining(self) -> bytes:
+        """Unconsumed bytes, e.g. to hand over to another decoder"""
+        return bytes(self.buffer[self._start:])
+
+    def feed(self, data: bytes) -> List[Dict[str, Any]]:
+        """Add received bytes; returns every message completed by them"""
+        self.append(data)
+        messages = []
+        while True:
+            message = self.next_message()
+            if message is None:
+                return messages
+            messages.append(message)
+
+    def _compact(self):
+        if self._start:
+            del self.buffer[:self._start]
+            self._start = 0
+
+
+class LineDecoder(_BufferedDecoder):
+    """
+    Incremental decoder for newline-delimited JSON over raw bytes.
+    A read is split into lines at once, but each line is only parsed when
+    asked for, so bytes after a protocol switch are handed over untouched.
+    """
+
+    def __init__(self, max_size: int = MAX_MESSAGE_SIZE):
+        super().__init__(max_size)
+        self._lines: List[bytearray] = []  # Complete lines not parsed yet, last one first
+
+    def append(self, data: bytes) -> bool:
+        self.buffer += data
+        if b"\n" in data:
+            lines = self.buffer.split(b"\n")
+            self.buffer = lines.pop()
+            lines.reverse()
+            self._lines[:0] = lines
+            return True
+        # Most reads of a fragmented stream end mid-line
+        if self._lines:
+            return True
+        if len(self.buffer) > self.max_size:
+            raise ValueError(f"Incomplete message exceeds maximum message size of {self.max_size} bytes")
+        return False
+
+    def remaining(self) -> bytes:
+        return b"".join(line + b"\n" for line in reversed(self._lines)) + self.buffer
+
+    def next_message(self) -> Optional[Dict[str, Any]]:
+        """Parse the next complete line, or return None when more data is needed"""
+        lines = self._lines
+        while lines:
+            raw = lines.pop()
+            if len(raw) > self.max_size:
+                raise ValueError(f"Message exceeds maximum message size of {self.max_size} bytes")
+            # A complete line holds whole UTF-8 characters
+            line = raw.strip().decode()
+            if not line:
+                continue
+            try:
+                return _loads_line(line)
+            except json.JSONDecodeError as e:
+                log.warning("Error parsing message: %r - %s", line, e)
+        if len(self.buffer) > self.max_size:
+            raise ValueError(f"Incomplete message exceeds maximum message size of {self.max_size} bytes")
+        return None
+
+
+class FrameDecoder(_BufferedDecoder):
+    """
+    Incremental decoder for binary frames arriving in arbitrary chunks.
+    max_size limits the payload length a header declares, so a partial frame
+    is never larger than the header plus max_size.
+    """
+
+    def next_message(self) -> Optional[Dict[str, Any]]:
+        """Decode the next complete frame, or return None when more data is needed"""
+        if len(self.buffer) - self._start >= _HEADER.size:
+            length, msg_type = _HEADER.unpack_from(self.buffer, self._start)
+            if length > self.max_size:
+                raise ValueError(f"Frame of {length} bytes exceeds maximum message size")
+            begin = self._start + _HEADER.size
+            end = begin + length
+            if end <= len(self.buffer):
+                self._start = end
+                with memoryview(self.buffer) as view:
+                    try:
+                        return decode_frame(msg_type, view[begin:end])
+                    except (struct.error, IndexError, ValueError) as e:
+                        # Fields cut short, bad UTF-8: one error type for every
+                        # decoder, so callers drop the connection instead of crashing
+                        raise ValueError(f"Malformed frame of type {msg_type} ({length} bytes): {e}") from None
+        self._compact()
+        return None
+
+
+class StreamDecoder:
+    """
+    Per-connection decoder used by server and client: newline-delimited JSON
+    until the connection switches to binary framing.
+    Messages are yielded one at a time, so a protocol switch made while
+    handling one message applies to the bytes right after it.
+    """
+
+    def __init__(self, max_size: int = MAX_MESSAGE_SIZE):
+        self.max_size = max_size
+        self.protocol = PROTOCOL_JSON
+        self._decoder = LineDecoder(max_size)
+
+    def feed(self, data: bytes) -> Iterable[Dict[str, Any]]:
+        """Add received bytes; iterating the result yields the messages they complete"""
+        if self._decoder.append(data):
+            return self._messages()
+        return ()
+
+    def _messages(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            message = self._decoder.next_message()
+            if message is None:
+                return
+            yield message
+
+    def switch_protocol(self, protocol: str):
+        if protocol == self.protocol or protocol != PROTOCOL_BINARY:
+            return
+        leftover = self._decoder.remaining()
+        self._decoder = FrameDecoder(self.max_size)
+        self._decoder.append(leftover)
+        self.protocol = protocol
@@ -1,5 +1,19 @@
+import errno
+import json
+import os
+import selectors
 import socket
-from config.settings import DEFAULT_HOST, DEFAULT_PORT, MAX_PORT_ATTEMPTS
+import time
+from typing import Dict, List, Optional
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+from config.settings import (
+    DEFAULT_HOST, DEFAULT_PORT, MAX_PORT_ATTEMPTS, CONNECT_TIMEOUT, RUNTIME_DIR, CONNECTION_BACKLOG
+)
+
+LOCAL_HOSTS = ('localhost', '127.0.0.1', '::1', '0.0.0.0', '')
 
 
 def is_port_available(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> bool:
@@ -19,3 +33,167 @@ def find_available_port(host: str = DEFAULT_HOST, start_port: int = DEFAULT_PORT
         if is_port_available(host, port):
             return port
     return None
+
+
+def bind_listener(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, max_attempts: int = MAX_PORT_ATTEMPTS,
+                  reuse_port: bool = False, backlog: int = CONNECTION_BACKLOG) -> socket.socket:
+    """
+    Non-blocking listening socket on the first port from `port` that binds.
+    The fallback ports are tried on the listening socket itself, so no port
+    is probed and then lost to another process before the real bind.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        # Enable SO_REUSEADDR to avoid "Address already in use" errors
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            if not hasattr(socket, "SO_REUSEPORT"):
+                raise OSError("SO_REUSEPORT is not supported on this platform")
+            # Let sibling worker processes bind the same port; the kernel balances accepts
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.setblocking(False)
+        for candidate in range(port, port + max_attempts):
+            try:
+                sock.bind((host, candidate))
+                break
+            except OSError as e:
+                # A failed bind leaves the socket unbound, ready for the next port
+                error = e
+        else:
+            if max_attempts == 1:
+                raise error
+            raise OSError(f"No available ports found from {port} to {port + max_attempts - 1}") from error
+        sock.listen(backlog)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+
+def raise_file_limit(wanted: int):
+    """Lift the soft descriptor limit so thousands of sockets can be open"""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        target = wanted if hard == resource.RLIM_INFINITY else min(wanted, hard)
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def runtime_file(requested_port: int) -> str:
+    """
+    Where a server asked for `requested_port` publishes the port it really
+    bound, so clients asking for the same port find it on the first try
+    """
+    directory = RUNTIME_DIR or os.environ.get("XDG_RUNTIME_DIR")
+    if not directory:
+        import tempfile  # Only needed without a runtime dir, and slow to import
+        directory = tempfile.gettempdir()
+    return os.path.join(directory, f"racing-arena-{requested_port}.json")
+
+
+def publish_address(requested_port: int, host: str, port: int) -> Optional[str]:
+    """Write the runtime file atomically; returns its path, or None when it can't be written"""
+    path = runtime_file(requested_port)
+    data = {"host": host, "port": port, "requested_port": requested_port,
+            "pid": os.getpid(), "started": time.time()}
+    try:
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(data, f)
+        os.replace(temporary, path)
+    except OSError:
+        return None
+    return path
+
+
+def unpublish_address(requested_port: int):
+    """Remove the runtime file, unless another server has replaced it since"""
+    path = runtime_file(requested_port)
+    try:
+        with open(path) as f:
+            if json.load(f).get("pid") != os.getpid():
+                return
+        os.remove(path)
+    except (OSError, ValueError):
+        pass
+
+
+def discover_port(host: str = DEFAULT_HOST, requested_port: int = DEFAULT_PORT) -> Optional[int]:
+    """Port a local server asked for `requested_port` is listening on, from its runtime file"""
+    if host not in LOCAL_HOSTS and host != socket.gethostname():
+        return None
+    try:
+        with open(runtime_file(requested_port)) as f:
+            data = json.load(f)
+        port, pid = int(data["port"]), int(data["pid"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+    if not _process_alive(pid):
+        return None  # Left behind by a server that did not shut down cleanly
+    return port
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except (PermissionError, OSError):
+        pass  # Exists but belongs to someone else, or the check is unsupported
+    return True
+
+
+_CONNECT_PENDING = {errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN, errno.EINTR}
+
+
+def connect_first(host: str, ports: List[int], timeout: float = CONNECT_TIMEOUT) -> socket.socket:
+    """
+    Connect to every port at once with non-blocking sockets and keep the
+    first that accepts, preferring earlier ports when several are ready
+    together. Costs one round trip instead of one per port. Returns a
+    non-blocking socket; raises ConnectionRefusedError when none accepts.
+    """
+    family, kind, proto, _, address = socket.getaddrinfo(host, ports[0], socket.AF_INET, socket.SOCK_STREAM)[0]
+    selector = selectors.DefaultSelector()
+    attempts: Dict[socket.socket, int] = {}  # socket -> preference
+    winner = None
+    try:
+        for index, port in enumerate(ports):
+            sock = socket.socket(family, kind, proto)
+            sock.setblocking(False)
+            error = sock.connect_ex((address[0], port))
+            if error == 0:
+                winner = sock
+                return winner
+            if error not in _CONNECT_PENDING:
+                # Failed on the spot (refused, unreachable): its SO_ERROR is already
+                # consumed, so a writable event later would pass it off as connected
+                sock.close()
+                continue
+            attempts[sock] = index
+            selector.register(sock, selectors.EVENT_WRITE)
+
+        deadline = time.monotonic() + timeout
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            connected = []
+            for key, _ in selector.select(remaining):
+                selector.unregister(key.fileobj)
+                if key.fileobj.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                    connected.append(key.fileobj)
+            if connected:
+                winner = min(connected, key=attempts.get)
+                return winner
+        raise ConnectionRefusedError(
+            f"No server accepted a connection on {host} ports {ports[0]}-{ports[-1]}")
+    finally:
+        selector.close()
+        for sock in attempts:
+            if sock is not winner:
+                sock.close()
@@ -3,15 +3,34 @@
 Unit tests for Racing Arena game components
 """
 import unittest
+import random
 import sys
 import os
 
 # Add the parent directory to the Python path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.game import Player, GameState, ExpressionGenerator
-from src.utils import process_client_data, create_message, create_data_message
+from src.game import Player, PlayerTable, GameState, ExpressionGenerator, ExpressionPool, RoundProcessor
+from src.game.scoring import score_round
+from src.game.leaderboard import Leaderboard
+from src.game.state import Response, RESPONSE_ACCEPTED, RESPONSE_DUPLICATE, RESPONSE_TOO_LONG
+from src.utils import (
+    process_client_data, create_message, create_data_message, render_message, encode_messages,
+    MessageType, FrameDecoder, StreamDecoder, JSON_CODEC, BINARY_CODEC, PROTOCOL_JSON, PROTOCOL_BINARY, message_type,
+    parse_message, parse_answer
+)
+from src.client.loadtest import LoadTest, percentile
+from src.client.async_client import AsyncRacingClient, GameEvent
+from src.client.racing_client import RacingClient, LineReader
+from src.utils.log import DuplicateFilter, NonBlockingQueueHandler
+from config.settings import MAX_WRONG_STREAK, MAX_MESSAGE_SIZE
+import asyncio
+import io
 import json
+import logging
+import queue
+import socket
+import struct
 
 
 class TestPlayer(unittest.TestCase):
@@ -31,7 +50,8 @@ class TestPlayer(unittest.TestCase):
         """Test adding score to player"""
         self.player.add_score(5)
         self.assertEqual(self.player.score, 5)
-        self.assertEqual(self.player.position, 6)
+        # Positions are race ranks, assigned by the round processor after each round
+        self.assertEqual(self.player.position, 1)
     
     def test_penalize(self):
         """Test player penalty"""
@@ -49,6 +69,119 @@ class TestPlayer(unittest.TestCase):
         self.assertEqual(self.player.wrong_streak, 0)
 
 
+class TestPlayerTable(unittest.TestCase):
+    """Test cases for the struct-of-arrays player store"""
+    
+    def setUp(self):
+        self.table = PlayerTable()
+        self.alice = Player("alice")
+        self.bob = Player("bob")
+    
+    def test_adopt_keeps_player_state(self):
+        """Test a player moved into a table keeps its values and stays live"""
+        self.alice.add_score(3)
+        self.table.adopt(self.alice)
+        self.assertEqual(self.alice.score, 3)
+        self.alice.penalize()
+        self.assertEqual(self.table.scores[self.alice._index], 2)
+        self.assertEqual(list(self.table), [self.alice])
+    
+    def test_bulk_reset(self):
+        """Test reset() clears every player in one call"""
+        for player in (self.alice, self.bob):
+            self.table.adopt(player)
+            player.add_score(4)
+            player.penalize()
+            player.disqualified = True
+        self.table.reset()
+        for player in (self.alice, self.bob):
+            self.assertEqual((player.score, player.position, player.wrong_streak), (0, 1, 0))
+            self.assertFalse(player.disqualified)
+    
+    def test_rows_only_in_room_tables(self):
+        """Test players outside a table hold no table of their own, before joining or after leaving"""
+        self.assertNotIsInstance(self.alice._table, PlayerTable)
+        self.table.adopt(self.alice)
+        self.table.release(self.alice)
+        self.assertNotIsInstance(self.alice._table, PlayerTable)
+        self.alice.add_score(2)
+        self.assertEqual((self.alice.nickname, self.alice.score), ("alice", 2))
+
+    def test_rows_are_recycled(self):
+        """Test released rows are reused and released players keep their values"""
+        self.table.adopt(self.alice)
+        self.alice.add_score(2)
+        row = self.alice._index
+        self.table.release(self.alice)
+        self.assertEqual(self.alice.score, 2)
+        self.assertEqual(len(self.table), 0)
+        self.table.adopt(self.bob)
+        self.assertEqual(self.bob._index, row)
+        self.assertEqual(self.bob.score, 0)
+        self.assertEqual(self.bob.nickname, "bob")
+
+
+class TestLeaderboard(unittest.TestCase):
+    """Test cases for the incremental leaderboard"""
+    
+    def test_tie_aware_ranks(self):
+        """Test tied scores share a position and the next one skips"""
+        board = Leaderboard()
+        for key, score in {"a": 5, "b": 5, "c": 2, "d": -1}.items():
+            board.add(key, score)
+        self.assertEqual([board.rank(s) for s in (5, 2, -1)], [1, 3, 4])
+        self.assertEqual(board.best_score(), 5)
+        board.move("c", 2, 9)
+        self.assertEqual(board.rank(5), 2)
+        self.assertEqual(board.top(2, order=str), ["c", "a"])
+    
+    def test_matches_sorting(self):
+        """Test random updates, including far-off scores, agree with a full sort"""
+        rng = random.Random(7)
+        board = Leaderboard()
+        scores = {key: 0 for key in range(50)}
+        for key in scores:
+            board.add(key, 0)
+        for _ in range(2000):
+            key = rng.randrange(50)
+            new_score = scores[key] + rng.choice((-1, 1, rng.randint(-300, 300)))
+            board.move(key, scores[key], new_score)
+            scores[key] = new_score
+        for key, score in scores.items():
+            expected = 1 + sum(1 for other in scores.values() if other > score)
+            self.assertEqual(board.rank(score), expected)
+        self.assertEqual(board.best_score(), max(scores.values()))
+    
+    def test_table_ranks_follow_scores(self):
+        """Test a PlayerTable ranks alike with and without its leaderboard"""
+        for min_players in (0, 10):
+            with self.subTest(leaderboard_min_players=min_players):
+                table = PlayerTable(leaderboard_min_players=min_players)
+                players = [Player(name) for name in ("amy", "bo", "cy")]
+                for player in players:
+                    table.adopt(player)
+                self.assertEqual(table.leaderboard is not None, min_players == 0)
+                players[1].add_score(2)
+                players[2].add_score(2)
+                players[0].penalize()
+                self.assertEqual([table.rank(p) for p in players], [3, 1, 1])
+                self.assertEqual(table.top(1), [players[1]])
+                table.release(players[1])
+                self.assertEqual(table.rank(players[0]), 2)
+
+    def test_leaderboard_built_at_threshold(self):
+        """Test a table starts its leaderboard once it grows large, ranking existing scores"""
+        table = PlayerTable(leaderboard_min_players=3)
+        players = [Player(name) for name in ("amy", "bo", "cy")]
+        table.adopt(players[0])
+        table.adopt(players[1])
+        players[1].add_score(4)
+        self.assertIsNone(table.leaderboard)
+        table.adopt(players[2])
+        self.assertIsNotNone(table.leaderboard)
+        self.assertEqual([table.rank(p) for p in players], [2, 1, 2])
+
+
 class TestGameState(unittest.TestCase):
     """Test cases for GameState class"""
     
@@ -76,6 +209,41 @@ class TestGameState(unittest.TestCase):
         self.assertIsNotNone(self.game_state.current_answer)
         self.assertIsNotNone(self.game_state.round_start_time)
 
+    
+    def test_add_response_validates_once(self):
+        """Test answers are parsed on arrival and the first one wins"""
+        self.game_state.start_game()
+        self.game_state.new_round()
+        self.assertEqual(self.game_state.add_response("sock", " 12 "), RESPONSE_ACCEPTED)
+        self.assertEqual(self.game_state.add_response("sock", "13"), RESPONSE_DUPLICATE)
+        response = self.game_state.responses["sock"]
+        self.assertEqual(response.value, 12)
+        self.assertGreaterEqual(response.received_at, self.game_state.round_start_time)
+        
+        self.assertEqual(self.game_state.add_response("other", "x" * 1000), RESPONSE_TOO_LONG)
+        self.assertNotIn("other", self.game_state.responses)
+        self.game_state.add_response("other", "twelve")
+        self.assertFalse(self.game_state.responses["other"].valid)
+
+class TestWinner(unittest.TestCase):
+    """Test cases for finish line detection"""
+    
+    def test_leader_wins_at_finish_line(self):
+        """Test the race is won by reaching the track end, not by rank"""
+        game_state = GameState()
+        game_state.track_length = 4
+        table = PlayerTable(leaderboard_min_players=0)
+        players = {"a": Player("alice"), "b": Player("bob")}
+        for player in players.values():
+            table.adopt(player)
+        players["b"].add_score(2)
+        self.assertIsNone(game_state.has_winner(players, table))
+        RoundProcessor._update_positions(players, table)
+        self.assertIsNone(game_state.has_winner(players, table))
+        players["b"].add_score(1)
+        self.assertIs(game_state.has_winner(players, table), players["b"])
+        self.assertIs(game_state.has_winner(players), players["b"])
+
 
 class TestExpressionGenerator(unittest.TestCase):
     """Test cases for ExpressionGenerator class"""
@@ -103,6 +271,124 @@ class TestExpressionGenerator(unittest.TestCase):
         self.assertGreater(len(expressions), 50)
 
 
+class TestExpressionPool(unittest.TestCase):
+    """Test cases for the pre-generated expression pool"""
+    
+    def test_answers_match_python_arithmetic(self):
+        """Test eval-free answers agree with Python's operators"""
+        pool = ExpressionPool(size=500, low_water=0, seed=1)
+        for _ in range(500):
+            expression = pool.next()
+            self.assertEqual(eval(expression.text), expression.answer)
+    
+    def test_seeded_sequence_is_reproducible(self):
+        """Test a seed fixes the sequence however the pool is refilled"""
+        background = ExpressionPool(size=16, low_water=8, seed=42)
+        inline = ExpressionPool(size=4, low_water=2, seed=42, background=False)
+        first = [background.next().text for _ in range(100)]
+        second = [inline.next().text for _ in range(100)]
+        self.assertEqual(first, second)
+    
+    def test_solve_message_is_pre_encoded(self):
+        """Test the pooled message matches encoding it on demand"""
+        expression = ExpressionPool(size=1, seed=3).next()
+        self.assertEqual(render_message(*expression.message.message), f"Solve: {expression.text} = ?")
+        for codec in (JSON_CODEC, BINARY_CODEC):
+            self.assertEqual(encode_messages(codec, [expression.message]),
+                             codec.encode(*expression.message.message))
+
+
+class TestRoundProcessor(unittest.TestCase):
+    """Test cases for round processing"""
+    
+    def setUp(self):
+        self.game_state = GameState()
+        self.game_state.track_length = 25
+        self.game_state.start_game()
+        self.game_state.new_round()
+        self.players = {"alice_sock": Player("alice"), "bob_sock": Player("bob")}
+    
+    def test_round_digest(self):
+        """Test a round produces personal and shared digest lines"""
+        self.game_state.add_response("alice_sock", str(self.game_state.current_answer))
+        self.game_state.add_response("bob_sock", "not a number")
+        
+        digest = RoundProcessor.process_round(self.game_state, self.players)
+        
+        personal = {sock: [render_message(*message) for message in messages]
+                    for sock, messages in digest.personal.items()}
+        shared = [message if isinstance(message, str) else render_message(*message)
+                  for message in digest.shared]
+        
+        self.assertTrue(digest.continue_game)
+        self.assertEqual(personal["alice_sock"], ["Correct! +2 points", "Your position: 1"])
+        self.assertEqual(personal["bob_sock"], ["Incorrect! -1 point", "Your position: 2"])
+        self.assertIn(f"Correct answer: {self.game_state.current_answer}", shared)
+        self.assertEqual(self.players["alice_sock"].score, 2)
+        self.assertEqual(self.players["bob_sock"].score, -1)
+    
+    def test_disqualified_player_sits_out(self):
+        """Test a disqualified player is flagged and skipped in later rounds"""
+        self.players["bob_sock"].wrong_streak = MAX_WRONG_STREAK - 1
+        self.game_state.add_response("alice_sock", str(self.game_state.current_answer))
+        RoundProcessor.process_round(self.game_state, self.players)
+        self.assertTrue(self.players["bob_sock"].disqualified)
+        
+        self.game_state.new_round()
+        self.game_state.add_response("alice_sock", str(self.game_state.current_answer))
+        digest = RoundProcessor.process_round(self.game_state, self.players)
+        self.assertNotIn("bob_sock", digest.personal)
+        self.assertEqual(self.players["bob_sock"].score, -1)
+
+
+class TestScoring(unittest.TestCase):
+    """Test cases for the round scoring engine"""
+    
+    def setUp(self):
+        self.game_state = GameState()
+        self.game_state.start_game()
+        self.game_state.new_round()
+        start = self.game_state.round_start_time
+        answer = self.game_state.current_answer
+        self.players = {name: Player(name) for name in ("ann", "ben", "cat", "dan")}
+        self.game_state.responses = {
+            "ben": Response.parse(str(answer), start + 2.0),
+            "ann": Response.parse(answer, start + 3.0),
+            "cat": Response.parse("oops", start + 1.0),
+        }
+    
+    def test_fastest_collects_penalty_pool(self):
+        """Test the fastest correct player gets one point per wrong answer or timeout"""
+        scores = score_round(self.game_state, self.players)
+        self.assertEqual(scores.fastest.player.nickname, "ben")
+        self.assertEqual(scores.penalties, 2)
+        points = {result.player.nickname: result.points for result in scores.results}
+        self.assertEqual(points, {"ann": 1, "ben": 3, "cat": -1, "dan": -1})
+        self.assertEqual(self.players["ben"].score, 3)
+        self.assertEqual(self.players["dan"].wrong_streak, 1)
+    
+    def test_no_correct_answers(self):
+        """Test a round nobody solves has no fastest player"""
+        self.game_state.responses.clear()
+        scores = score_round(self.game_state, self.players)
+        self.assertIsNone(scores.fastest)
+        self.assertEqual(scores.penalties, len(self.players))
+    
+    def test_parse_answer(self):
+        """Test answers are parsed leniently but never guessed"""
+        self.assertEqual(parse_answer(" -42 "), -42)
+        self.assertEqual(parse_answer(7), 7)
+        self.assertIsNone(parse_answer("4.5"))
+        self.assertIsNone(parse_answer(None))
+        self.assertIsNone(parse_answer(3.9))
+        self.assertIsNone(parse_answer(4.0))
+        self.assertIsNone(parse_answer(True))
+        self.assertIsNone(parse_answer(False))
+        self.assertIsNone(parse_answer("1_000"))
+        self.assertIsNone(parse_answer("+"))
+        self.assertEqual(parse_answer("+8"), 8)
+
+
 class TestUtils(unittest.TestCase):
     """Test cases for utility functions"""
     
@@ -159,6 +445,411 @@ class TestUtils(unittest.TestCase):
         self.assertEqual(messages[0]["msg"], "first")
         self.assertEqual(messages[1]["msg"], "second")
         self.assertEqual(messages[2]["msg"], "third")
+    
+    def test_stream_decoder_split_utf8(self):
+        """Test a multi-byte character split across reads decodes intact"""
+        decoder = StreamDecoder()
+        data = '{"nickname": "Đạt"}\n'.encode("utf-8")
+        split = data.index("Đ".encode("utf-8")) + 1
+        self.assertEqual(list(decoder.feed(data[:split])), [])
+        messages = list(decoder.feed(data[split:]))
+        self.assertEqual(messages, [{"nickname": "Đạt"}])
+    
+    def test_stream_decoder_rejects_oversized_line(self):
+        """Test an unterminated line past the size limit is rejected"""
+        decoder = StreamDecoder(max_size=64)
+        with self.assertRaises(ValueError):
+            list(decoder.feed(b'{"answer": "' + b"9" * 100))
+    
+    def test_stream_decoder_switch_mid_chunk(self):
+        """Test bytes after the switching message are decoded as binary frames"""
+        decoder = StreamDecoder()
+        frame = BINARY_CODEC.encode(MessageType.ANSWER, {"answer": "42"})
+        received = []
+        for msg in decoder.feed(create_data_message({"protocol": "binary"}) + frame):
+            received.append(msg)
+            if "protocol" in msg:
+                decoder.switch_protocol(PROTOCOL_BINARY)
+        self.assertEqual(len(received), 2)
+        self.assertEqual(received[1]["answer"], 42)
+
+    def test_stream_decoder_switch_hands_over_newlines(self):
+        """Test frames holding newline bytes reach the frame decoder intact"""
+        decoder = StreamDecoder()
+        frames = BINARY_CODEC.encode(MessageType.ROUND, {"round": 10}) * 2  # 10 is b"\n"
+        received = []
+        for msg in decoder.feed(create_data_message({"protocol": "binary"}) + frames):
+            received.append(msg)
+            if "protocol" in msg:
+                decoder.switch_protocol(PROTOCOL_BINARY)
+        self.assertEqual([msg.get("round") for msg in received], [None, 10, 10])
+
+
+class TestLogging(unittest.TestCase):
+    """Test cases for the queue-backed logging layer"""
+
+    def _record(self, msg, *args, created=100.0):
+        record = logging.makeLogRecord({"name": "racing.server", "levelno": logging.INFO,
+                                        "levelname": "INFO", "msg": msg, "args": args})
+        record.created = created
+        return record
+
+    def test_duplicates_suppressed_within_window(self):
+        """Test repeats are dropped for the window and counted on the next one"""
+        dedupe = DuplicateFilter(window=10.0)
+        self.assertTrue(dedupe.filter(self._record("Client %s left", "a")))
+        self.assertFalse(dedupe.filter(self._record("Client %s left", "a", created=101.0)))
+        self.assertFalse(dedupe.filter(self._record("Client %s left", "a", created=102.0)))
+        self.assertTrue(dedupe.filter(self._record("Client %s left", "b", created=102.0)))
+        later = self._record("Client %s left", "a", created=111.0)
+        self.assertTrue(dedupe.filter(later))
+        self.assertEqual(later.getMessage(), "Client a left (2 similar messages suppressed)")
+
+    def test_full_queue_drops_instead_of_blocking(self):
+        """Test a full log queue never blocks the caller and reports the loss"""
+        log_queue = queue.Queue(2)
+        handler = NonBlockingQueueHandler(log_queue)
+        for index in range(5):
+            handler.emit(self._record("line %d", index))
+        self.assertEqual(handler.dropped, 3)
+        log_queue.get_nowait()
+        log_queue.get_nowait()
+        handler.emit(self._record("after"))
+        self.assertIn("3 log records dropped", log_queue.get_nowait().getMessage())
+        self.assertEqual(log_queue.get_nowait().getMessage(), "after")
+        self.assertEqual(handler.dropped, 0)
+
+
+class TestBinaryProtocol(unittest.TestCase):
+    """Test cases for the binary wire protocol"""
+    
+    def test_round_trip(self):
+        """Test typed messages survive encoding and decoding"""
+        messages = [
+            (MessageType.EXPRESSION, {"left": -120, "operator": "/", "right": 12}),
+            (MessageType.POSITION, {"position": 3}),
+            (MessageType.FEEDBACK, {"outcome": 1, "points": 4}),
+            (MessageType.ANSWER, {"answer": -10}),
+            (MessageType.ANSWER, {"answer": "abc"}),
+            (MessageType.TEXT, {"text": "héllo"}),
+        ]
+        decoder = FrameDecoder()
+        data = b"".join(BINARY_CODEC.encode(*message) for message in messages)
+        decoded = decoder.feed(data)
+        
+        self.assertEqual(len(decoded), len(messages))
+        for message, result in zip(messages, decoded):
+            self.assertEqual(parse_message(result), message)
+        self.assertEqual(decoded[0]["message"], "Solve: -120 / 12 = ?")
+        self.assertEqual(decoded[-1], {"type": MessageType.TEXT, "message": "héllo"})
+    
+    def test_fragmented_frames(self):
+        """Test frames split across reads are reassembled"""
+        data = BINARY_CODEC.encode(MessageType.ROUND, {"round": 7}) * 3
+        decoder = FrameDecoder()
+        decoded = []
+        for i in range(len(data)):
+            decoded.extend(decoder.feed(data[i:i + 1]))
+        self.assertEqual([m["round"] for m in decoded], [7, 7, 7])
+        self.assertEqual(len(decoder.buffer), 0)
+    
+    def test_oversized_frame_rejected(self):
+        """Test frames larger than the limit raise an error"""
+        decoder = FrameDecoder(max_size=8)
+        with self.assertRaises(ValueError):
+            decoder.feed(BINARY_CODEC.encode(MessageType.TEXT, {"text": "x" * 32}))
+    
+    def test_answers_judged_alike_by_both_codecs(self):
+        """Test a binary answer parses to what the same JSON answer does"""
+        for answer in ("42", " -7 ", "1_000", "\u0663", "3.9", 3.9, True, 2 ** 70, -2 ** 63):
+            with self.subTest(answer=answer):
+                frame = BINARY_CODEC.encode(MessageType.ANSWER, {"answer": answer})
+                binary = FrameDecoder().feed(frame)[0]["answer"]
+                sent_as_json = json.loads(create_data_message({"answer": answer}))["answer"]
+                self.assertEqual(parse_answer(binary), parse_answer(sent_as_json))
+
+    def test_unknown_type_reads_as_text(self):
+        """Test a type code from a newer server degrades to TEXT over both codecs"""
+        frame = struct.pack("!HB", 5, 250) + b"hello"
+        binary = FrameDecoder().feed(frame)[0]
+        sent_as_json = json.loads(create_data_message({"type": 250, "message": "hello"}))
+        for msg in (binary, sent_as_json):
+            self.assertEqual(message_type(msg), MessageType.TEXT)
+            self.assertEqual(parse_message(msg), (MessageType.TEXT, {"text": "hello"}))
+
+    def test_fragmented_frame_at_limit(self):
+        """Test a frame with the largest allowed payload decodes however it arrives"""
+        frame = BINARY_CODEC.encode(MessageType.TEXT, {"text": "x" * MAX_MESSAGE_SIZE})
+        for split in (len(frame) - 1, len(frame) // 2, 2):
+            with self.subTest(split=split):
+                decoder = FrameDecoder()
+                self.assertEqual(decoder.feed(frame[:split]), [])
+                self.assertEqual(len(decoder.feed(frame[split:])[0]["message"]), MAX_MESSAGE_SIZE)
+
+    def test_malformed_frames_rejected(self):
+        """Test truncated fields and bad UTF-8 all raise ValueError"""
+        header = struct.Struct("!HB")
+        for frame in (header.pack(0, MessageType.ANSWER),
+                      header.pack(2, MessageType.ANSWER) + b"\x01\x00",
+                      header.pack(2, MessageType.ROUND) + b"\x00\x07",
+                      header.pack(2, MessageType.TEXT) + b"\xff\xfe"):
+            with self.subTest(frame=frame):
+                with self.assertRaises(ValueError):
+                    FrameDecoder().feed(frame)
+
+    def test_text_carried_once(self):
+        """Test text-only messages send their text as "message" alone"""
+        for msg_type in (MessageType.TEXT, MessageType.NICKNAME_REJECTED):
+            with self.subTest(msg_type=msg_type):
+                encoded = JSON_CODEC.encode(msg_type, {"text": "Welcome!"})
+                self.assertEqual(json.loads(encoded), {"type": msg_type, "message": "Welcome!"})
+                self.assertEqual(GameEvent.from_message(json.loads(encoded)).text, "Welcome!")
+
+    def test_json_envelope_is_typed(self):
+        """Test the JSON codec adds the type and fields to the legacy message envelope"""
+        encoded = JSON_CODEC.encode(MessageType.POSITION, {"position": 2})
+        self.assertEqual(json.loads(encoded), {"type": MessageType.POSITION, "position": 2, "message": "Your position: 2"})
+        binary = BINARY_CODEC.encode(MessageType.POSITION, {"position": 2})
+        self.assertLess(len(binary), len(encoded))
+    
+    def test_parse_message_any_protocol(self):
+        """Test typed frames, typed JSON and legacy text all parse to the same fields"""
+        cases = [
+            (MessageType.REGISTERED, {}),
+            (MessageType.RACE_STARTED, {"track_length": 12}),
+            (MessageType.ROUND, {"round": 7}),
+            (MessageType.EXPRESSION, {"left": -12, "operator": "%", "right": 5}),
+            (MessageType.POSITION, {"position": 3}),
+            (MessageType.FEEDBACK, {"outcome": 0, "points": -1}),
+            (MessageType.FEEDBACK, {"outcome": 1, "points": 3}),
+            (MessageType.FEEDBACK, {"outcome": 2, "points": -1}),
+            (MessageType.CORRECT_ANSWER, {"answer": -42}),
+            (MessageType.DISQUALIFIED, {"nickname": "bot 1"}),
+            (MessageType.RACE_ENDED, {"winner": "alice"}),
+            (MessageType.TEXT, {"text": "Welcome!"}),
+        ]
+        for msg_type, fields in cases:
+            binary = FrameDecoder().feed(BINARY_CODEC.encode(msg_type, fields))[0]
+            typed_json = json.loads(JSON_CODEC.encode(msg_type, fields))
+            legacy = {"message": render_message(msg_type, fields)}
+            for msg in (binary, typed_json, legacy):
+                self.assertEqual(parse_message(msg), (msg_type, fields))
+        self.assertEqual(parse_message({"message": "Solve: garbled"}), (MessageType.TEXT, {"text": "Solve: garbled"}))
+
+    def test_message_type(self):
+        """Test typed messages are classified by code and legacy text by its wording"""
+        self.assertEqual(message_type({"type": 6, "message": "Your position: 2"}), MessageType.POSITION)
+        self.assertEqual(message_type({"type": 200, "message": "From a newer server"}), MessageType.TEXT)
+        self.assertEqual(message_type({"message": "Solve: 1 + 2 = ?"}), MessageType.EXPRESSION)
+        self.assertEqual(message_type({"message": "Nickname 'a' is already taken."}), MessageType.NICKNAME_REJECTED)
+        self.assertEqual(message_type({"message": "Welcome to Racing Arena!"}), MessageType.TEXT)
+
+
+class TestRacingClient(unittest.TestCase):
+    """Test cases for the event-driven client core, embedded without a terminal"""
+
+    def setUp(self):
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+        self.output = io.StringIO()
+        self.client = RacingClient("127.0.0.1", listener.getsockname()[1], protocol=PROTOCOL_JSON,
+                                   stdin=None, stdout=self.output)
+        self.server, _ = listener.accept()
+        self.server.settimeout(1.0)
+        listener.close()
+        self.addCleanup(self.server.close)
+        self.addCleanup(self.client.close)
+
+    def _received(self):
+        return json.loads(self.server.recv(1024))
+
+    def _poll_until(self, condition):
+        for _ in range(50):
+            if condition():
+                return
+            self.client.poll(0.02)
+        self.fail("client did not reach the expected state")
+
+    def test_register_and_answer(self):
+        """Test nickname and answers go out as typed, driven by poll()"""
+        self.client.start()
+        self.client.handle_line("alice")
+        self.assertEqual(self._received(), {"nickname": "alice"})
+
+        self.server.sendall(JSON_CODEC.encode(MessageType.REGISTERED, {}) +
+                            JSON_CODEC.encode(MessageType.EXPRESSION, {"left": 6, "operator": "*", "right": 7}))
+        self._poll_until(lambda: self.client.waiting_for_answer)
+        self.assertTrue(self.client.registered)
+        self.assertIn("Solve: 6 * 7 = ?", self.output.getvalue())
+
+        self.client.handle_line("42")
+        self.assertEqual(self._received(), {"answer": "42"})
+        self.assertFalse(self.client.waiting_for_answer)
+
+    def test_rejected_nickname_prompts_again(self):
+        """Test a rejected nickname lets the next line register instead"""
+        self.client.start()
+        self.client.handle_line("alice")
+        self._received()
+        self.server.sendall(JSON_CODEC.encode(MessageType.NICKNAME_REJECTED, {"text": "Nickname 'alice' is already taken."}))
+        self._poll_until(lambda: self.client.nickname is None)
+        self.client.handle_line("bob")
+        self.assertEqual(self._received(), {"nickname": "bob"})
+
+    def test_nickname_waits_for_negotiation(self):
+        """Test a nickname typed during binary negotiation is sent once the server answers"""
+        self.client.protocol = PROTOCOL_BINARY
+        self.client.start()
+        self.assertEqual(self._received(), {"protocol": PROTOCOL_BINARY})
+        self.client.handle_line("alice")
+        self.server.sendall(create_data_message({"protocol": PROTOCOL_BINARY}))
+        self._poll_until(lambda: self.client.codec is BINARY_CODEC)
+        frame = self.server.recv(1024)
+        self.assertEqual(FrameDecoder().feed(frame)[0]["nickname"], "alice")
+
+    def test_malformed_frame_disconnects(self):
+        """Test a bad binary frame ends the session with a message instead of a traceback"""
+        self.client.protocol = PROTOCOL_BINARY
+        self.client.start()
+        self._received()
+        self.server.sendall(create_data_message({"protocol": PROTOCOL_BINARY}) +
+                            struct.pack("!HB", 2, MessageType.ROUND) + b"\x00\x07")
+        self._poll_until(lambda: not self.client.running)
+        self.assertIn("Error parsing server message", self.output.getvalue())
+
+    def test_server_close_stops_client(self):
+        """Test the loop ends when the server hangs up"""
+        self.client.start()
+        self.server.close()
+        self._poll_until(lambda: not self.client.running)
+        self.assertIn("Disconnected from server", self.output.getvalue())
+
+    def test_line_reader(self):
+        """Test partial input is held until its newline arrives"""
+        reader = LineReader()
+        self.assertEqual(list(reader.feed(b"12")), [])
+        self.assertEqual(list(reader.feed(b"3\r\nab\n")), ["123", "ab"])
+
+
+class TestAsyncRacingClient(unittest.TestCase):
+    """Test cases for the asyncio client library against a scripted server"""
+
+    def _session(self, protocol, script):
+        """Run `script(client)` against a server that negotiates, registers and sends one round"""
+        received = []
+
+        async def serve(reader, writer):
+            decoder = StreamDecoder()
+            codec = JSON_CODEC
+            while True:
+                data = await reader.read(1024)
+                if not data:
+                    break
+                for msg in decoder.feed(data):
+                    received.append(msg)
+                    if msg.get("protocol") == PROTOCOL_BINARY:
+                        writer.write(create_data_message({"protocol": PROTOCOL_BINARY}))
+                        codec = BINARY_CODEC
+                        decoder.switch_protocol(PROTOCOL_BINARY)
+                    elif msg.get("nickname") == "taken":
+                        writer.write(codec.encode(MessageType.NICKNAME_REJECTED, {"text": "Nickname 'taken' is already taken."}))
+                    elif msg.get("nickname") == "full":
+                        writer.write(codec.encode(MessageType.TEXT, {"text": "All rooms are full."}))
+                        writer.close()
+                        return
+                    elif "nickname" in msg:
+                        writer.write(codec.encode(MessageType.TEXT, {"text": "Welcome!"}) +
+                                     codec.encode(MessageType.REGISTERED, {}) +
+                                     codec.encode(MessageType.EXPRESSION, {"left": 6, "operator": "*", "right": 7}))
+                    elif "answer" in msg:
+                        writer.write(codec.encode(MessageType.FEEDBACK, {"outcome": 1, "points": 1}))
+                        writer.close()
+                        return
+
+        async def main():
+            server = await asyncio.start_server(serve, "127.0.0.1", 0)
+            async with server:
+                port = server.sockets[0].getsockname()[1]
+                async with AsyncRacingClient("127.0.0.1", port, protocol) as client:
+                    return await script(client)
+
+        return asyncio.run(main()), received
+
+    def test_session(self):
+        """Test register, typed events and answers in both protocols"""
+        async def play(client):
+            self.assertFalse(await client.register("taken"))
+            self.assertTrue(await client.register("alice"))
+            events = []
+            async for event in client:
+                events.append(event)
+                if event.type == MessageType.EXPRESSION:
+                    client.submit_answer(event["left"] * event["right"])
+            return client.codec, events
+
+        for protocol, codec in ((PROTOCOL_JSON, JSON_CODEC), (PROTOCOL_BINARY, BINARY_CODEC)):
+            (used_codec, events), received = self._session(protocol, play)
+            self.assertIs(used_codec, codec)
+            self.assertEqual([event.type for event in events],
+                             [MessageType.TEXT, MessageType.EXPRESSION, MessageType.FEEDBACK])
+            self.assertEqual(events[0].text, "Welcome!")
+            self.assertEqual(events[2].fields, {"outcome": 1, "points": 1})
+            self.assertEqual(received[-1]["answer"], 42)
+
+    def test_register_on_full_server(self):
+        """Test a server hanging up during registration raises with its reason instead of waiting"""
+        async def join(client):
+            with self.assertRaises(ConnectionError) as raised:
+                await client.register("full")
+            return str(raised.exception)
+
+        for protocol in (PROTOCOL_JSON, PROTOCOL_BINARY):
+            reason, _ = self._session(protocol, join)
+            self.assertIn("All rooms are full.", reason)
+
+
+class TestLoadTest(unittest.TestCase):
+    """Test cases for the headless load generator helpers"""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        samples = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(samples, 50), 50.0)
+        self.assertEqual(percentile(samples, 99), 99.0)
+        self.assertEqual(percentile(samples, 100), 100.0)
+        self.assertEqual(percentile([], 90), 0.0)
+
+    def test_think_time_distributions(self):
+        """Test think times follow the configured distribution"""
+        self.assertEqual(LoadTest(think_time=0.5, think_distribution="fixed").think_time(), 0.5)
+        uniform = LoadTest(think_time=0.5, think_distribution="uniform", seed=1)
+        self.assertTrue(all(0 <= uniform.think_time() <= 1.0 for _ in range(100)))
+        exponential = LoadTest(think_time=0.5, think_distribution="exponential", seed=1)
+        mean = sum(exponential.think_time() for _ in range(2000)) / 2000
+        self.assertAlmostEqual(mean, 0.5, delta=0.1)
+
+    def test_connect_rate_waits_for_connects(self):
+        """Test the connect phase lasts until the last connect resolves, not until the last launch"""
+        async def serve(reader, writer):
+            await reader.read(1024)
+            await asyncio.sleep(0.3)  # Slow protocol acknowledgement
+            writer.write(create_data_message({"protocol": PROTOCOL_BINARY}))
+            await reader.read(1024)
+            writer.close()
+
+        async def main():
+            server = await asyncio.start_server(serve, "127.0.0.1", 0)
+            swarm = LoadTest(port=server.sockets[0].getsockname()[1], bots=3, duration=0.6,
+                             connect_rate=1000, protocol=PROTOCOL_BINARY)
+            async with server:
+                await swarm._run()
+            return swarm.stats
+
+        stats = asyncio.run(main())
+        self.assertEqual(stats.connected, 3)
+        self.assertGreaterEqual(stats.connect_elapsed, 0.3)
+        self.assertLess(stats.connect_elapsed, stats.elapsed)
 
 
 class TestIntegration(unittest.TestCase):
@@ -0,0 +1,899 @@
+#!/usr/bin/env python3
+"""
+Unit tests for Racing Arena server components
+"""
+import unittest
+import errno
+import signal
+import socket
+import sys
+import os
+import tempfile
+import time
+import json
+import subprocess
+import threading
+import queue
+from unittest import mock
+
+# Add the parent directory to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.server.connection import ClientConnection, MessageSender
+from src.server.racing_server import RacingServer
+from src.server.async_server import AsyncRacingServer, StreamConnection
+from src.server.supervisor import WorkerSupervisor
+from src.server.room import RoomManager, PHASE_COUNTDOWN, PHASE_RACING, PHASE_INTERMISSION
+from src.server.scheduler import Scheduler
+from src.server.metrics import MetricsRegistry, ServerMetrics, StatsEndpoint
+from src.server import profiler
+from src.server.profiler import (
+    PhaseProfiler, ProfileSession, SamplingProfiler, phase, PHASE_SERVER, PHASE_ROUND_PROCESSING
+)
+from src.game import Player
+from src.game.expressions import evaluate
+from src.utils import (
+    bind_listener, publish_address, unpublish_address, discover_port, connect_first, raise_file_limit,
+    MessageType, StreamDecoder, CODECS, JSON_CODEC, PROTOCOL_JSON, PROTOCOL_BINARY, create_data_message, parse_message
+)
+from src.utils.network import runtime_file
+from src.utils.messaging import OUTCOME_CORRECT
+from config.settings import (
+    MIN_CLIENTS, RACE_COUNTDOWN, INTERMISSION_TIME, WORKER_RESTART_DELAY, WORKER_MAX_RESTART_DELAY
+)
+
+
+class FakeConnection(MessageSender):
+    """Records everything sent to it"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, data: bytes) -> int:
+        self.sent.append(data)
+        return len(data)
+
+    def close(self):
+        pass
+
+
+class ServerThread:
+    """Runs a server engine on a background thread until stop()"""
+
+    def __init__(self, server_class=RacingServer, poll: float = 0.05):
+        self.server = server_class("127.0.0.1", 0, stats_port=None)
+        self.port = self.server.port
+        self.poll = poll
+        self._stopping = threading.Event()
+        self.server.scheduler.call_later(poll, self._check_stop)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def _check_stop(self):
+        # Leaves run() through its Ctrl-C path, so shutdown is exercised too
+        if self._stopping.is_set():
+            raise KeyboardInterrupt
+        self.server.scheduler.call_later(self.poll, self._check_stop)
+
+    def start(self) -> "ServerThread":
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        self.thread.join(5)
+
+
+class GameClient:
+    """Blocking test client speaking either wire protocol"""
+
+    def __init__(self, port: int, protocol: str = PROTOCOL_JSON, timeout: float = 5.0):
+        self.sock = socket.create_connection(("127.0.0.1", port), timeout=timeout)
+        self.codec = JSON_CODEC
+        self.decoder = StreamDecoder()
+        self.pending = []
+        if protocol == PROTOCOL_BINARY:
+            self.sock.sendall(create_data_message({"protocol": protocol}))
+            while self.codec is JSON_CODEC:
+                for msg in self.decoder.feed(self._recv()):
+                    if "protocol" in msg:
+                        # Binary from the very next byte, including any already received
+                        self.codec = CODECS[protocol]
+                        self.decoder.switch_protocol(protocol)
+                        break
+
+    def _recv(self) -> bytes:
+        data = self.sock.recv(4096)
+        if not data:
+            raise ConnectionError("Server closed the connection")
+        return data
+
+    def _next(self) -> dict:
+        while not self.pending:
+            self.pending.extend(self.decoder.feed(self._recv()))
+        return self.pending.pop(0)
+
+    def send(self, msg_type: MessageType, **fields):
+        self.sock.sendall(self.codec.encode(msg_type, fields))
+
+    def expect(self, msg_type: MessageType) -> dict:
+        """Fields of the next message of `msg_type`, skipping any others"""
+        while True:
+            received, fields = parse_message(self._next())
+            if received == msg_type:
+                return fields
+
+    def close(self):
+        self.sock.close()
+
+
+class TestClientConnection(unittest.TestCase):
+    """Test cases for the buffered ClientConnection"""
+
+    def setUp(self):
+        self.server_side, self.client_side = socket.socketpair()
+        self.server_side.setblocking(False)
+        self.pending = []
+        self.overflowed = []
+
+    def tearDown(self):
+        self.server_side.close()
+        self.client_side.close()
+
+    def _drain(self) -> bytes:
+        self.client_side.setblocking(False)
+        chunks = []
+        while True:
+            try:
+                chunk = self.client_side.recv(65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b"".join(chunks)
+
+    def test_send_writes_through_when_idle(self):
+        """Test small sends bypass the queue"""
+        conn = ClientConnection(self.server_side, on_pending=self.pending.append)
+        conn.send(b"hello\n")
+        self.assertEqual(conn.pending, 0)
+        self.assertEqual(self.pending, [])
+        self.assertEqual(self._drain(), b"hello\n")
+
+    def test_partial_writes_are_queued_and_flushed(self):
+        """Test data the kernel can't take is kept and delivered in order"""
+        conn = ClientConnection(self.server_side, on_pending=self.pending.append,
+                                high_water_mark=64 * 1024 * 1024)
+        payload = bytes(range(256)) * 8192  # 2 MiB, larger than any socket buffer
+        conn.send(payload)
+        conn.send(b"tail")
+        self.assertGreater(conn.pending, 0)
+        self.assertEqual(self.pending, [conn])
+
+        received = bytearray()
+        while conn.flush() or len(received) < len(payload) + 4:
+            received += self._drain()
+        self.assertEqual(bytes(received), payload + b"tail")
+
+    def test_overflow_reports_slow_consumer(self):
+        """Test exceeding the high-water mark flags the connection"""
+        conn = ClientConnection(self.server_side, on_overflow=self.overflowed.append,
+                                high_water_mark=1024)
+        conn.send(b"x" * (8 * 1024 * 1024))
+        self.assertTrue(conn.overflowed)
+        self.assertEqual(self.overflowed, [conn])
+        self.assertEqual(conn.pending, 0)
+        self.assertEqual(conn.send(b"more"), 0)
+
+    def test_metrics_count_bytes_and_blocked_sends(self):
+        """Test sends are counted and a send the kernel can't take is recorded"""
+        metrics = ServerMetrics()
+        conn = ClientConnection(self.server_side, high_water_mark=64 * 1024 * 1024, metrics=metrics)
+        conn.send_message("hello")
+        self.assertEqual(metrics.messages_out.value, 1)
+        self.assertEqual(metrics.bytes_out.value, len(self._drain()))
+        self.assertEqual(metrics.send_would_block.value, 0)
+        sent = metrics.bytes_out.value
+        conn.send(b"x" * (4 * 1024 * 1024))
+        self.assertEqual(metrics.bytes_out.value, sent + 4 * 1024 * 1024)
+        self.assertEqual(metrics.send_would_block.value, 1)
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for the metrics registry and stats endpoint"""
+
+    def setUp(self):
+        self.registry = MetricsRegistry(prefix="test_")
+        self.latency = self.registry.histogram("latency_seconds", "Latency", buckets=(0.01, 0.1))
+        self.requests = self.registry.counter("requests_total", "Requests")
+        self.registry.gauge("depth", "Queue depth", lambda: 7)
+
+    def test_prometheus_format(self):
+        """Test histograms render cumulative buckets and counters their value"""
+        for value in (0.005, 0.05, 0.05, 3.0):
+            self.latency.observe(value)
+        self.requests.inc(2)
+        lines = self.registry.render_prometheus().splitlines()
+        self.assertIn("# TYPE test_latency_seconds histogram", lines)
+        self.assertIn('test_latency_seconds_bucket{le="0.01"} 1', lines)
+        self.assertIn('test_latency_seconds_bucket{le="0.1"} 3', lines)
+        self.assertIn('test_latency_seconds_bucket{le="+Inf"} 4', lines)
+        self.assertIn("test_latency_seconds_count 4", lines)
+        self.assertIn("test_requests_total 2", lines)
+        self.assertIn("test_depth 7", lines)
+        self.assertEqual(self.latency.quantile(0.5), 0.1)
+
+    def test_endpoint_routes(self):
+        """Test /metrics, /stats and error responses"""
+        endpoint = StatsEndpoint(self.registry, 0)
+        try:
+            metrics = endpoint.respond(b"GET /metrics HTTP/1.1\r\nHost: x\r\n\r\n")
+            self.assertTrue(metrics.startswith(b"HTTP/1.1 200 OK"))
+            self.assertIn(b"version=0.0.4", metrics)
+            self.assertIn(b"# TYPE test_requests_total counter", metrics)
+            text = endpoint.respond(b"GET /stats HTTP/1.1\r\n\r\n")
+            self.assertIn(b"test_depth", text)
+            self.assertNotIn(b"# TYPE", text)
+            self.assertIn(b"# TYPE", endpoint.respond(b"GET /stats?format=prometheus HTTP/1.1\r\n\r\n"))
+            self.assertTrue(endpoint.respond(b"GET /other HTTP/1.1\r\n\r\n").startswith(b"HTTP/1.1 404"))
+            self.assertTrue(endpoint.respond(b"POST /metrics HTTP/1.1\r\n\r\n").startswith(b"HTTP/1.1 405"))
+            self.assertTrue(endpoint.respond(b"").startswith(b"HTTP/1.1 400"))
+        finally:
+            endpoint.close()
+
+
+class TestDiscovery(unittest.TestCase):
+    """Test cases for the runtime address file and parallel connects"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_publish_and_discover(self):
+        """Test a published port is found for the requested one, and removed on unpublish"""
+        path = publish_address(40000, "localhost", 40003)
+        self.assertEqual(os.path.dirname(path), os.environ["XDG_RUNTIME_DIR"])
+        self.assertEqual(discover_port("localhost", 40000), 40003)
+        self.assertIsNone(discover_port("example.com", 40000))
+        self.assertIsNone(discover_port("localhost", 40001))
+        unpublish_address(40000)
+        self.assertIsNone(discover_port("localhost", 40000))
+
+    def test_stale_and_foreign_files(self):
+        """Test files of dead servers are ignored and other servers' files are left alone"""
+        with open(runtime_file(40000), "w") as f:
+            json.dump({"host": "localhost", "port": 40003, "pid": 2 ** 30}, f)
+        self.assertIsNone(discover_port("localhost", 40000))
+        unpublish_address(40000)
+        self.assertTrue(os.path.exists(runtime_file(40000)))
+
+    def test_connect_first(self):
+        """Test the first listening port wins and closed ports are skipped"""
+        listeners = []
+        for _ in range(2):
+            listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(1)
+            self.addCleanup(listener.close)
+            listeners.append(listener.getsockname()[1])
+        closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        closed.bind(("127.0.0.1", 0))
+        closed_port = closed.getsockname()[1]
+        closed.close()
+
+        sock = connect_first("127.0.0.1", [closed_port, listeners[0], listeners[1]], timeout=1.0)
+        self.addCleanup(sock.close)
+        self.assertEqual(sock.getpeername()[1], listeners[0])
+        with self.assertRaises(ConnectionRefusedError):
+            connect_first("127.0.0.1", [closed_port], timeout=0.5)
+
+    def test_connect_first_skips_immediate_failures(self):
+        """Test a port refused by connect_ex itself never wins over a live one"""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(1)
+        self.addCleanup(listener.close)
+        live = listener.getsockname()[1]
+        refused = live + 1 if live < 65535 else live - 1
+
+        class RefusingSocket(socket.socket):
+            # Loopback reports refusals asynchronously; other networks fail on the spot
+            def connect_ex(self, address):
+                if address[1] == refused:
+                    return errno.ECONNREFUSED
+                return super().connect_ex(address)
+
+        with mock.patch("src.utils.network.socket.socket", RefusingSocket):
+            sock = connect_first("127.0.0.1", [refused, live], timeout=1.0)
+            self.addCleanup(sock.close)
+            with self.assertRaises(ConnectionRefusedError):
+                connect_first("127.0.0.1", [refused], timeout=0.5)
+        self.assertEqual(sock.getpeername()[1], live)
+
+
+class TestStartup(unittest.TestCase):
+    """Test cases for the listener bind and per-mode imports"""
+
+    def test_bind_listener_falls_back(self):
+        """Test a taken port moves the listener up, on the socket it returns"""
+        taken = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        taken.bind(("127.0.0.1", 0))
+        taken.listen(1)
+        self.addCleanup(taken.close)
+        port = taken.getsockname()[1]
+
+        listener = bind_listener("127.0.0.1", port, max_attempts=5)
+        self.addCleanup(listener.close)
+        self.assertIn(listener.getsockname()[1], range(port + 1, port + 5))
+        self.assertFalse(listener.getblocking())
+        with self.assertRaises(OSError):
+            bind_listener("127.0.0.1", port, max_attempts=1)
+
+    def test_modes_import_only_what_they_run(self):
+        """Test the client path loads no server, asyncio or multiprocessing code"""
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = ("import sys, main, src; from src.client.racing_client import RacingClient; "
+                "assert src.RacingClient is RacingClient; "
+                "print(sorted(m for m in ('asyncio', 'multiprocessing', 'pstats', 'src.server', 'src.game') "
+                "if m in sys.modules))")
+        output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.strip(), "[]")
+
+
+class TestSelectServer(unittest.TestCase):
+    """Test cases for the select() engine against real sockets"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        patcher = mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": directory.name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_descriptors_past_fd_setsize(self):
+        """Test clients whose descriptors are 1024 or above are served like any other"""
+        fd_setsize = 1024
+        raise_file_limit(fd_setsize + 256)
+        placeholders = []
+        try:
+            # Take the low descriptors so every socket from here on lands past FD_SETSIZE
+            while len(placeholders) <= fd_setsize:
+                placeholders.append(os.open(os.devnull, os.O_RDONLY))
+        except OSError:
+            for fd in placeholders:
+                os.close(fd)
+            self.skipTest("descriptor limit too low to pass FD_SETSIZE")
+        self.addCleanup(lambda: [os.close(fd) for fd in placeholders])
+
+        running = ServerThread(RacingServer).start()
+        self.addCleanup(running.stop)
+        clients = [GameClient(running.port) for _ in range(3)]
+        for index, client in enumerate(clients):
+            self.addCleanup(client.close)
+            client.send(MessageType.NICKNAME, nickname=f"player_{index}")
+            client.expect(MessageType.REGISTERED)
+        self.assertTrue(all(conn.fileno() >= fd_setsize for conn in running.server.clients))
+
+    def test_full_server_hangs_up_with_reason(self):
+        """Test registration with every room taken is refused with a reason and the connection closed"""
+        running = ServerThread(RacingServer)
+        running.server.rooms.max_rooms = 0
+        running.start()
+        self.addCleanup(running.stop)
+        client = GameClient(running.port)
+        self.addCleanup(client.close)
+        client.send(MessageType.NICKNAME, nickname="alice")
+        while True:
+            fields = client.expect(MessageType.TEXT)
+            if "All rooms are full" in fields["text"]:
+                break
+        with self.assertRaises(ConnectionError):
+            client.expect(MessageType.TEXT)
+        self.assertEqual(running.server.nicknames, set())
+
+
+class TestServerEngines(unittest.TestCase):
+    """Test cases running both server engines end to end over real sockets"""
+
+    ENGINES = (RacingServer, AsyncRacingServer)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        for patcher in (mock.patch.dict(os.environ, {"XDG_RUNTIME_DIR": directory.name}),
+                        mock.patch("src.server.room.RACE_COUNTDOWN", 0.05)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _client(self, port: int, protocol: str = PROTOCOL_JSON) -> GameClient:
+        client = GameClient(port, protocol)
+        self.addCleanup(client.close)
+        return client
+
+    def test_race_round(self):
+        """Test registration, the countdown deadline and a full round in both engines and codecs"""
+        for engine in self.ENGINES:
+            for protocol in (PROTOCOL_JSON, PROTOCOL_BINARY):
+                with self.subTest(engine=engine.__name__, protocol=protocol):
+                    running = ServerThread(engine).start()
+                    self.addCleanup(running.stop)
+                    clients = [self._client(running.port, protocol) for _ in range(MIN_CLIENTS)]
+                    for index, client in enumerate(clients):
+                        client.send(MessageType.NICKNAME, nickname=f"p{index}")
+                        client.expect(MessageType.REGISTERED)
+
+                    # The race starts from the countdown timer, with no client traffic to wake the loop
+                    for client in clients:
+                        client.expect(MessageType.RACE_STARTED)
+                        expression = client.expect(MessageType.EXPRESSION)
+                        client.send(MessageType.ANSWER, answer=evaluate(
+                            expression["left"], expression["operator"], expression["right"]))
+                    for client in clients:
+                        self.assertEqual(client.expect(MessageType.FEEDBACK)["outcome"], OUTCOME_CORRECT)
+                    running.stop()
+                    self.assertFalse(running.thread.is_alive())
+
+    def test_registration_timeout(self):
+        """Test a deadline scheduled while the loop runs drops a silent client in both engines"""
+        for engine in self.ENGINES:
+            with self.subTest(engine=engine.__name__):
+                running = ServerThread(engine).start()
+                self.addCleanup(running.stop)
+                with mock.patch("src.server.racing_server.REGISTRATION_TIMEOUT", 0.1):
+                    client = self._client(running.port)
+                    while "timed out" not in client.expect(MessageType.TEXT)["text"]:
+                        pass
+                with self.assertRaises(ConnectionError):
+                    client.expect(MessageType.TEXT)
+
+
+class FakeTransport:
+    def __init__(self):
+        self.buffered = 0
+        self.aborted = False
+
+    def get_write_buffer_size(self) -> int:
+        return self.buffered
+
+    def abort(self):
+        self.aborted = True
+
+
+class FakeWriter:
+    """StreamWriter stand-in whose transport never drains"""
+
+    def __init__(self):
+        self.transport = FakeTransport()
+
+    def write(self, data: bytes):
+        self.transport.buffered += len(data)
+
+
+class TestStreamConnection(unittest.TestCase):
+    """Test cases for the asyncio engine's connection wrapper"""
+
+    def test_overflow_aborts(self):
+        """Test a transport backed up past the high-water mark is aborted and reported once"""
+        overflowed = []
+        conn = StreamConnection(FakeWriter(), on_overflow=overflowed.append, high_water_mark=100)
+        self.assertEqual(conn.send(b"x" * 60), 60)
+        self.assertEqual(conn.pending, 60)
+        self.assertFalse(conn.overflowed)
+
+        conn.send(b"x" * 60)
+        self.assertTrue(conn.overflowed)
+        self.assertTrue(conn.writer.transport.aborted)
+        self.assertEqual(overflowed, [conn])
+        self.assertEqual(conn.send(b"x"), 0)
+        self.assertEqual(overflowed, [conn])
+
+
+class FakeProcess:
+    """multiprocessing.Process stand-in that stays alive until exit() is called"""
+    pids = iter(range(100, 10000))
+
+    def __init__(self, target=None, args=(), name=None, daemon=None):
+        self.name = name
+        self.pid = None
+        self.exitcode = None
+
+    def start(self):
+        self.pid = next(self.pids)
+
+    def is_alive(self) -> bool:
+        return self.exitcode is None
+
+    def exit(self, code: int = 1):
+        self.exitcode = code
+
+    def terminate(self):
+        self.exit(-15)
+
+    def join(self, timeout=None):
+        pass
+
+    def kill(self):
+        self.exit(-9)
+
+
+class TestWorkerSupervisor(unittest.TestCase):
+    """Test cases for worker restarts and stats aggregation, without forking"""
+
+    def setUp(self):
+        self.now = 1000.0
+        for patcher in (mock.patch("src.server.supervisor.time.monotonic", lambda: self.now),
+                        mock.patch("src.server.supervisor.multiprocessing.Process", FakeProcess)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.supervisor = WorkerSupervisor(port=40000, workers=2)
+        self.supervisor.stats_queue = queue.Queue()
+        patcher = mock.patch.object(self.supervisor, "_start_worker", wraps=self.supervisor._start_worker)
+        self.start_worker = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _report(self, worker_id: int, **stats):
+        self.supervisor.stats_queue.put((worker_id, stats))
+
+    def _tick(self, seconds: float = 0.0):
+        self.now += seconds
+        self.supervisor._collect_stats(timeout=0)
+        self.supervisor._check_workers()
+
+    def _start_ready(self):
+        for worker_id in range(2):
+            self.supervisor._start_worker(worker_id)
+            self._report(worker_id, connections=0)
+        self._tick()
+        self.start_worker.reset_mock()
+
+    def test_restart_backoff(self):
+        """Test crash loops back off exponentially up to the cap, and a long run resets the delay"""
+        self._start_ready()
+        delays = []
+        for _ in range(7):
+            self.supervisor.workers[0].exit(1)
+            self._tick()
+            delay = self.supervisor.restart_at[0] - self.now
+            delays.append(delay)
+            self._tick(delay - 0.01)
+            self.start_worker.assert_not_called()
+            self._tick(0.01)
+            self.start_worker.assert_called_once_with(0)
+            self.start_worker.reset_mock()
+            self._report(0, connections=0)
+            self._tick()
+        expected = [min(WORKER_RESTART_DELAY * 2 ** n, WORKER_MAX_RESTART_DELAY) for n in range(7)]
+        self.assertEqual(delays, expected)
+        self.assertEqual(self.supervisor.restarts, 7)
+
+        # A worker that ran longer than the cap crashed for some new reason: start over
+        self._tick(WORKER_MAX_RESTART_DELAY + 1)
+        self.supervisor.workers[0].exit(1)
+        self._tick()
+        self.assertEqual(self.supervisor.restart_at[0] - self.now, WORKER_RESTART_DELAY)
+
+    def test_worker_dying_during_startup_fails_fast(self):
+        """Test a worker that exits before its first report stops the supervisor instead of looping"""
+        self._start_ready()
+        self.supervisor._start_worker(1)  # As after a restart: not ready again until it reports
+        self.supervisor.workers[1].exit(1)
+        with self.assertRaises(RuntimeError) as raised:
+            self._tick()
+        self.assertIn("40000", str(raised.exception))
+        self.assertNotIn(1, self.supervisor.restart_at)
+
+    def test_report_racing_the_exit_counts(self):
+        """Test a first report still queued when the worker exits marks it as started"""
+        self.supervisor._start_worker(0)
+        self.supervisor._start_worker(1)
+        self._report(0, connections=0)
+        self._report(1, connections=0)
+        self.supervisor.workers[0].exit(1)
+        self.supervisor._check_workers()
+        self.assertIn(0, self.supervisor.restart_at)
+
+    def test_aggregate_and_format_stats(self):
+        """Test stats are summed over live workers only"""
+        self._start_ready()
+        self._report(0, connections=3, rooms=1)
+        self._report(1, connections=4, rooms=2)
+        self._tick()
+        self.assertEqual(self.supervisor.aggregate_stats(), {"connections": 7, "rooms": 3})
+        self.assertEqual(self.supervisor.format_stats(),
+                         "2/2 workers up, 0 restarts | 7 connections | 3 rooms")
+
+        self.supervisor.workers[1].exit(1)
+        self._tick()
+        self.assertEqual(self.supervisor.aggregate_stats(), {"connections": 3, "rooms": 1})
+        self.assertEqual(self.supervisor.format_stats(),
+                         "1/2 workers up, 0 restarts | 3 connections | 1 rooms")
+
+
+class FakeClock:
+    """Manually advanced monotonic clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _busy_work(n):
+    return sum(i * i for i in range(n))
+
+
+class TestProfiler(unittest.TestCase):
+    """Test cases for the phase-annotated profilers"""
+
+    def setUp(self):
+        handlers = {signal.SIGTERM: signal.getsignal(signal.SIGTERM)}
+        if hasattr(signal, "SIGUSR1"):
+            handlers[signal.SIGUSR1] = signal.getsignal(signal.SIGUSR1)
+        for signum, handler in handlers.items():
+            self.addCleanup(signal.signal, signum, handler)
+        self.addCleanup(setattr, profiler, "_active", None)
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.prefix = os.path.join(self.directory.name, "profile")
+
+    def test_phase_scopes_annotate_samples(self):
+        """Test samples are rooted at the phase the loop was in"""
+        sampler = SamplingProfiler()
+        profiler._active = sampler
+        with phase(PHASE_ROUND_PROCESSING):
+            self.assertEqual(sampler.phase, PHASE_ROUND_PROCESSING)
+            sampler.sample(sys._getframe(), sampler.phase)
+        self.assertEqual(sampler.phase, PHASE_SERVER)
+        sampler.sample(sys._getframe(), sampler.phase)
+
+        lines = sampler.collapsed().splitlines()
+        self.assertEqual(len(lines), 2)
+        stack, count = lines[0].rsplit(" ", 1)
+        self.assertEqual(count, "1")
+        self.assertTrue(stack.startswith(PHASE_ROUND_PROCESSING + ";"))
+        self.assertIn("TestProfiler.test_phase_scopes_annotate_samples (tests/test_server.py:", stack.split(";")[-1])
+        self.assertTrue(lines[1].startswith(PHASE_SERVER + ";"))
+
+    def test_profiler_must_record(self):
+        """Test a profiler without dump and summary cannot be created"""
+        with self.assertRaises(TypeError):
+            PhaseProfiler()
+
+    def test_phase_scope_without_profiler(self):
+        """Test phase scopes do nothing while no profile runs"""
+        with phase(PHASE_ROUND_PROCESSING):
+            self.assertIsNone(profiler._active)
+
+    def test_session_window_writes_cprofile(self):
+        """Test a delayed, bounded cProfile session writes per-phase stats when its window ends"""
+        scheduler = Scheduler(FakeClock())
+        session = ProfileSession("cprofile", self.prefix, duration=2.0, delay=1.0)
+        session.start(scheduler)
+        self.assertFalse(session.profiler.running)
+
+        scheduler.clock.now += 1.0
+        scheduler.run_due()
+        self.assertTrue(session.profiler.running)
+        with phase(PHASE_ROUND_PROCESSING):
+            _busy_work(1000)
+
+        scheduler.clock.now += 2.0
+        scheduler.run_due()
+        self.assertFalse(session.profiler.running)
+        self.assertIsNone(profiler._active)
+        with open(self.prefix + ".txt") as f:
+            report = f.read()
+        self.assertIn(f"=== phase: {PHASE_ROUND_PROCESSING} ===", report)
+        self.assertIn("_busy_work", report)
+        self.assertTrue(os.path.exists(self.prefix + ".pstats"))
+        self.assertEqual(session.finish(), [])
+
+    def test_sampler_thread_samples_target(self):
+        """Test the background sampler captures the profiled thread's stack"""
+        session = ProfileSession("sample", self.prefix)
+        session.profiler.interval = 0.001
+        session.start(Scheduler())
+        with phase(PHASE_ROUND_PROCESSING):
+            deadline = time.monotonic() + 0.2
+            while time.monotonic() < deadline and PHASE_ROUND_PROCESSING not in session.profiler.summary():
+                _busy_work(1000)
+        paths = session.finish()
+        self.assertEqual(paths, [self.prefix + ".collapsed"])
+        with open(paths[0]) as f:
+            self.assertIn(PHASE_ROUND_PROCESSING + ";", f.read())
+
+
+class TestScheduler(unittest.TestCase):
+    """Test cases for the deadline scheduler"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = Scheduler(clock=self.clock)
+        self.fired = []
+
+    def test_idle_scheduler_has_no_timeout(self):
+        """Test nothing scheduled means the loop may block on I/O"""
+        self.assertIsNone(self.scheduler.timeout())
+
+    def test_timeout_tracks_nearest_deadline(self):
+        """Test timeout() is the time left until the earliest deadline"""
+        self.scheduler.call_later(30, self.fired.append, "late")
+        self.scheduler.call_later(5, self.fired.append, "soon")
+        self.assertEqual(self.scheduler.timeout(), 5)
+        self.clock.now += 7
+        self.assertEqual(self.scheduler.timeout(), 0)
+
+    def test_run_due_in_deadline_order(self):
+        """Test only due callbacks run, earliest first"""
+        self.scheduler.call_later(2, self.fired.append, "b")
+        self.scheduler.call_later(1, self.fired.append, "a")
+        self.scheduler.call_later(10, self.fired.append, "c")
+        self.clock.now += 5
+        self.assertEqual(self.scheduler.run_due(), 2)
+        self.assertEqual(self.fired, ["a", "b"])
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_cancelled_timer_does_not_fire(self):
+        """Test cancel() removes a timer from timeout() and run_due()"""
+        handle = self.scheduler.call_later(1, self.fired.append, "x")
+        self.scheduler.call_later(3, self.fired.append, "y")
+        handle.cancel()
+        self.assertEqual(self.scheduler.timeout(), 3)
+        self.clock.now += 5
+        self.scheduler.run_due()
+        self.assertEqual(self.fired, ["y"])
+
+
+class TestRoomManager(unittest.TestCase):
+    """Test cases for multi-room hosting"""
+
+    def setUp(self):
+        self.removed = []
+        self.clock = FakeClock()
+        self.scheduler = Scheduler(clock=self.clock)
+        self.manager = RoomManager(self.removed.append, max_rooms=2, scheduler=self.scheduler)
+
+    def _join(self, nickname: str):
+        conn = FakeConnection()
+        room = self.manager.assign(conn, Player(nickname))
+        return conn, room
+
+    def _advance(self, seconds: float):
+        self.clock.now += seconds
+        self.scheduler.run_due()
+
+    def _start_race(self, prefix: str = "p"):
+        """Seat MIN_CLIENTS players and run the countdown out"""
+        seated = [self._join(f"{prefix}{i}") for i in range(MIN_CLIENTS)]
+        self._advance(RACE_COUNTDOWN)
+        return seated
+
+    def test_countdown_admits_late_joiners(self):
+        """Test players joining during the countdown race in the same room"""
+        seated = [self._join(f"p{i}") for i in range(MIN_CLIENTS)]
+        room = seated[0][1]
+        self.assertEqual(room.phase, PHASE_COUNTDOWN)
+        self.assertFalse(room.game_state.game_started)
+        self.assertIs(self._join("late")[1], room)
+        self._advance(RACE_COUNTDOWN)
+        self.assertTrue(room.game_state.game_started)
+        self.assertEqual(len(room.players), MIN_CLIENTS + 1)
+
+    def test_started_race_opens_new_room(self):
+        """Test players beyond a started race get their own room"""
+        seated = self._start_race()
+        first_room = seated[0][1]
+        self.assertTrue(first_room.game_state.game_started)
+        self.assertIsNot(self._join("late")[1], first_room)
+        self.assertEqual(len(self.manager.rooms), 2)
+
+    def test_capacity_limit(self):
+        """Test no room is created past max_rooms"""
+        self._start_race("a")
+        self._start_race("b")
+        self.assertFalse(self.manager.has_capacity())
+        self.assertIsNone(self._join("late")[1])
+
+    def test_empty_room_is_closed(self):
+        """Test the last player leaving tears the room down"""
+        conn, room = self._join("solo")
+        self.manager.remove(conn)
+        self.assertNotIn(room.room_id, self.manager.rooms)
+        self.assertNotIn(conn, self.manager.room_of)
+
+    def test_round_is_one_write_per_player(self):
+        """Test a processed round reaches each player in a single send"""
+        seated = self._start_race()
+        room = seated[0][1]
+        for conn, _ in seated:
+            conn.sent.clear()
+        room._process_round()
+        for conn, _ in seated:
+            # Round results plus the next expression
+            self.assertEqual(len(conn.sent), 2)
+            self.assertIn(b"Your position:", conn.sent[0])
+            self.assertIn(b"Correct answer:", conn.sent[0])
+
+    def test_round_times_out_on_schedule(self):
+        """Test a round is processed when its deadline comes due"""
+        seated = self._start_race()
+        room = seated[0][1]
+        self.assertEqual(self.scheduler.timeout(), room.game_state.time_limit)
+        self._advance(room.game_state.time_limit)
+        self.assertEqual(self.manager.rounds_processed, 1)
+        self.assertEqual(room.game_state.round_number, 2)
+
+    def test_race_end_enters_intermission(self):
+        """Test a finished race pauses on a timer and then counts down again"""
+        seated = self._start_race()
+        room = seated[0][1]
+        room.game_state.track_length = 2  # One correct answer wins
+        room.submit_answer(seated[0][0], room.game_state.current_answer)
+        room._process_round()
+        self.assertEqual(room.phase, PHASE_INTERMISSION)
+        self.assertEqual(self.scheduler.timeout(), INTERMISSION_TIME)
+        self.assertIs(self._join("spectator")[1], room)
+
+        self._advance(INTERMISSION_TIME)
+        self.assertEqual(room.phase, PHASE_COUNTDOWN)
+        self._advance(RACE_COUNTDOWN)
+        self.assertEqual(room.phase, PHASE_RACING)
+        self.assertEqual(len(room.players), MIN_CLIENTS + 1)
+
+    def test_round_resolves_when_all_answered(self):
+        """Test the round ends as soon as every active player has answered"""
+        seated = self._start_race()
+        room = seated[0][1]
+        room.submit_answer(seated[0][0], "1")
+        self.assertEqual(self.scheduler.timeout(), room.game_state.time_limit)
+        for conn, _ in seated[1:]:
+            room.submit_answer(conn, "1")
+        self.assertEqual(self.scheduler.timeout(), 0)
+        self._advance(0)
+        self.assertEqual(room.game_state.round_number, 2)
+
+    def test_disqualified_players_are_not_awaited(self):
+        """Test disqualified players neither answer nor hold the round open"""
+        seated = self._start_race()
+        room = seated[0][1]
+        room.players[seated[0][0]].disqualified = True
+        room.submit_answer(seated[0][0], "1")
+        self.assertNotIn(seated[0][0], room.game_state.responses)
+        for conn, _ in seated[1:]:
+            room.submit_answer(conn, "1")
+        self.assertEqual(self.scheduler.timeout(), 0)
+
+    def test_cascading_removal_closes_room_once(self):
+        """Test a leaver whose pause notice fails for the last player closes the room once"""
+        manager = RoomManager(lambda conn: manager.remove(conn), scheduler=self.scheduler)
+        (leaver, room), (unreachable, _) = [(conn, manager.assign(conn, Player(f"p{i}")))
+                                           for i, conn in enumerate([FakeConnection(), FakeConnection()])]
+        self._advance(RACE_COUNTDOWN)
+        self.assertEqual(room.phase, PHASE_RACING)
+
+        unreachable.send = mock.Mock(side_effect=ConnectionResetError)
+        manager.remove(leaver)
+        self.assertEqual(manager.rooms, {})
+        self.assertEqual(manager.room_of, {})
+
+    def test_paused_race_cancels_round_timer(self):
+        """Test pausing a race leaves no deadline behind"""
+        seated = self._start_race()
+        self.manager.remove(seated[0][0])
+        self.assertIsNone(self.scheduler.timeout())
+
+    def test_paused_room_reopens(self):
+        """Test a race paused by a disconnect accepts new players"""
+        seated = self._start_race()
+        room = seated[0][1]
+        self.manager.remove(seated[0][0])
+        self.assertFalse(room.game_state.game_started)
+        self.assertIs(self._join("replacement")[1], room)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)